@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script measures the throughput of generating templates on threads
+sharing one schema model (see `/src/generate_templates_threaded.py`),
+for a range of thread counts.
+
+On a free-threaded build of Python (e.g. `python3.13t`), the measurement
+is run twice, in child processes with the GIL disabled (`-X gil=0`) and
+enabled (`-X gil=1`), to compare them.  On other builds, only the GIL
+is measured.
+
+    benchmark_threads.py \\
+      --schema-model var/schema_model.pickle \\
+      --threads 1,2,4,8
+
+Each row reports the mode, thread count, best seconds of `--repeat`
+runs, classes per second, and speedup over one thread of the same mode.
+Generated files are written to a temporary directory and discarded.
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import sysconfig
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from rdflib import URIRef
+
+from generate_templates_threaded import generate_classes
+from schema_model import load_schema_model
+from verify_templates import template_class_iris
+
+TOP_SRCDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_threads(threads: str) -> List[int]:
+    """
+    >>> parse_threads("1,2, 4")
+    [1, 2, 4]
+    """
+    return [int(x) for x in threads.split(",")]
+
+
+def is_free_threaded_build() -> bool:
+    return bool(sysconfig.get_config_var("Py_GIL_DISABLED"))
+
+
+def gil_enabled() -> bool:
+    # sys._is_gil_enabled is new in Python 3.13.
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    if is_gil_enabled is None:
+        return True
+    return bool(is_gil_enabled())
+
+
+def format_row(row: Dict[str, Any], baseline_seconds: float) -> str:
+    """
+    >>> format_row({"mode": "free-threaded", "threads": 4, "classes": 429, "seconds": 2.0}, 6.0)
+    'free-threaded\\t4\\t2.000\\t214.5\\t3.00'
+    """
+    return "\t".join(
+        [
+            row["mode"],
+            str(row["threads"]),
+            "%.3f" % row["seconds"],
+            "%.1f" % (row["classes"] / row["seconds"]),
+            "%.2f" % (baseline_seconds / row["seconds"]),
+        ]
+    )
+
+
+def measure(
+    schema_model_path: str,
+    thread_counts: List[int],
+    n_classes: List[URIRef],
+    repeat: int,
+) -> None:
+    """
+    Print a JSON line per thread count, with the best seconds of repeat runs.
+    """
+    model = load_schema_model(schema_model_path)
+    mode = "GIL" if gil_enabled() else "free-threaded"
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # Warm up the model's and composer's caches, which every run shares.
+        generate_classes(model, tmpdir, n_classes, 1)
+        for threads in thread_counts:
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                generate_classes(model, tmpdir, n_classes, threads)
+                best = min(best, time.perf_counter() - start)
+            print(
+                json.dumps(
+                    {
+                        "mode": mode,
+                        "threads": threads,
+                        "classes": len(n_classes),
+                        "seconds": best,
+                    }
+                ),
+                flush=True,
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--schema-model",
+        required=True,
+        help="Path to a schema model pickle, as made by schema_model_pickle.py.",
+    )
+    parser.add_argument(
+        "--threads",
+        default="1,2,4,8",
+        help="Comma-separated thread counts.",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--class-iri",
+        action="append",
+        default=[],
+        help="Class to generate.  May be repeated.  Default the classes of /templates.",
+    )
+    parser.add_argument(
+        "--measure",
+        action="store_true",
+        help="Measure in this process, printing JSON lines.  Used by the parent process.",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    n_classes: List[URIRef] = [URIRef(x) for x in args.class_iri]
+    if not n_classes:
+        n_classes = template_class_iris(os.path.join(TOP_SRCDIR, "templates"))
+    thread_counts = parse_threads(args.threads)
+
+    if args.measure:
+        measure(args.schema_model, thread_counts, n_classes, args.repeat)
+        return
+
+    if is_free_threaded_build():
+        gil_options = [["-X", "gil=0"], ["-X", "gil=1"]]
+    else:
+        logging.info("Not a free-threaded build of Python.  Measuring the GIL only.")
+        gil_options = [[]]
+
+    print("\t".join(["mode", "threads", "seconds", "classes_per_second", "speedup"]))
+    for gil_option in gil_options:
+        command = [
+            sys.executable,
+            *gil_option,
+            os.path.abspath(__file__),
+            "--measure",
+            "--schema-model",
+            args.schema_model,
+            "--threads",
+            args.threads,
+            "--repeat",
+            str(args.repeat),
+        ]
+        for n_class in args.class_iri:
+            command += ["--class-iri", n_class]
+        logging.debug("Running %r.", command)
+        completed = subprocess.run(command, check=True, stdout=subprocess.PIPE)
+        rows = [json.loads(x) for x in completed.stdout.decode().splitlines()]
+        baseline_seconds = next(
+            (x["seconds"] for x in rows if x["threads"] == 1), rows[0]["seconds"]
+        )
+        for row in rows:
+            print(format_row(row, baseline_seconds), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/make -f
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+# Usage:
+# This Makefile is expected to be used with a Make include directive,
+# with the variable top_srcdir defined.
+#
+# If BUILD_TRACE is set to the absolute path of a trace file, e.g.:
+#
+#   make BUILD_TRACE=$PWD/var/build-trace.jsonl
+#
+# then recipe commands prefixed with the trace function are timed, and
+# a record is appended to the trace file.  The function takes a stage
+# name and, optionally, the class IRI the target is generated for:
+#
+#   $(call trace,svg,$(PREFIX_IRI)$(LOCAL_NAME)) dot ...
+#
+# If BUILD_TRACE is not set, the function expands to nothing.  See
+# `/src/build_trace.py`.
+
+ifneq ($(BUILD_TRACE),)
+export BUILD_TRACE
+endif
+
+# Likewise, if SPARQL_QUERY_LOG is set to the absolute path of a log
+# file, the stub generators append their query statistics to it.  See
+# `/src/sparql_queries.py`.
+ifneq ($(SPARQL_QUERY_LOG),)
+export SPARQL_QUERY_LOG
+endif
+
+# Seconds per class saved by `make build-trace-report`, if present, for
+# the generated Makefiles to list the longest targets first.  See
+# `/src/build_trace_report.py`.
+BUILD_COSTS ?= $(wildcard $(top_srcdir)/var/build-costs.json)
+
+trace = $(if $(BUILD_TRACE),python3 $(top_srcdir)/src/build_trace.py --stage $(1) --target $(abspath $@) $(if $(2),--class-iri $(2)) --)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module reads and writes the seconds spent building each class, as
+saved by `/src/build_trace_report.py --costs-output`, and orders Make
+targets by them.  It imports only the standard library, so the Makefile
+generators `/src/generate_all_classes_mk.py` and
+`/src/generate_all_ontologies_mk.py` can use it without loading the
+stub generators.
+"""
+
+import json
+from typing import Dict, Iterable, List, Mapping
+
+
+def save_costs(costs: Mapping[str, float], out_path: str) -> None:
+    with open(out_path, "w") as out_fh:
+        json.dump(dict(sorted(costs.items())), out_fh, indent=4)
+        out_fh.write("\n")
+
+
+def load_costs(in_path: str) -> Dict[str, float]:
+    with open(in_path, "r") as in_fh:
+        return {str(x): float(y) for (x, y) in json.load(in_fh).items()}
+
+
+def longest_first(names: Iterable[str], costs: Mapping[str, float]) -> List[str]:
+    """
+    Order names by descending cost, so Make starts the longest targets first.  Names without a recorded cost, such as new classes, are given the mean recorded cost.  Ties are ordered by name.
+
+    >>> longest_first(["a", "b", "c", "d"], {"b": 1.0, "c": 3.0})
+    ['c', 'a', 'd', 'b']
+    >>> longest_first(["b", "a"], {})
+    ['a', 'b']
+    """
+    names = list(names)
+    known = [costs[x] for x in names if x in costs]
+    default_cost = sum(known) / len(known) if known else 0.0
+    return sorted(names, key=lambda x: (-costs.get(x, default_cost), x))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module records the timing of build steps to a trace file, when the
+environment variable BUILD_TRACE names one.  Each record is a line of
+JSON:
+
+    {"target": ..., "class": ..., "stage": ..., "start": ..., "end": ...,
+     "peak_rss_kb": ..., "pid": ...}
+
+`start` and `end` are seconds since the epoch.  `class` is the class IRI
+the step generates for, or null.  `peak_rss_kb` is the peak resident set
+size of the timed process.
+
+Run as a script, this module times a command and records it, as the
+Make recipes do (see `/src/build-trace.mk`):
+
+    build_trace.py --stage svg --target File.svg -- dot -T svg -o File.svg File.dot
+
+Within a process, the trace_stage() context manager records a stage of
+work.  The generators record their stages as e.g. `json:load`, nested
+within the `json` stage recorded for their Make recipe.
+
+Records are appended with a single write to a file opened for
+appending, so concurrent processes of a parallel Make build can share a
+trace file.  See `/src/build_trace_report.py` for reporting.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Iterator, Optional
+
+TRACE_FILE_VARIABLE = "BUILD_TRACE"
+
+
+def append_record(trace_file: str, record: Dict[str, Any]) -> None:
+    """
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as tmpdir:
+    ...     trace_file = os.path.join(tmpdir, "trace.jsonl")
+    ...     append_record(trace_file, {"stage": "a"})
+    ...     append_record(trace_file, {"stage": "b"})
+    ...     with open(trace_file) as in_fh:
+    ...         print(in_fh.read(), end="")
+    {"stage": "a"}
+    {"stage": "b"}
+    """
+    line = json.dumps(record, sort_keys=True) + "\n"
+    fd = os.open(trace_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode())
+    finally:
+        os.close(fd)
+
+
+def make_record(
+    target: str,
+    class_iri: Optional[str],
+    stage: str,
+    start: float,
+    end: float,
+    peak_rss_kb: int,
+    pid: int,
+) -> Dict[str, Any]:
+    return {
+        "target": target,
+        "class": class_iri,
+        "stage": stage,
+        "start": start,
+        "end": end,
+        "peak_rss_kb": peak_rss_kb,
+        "pid": pid,
+    }
+
+
+@contextlib.contextmanager
+def trace_stage(
+    stage: str, target: str, class_iri: Optional[str] = None
+) -> Iterator[None]:
+    """
+    Record the enclosed work as a stage, if BUILD_TRACE is set.  The peak RSS recorded is that of the process so far.
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as tmpdir:
+    ...     os.environ[TRACE_FILE_VARIABLE] = os.path.join(tmpdir, "trace.jsonl")
+    ...     try:
+    ...         with trace_stage("json:load", "File.json", "urn:example:File"):
+    ...             pass
+    ...     finally:
+    ...         del os.environ[TRACE_FILE_VARIABLE]
+    ...     with open(os.path.join(tmpdir, "trace.jsonl")) as in_fh:
+    ...         record = json.load(in_fh)
+    >>> (record["stage"], record["target"].endswith("/File.json"), record["start"] <= record["end"])
+    ('json:load', True, True)
+    """
+    trace_file = os.environ.get(TRACE_FILE_VARIABLE)
+    if not trace_file:
+        yield
+        return
+    start = time.time()
+    try:
+        yield
+    finally:
+        append_record(
+            trace_file,
+            make_record(
+                os.path.abspath(target),
+                class_iri,
+                stage,
+                start,
+                time.time(),
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                os.getpid(),
+            ),
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stage", required=True)
+    parser.add_argument("--target", required=True)
+    parser.add_argument("--class-iri")
+    parser.add_argument(
+        "--trace-file",
+        help="Trace file to append to.  Defaults to the value of the environment variable %s."
+        % TRACE_FILE_VARIABLE,
+    )
+    parser.add_argument("command", nargs="+")
+    args = parser.parse_args()
+
+    trace_file = args.trace_file or os.environ.get(TRACE_FILE_VARIABLE)
+    if not trace_file:
+        parser.error("No trace file given.")
+
+    start = time.time()
+    process = subprocess.Popen(args.command)
+    # wait4() reports the resource usage of this child alone.
+    _, status, rusage = os.wait4(process.pid, 0)
+    end = time.time()
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    append_record(
+        trace_file,
+        make_record(
+            os.path.abspath(args.target),
+            args.class_iri,
+            args.stage,
+            start,
+            end,
+            rusage.ru_maxrss,
+            process.pid,
+        ),
+    )
+    sys.exit(process.returncode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script summarizes a build trace recorded by `/src/build_trace.py`:
+the slowest classes, time per ontology prefix and per stage, and an
+estimate of the critical path, the longest chain of steps that must run
+one after another however many jobs Make runs.  It can also write the
+trace in the Chrome trace-event format, for viewing in
+`chrome://tracing` or Perfetto.
+
+If a target was built more than once in the trace, its last record is
+used.
+
+With `--costs-output`, the seconds spent on each class are saved as
+JSON, for `/src/generate_all_classes_mk.py` and
+`/src/generate_all_ontologies_mk.py` to list the longest targets first.
+
+Usage example:
+
+    make BUILD_TRACE=$PWD/var/build-trace.jsonl
+    build_trace_report.py --chrome-trace var/build-trace-chrome.json var/build-trace.jsonl
+"""
+
+import argparse
+import collections
+import json
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from build_costs import save_costs
+from generate_single_stub_json import CDO_CONTEXT
+from namespace_index import NamespaceIndex
+
+Record = Dict[str, Any]
+
+# Stages recorded by the Make recipes, and the stages whose targets they
+# depend on.  A prerequisite record for a class must be for the same
+# class; a prerequisite record for no class applies to every class.
+STAGE_PREREQUISITES: Dict[str, List[str]] = {
+    "schema-model": ["facet-cardinalities"],
+    "reverse-indexes": ["schema-model"],
+    "cardinality-matrix": ["schema-model"],
+    "classes-mk": ["ontologies-mk"],
+    "dot": ["classes-mk", "facet-cardinalities"],
+    "json": ["classes-mk", "facet-cardinalities"],
+    "svg": ["dot"],
+    "svg-optimize": ["svg"],
+}
+
+
+def load_records(trace_file: str) -> List[Record]:
+    """
+    Lines that are not complete records, such as one cut short by an interrupted build, are skipped.
+    """
+    records: Dict[Tuple[str, str], Record] = dict()
+    with open(trace_file, "r") as in_fh:
+        for line_number, line in enumerate(in_fh, start=1):
+            try:
+                record = json.loads(line)
+                key = (record["target"], record["stage"])
+                record["start"] = float(record["start"])
+                record["end"] = float(record["end"])
+            except (ValueError, KeyError, TypeError):
+                logging.warning("Skipping malformed record on line %d.", line_number)
+                continue
+            records[key] = record
+    return sorted(records.values(), key=lambda x: (x["start"], x["end"]))
+
+
+def duration(record: Record) -> float:
+    end: float = record["end"]
+    start: float = record["start"]
+    return end - start
+
+
+def is_recipe_stage(stage: str) -> bool:
+    """
+    Stages within a generator process are named after their recipe's stage, e.g. "json:load".
+
+    >>> is_recipe_stage("json"), is_recipe_stage("json:load")
+    (True, False)
+    """
+    return ":" not in stage
+
+
+def class_costs(records: Sequence[Record]) -> Dict[str, float]:
+    """
+    Returns the total seconds of the recipe records of each class.
+
+    >>> class_costs([
+    ...     {"target": "A.dot", "class": "urn:A", "stage": "dot", "start": 4, "end": 5},
+    ...     {"target": "A.svg", "class": "urn:A", "stage": "svg", "start": 5, "end": 8},
+    ...     {"target": "A.json", "class": "urn:A", "stage": "json:load", "start": 4, "end": 4.5},
+    ...     {"target": "a.ttl", "class": None, "stage": "facet-cardinalities", "start": 0, "end": 4},
+    ... ])
+    {'urn:A': 4.0}
+    """
+    costs: Dict[str, float] = collections.defaultdict(float)
+    for record in records:
+        if record.get("class") and is_recipe_stage(record["stage"]):
+            costs[record["class"]] += duration(record)
+    return dict(costs)
+
+
+def critical_path(records: Sequence[Record]) -> List[Record]:
+    """
+    Returns the chain of recipe records, by STAGE_PREREQUISITES, with the greatest total duration.
+
+    >>> records = [
+    ...     {"target": "a.ttl", "class": None, "stage": "facet-cardinalities", "start": 0, "end": 4},
+    ...     {"target": "A.dot", "class": "urn:A", "stage": "dot", "start": 4, "end": 5},
+    ...     {"target": "A.svg", "class": "urn:A", "stage": "svg", "start": 5, "end": 8},
+    ...     {"target": "B.dot", "class": "urn:B", "stage": "dot", "start": 4, "end": 6},
+    ...     {"target": "B.svg", "class": "urn:B", "stage": "svg", "start": 6, "end": 7},
+    ...     {"target": "B.json", "class": "urn:B", "stage": "json", "start": 4, "end": 7.5},
+    ... ]
+    >>> [x["target"] for x in critical_path(records)]
+    ['a.ttl', 'A.dot', 'A.svg']
+    """
+    recipe_records = [x for x in records if is_recipe_stage(x["stage"])]
+    by_stage_and_class: Dict[Tuple[str, Optional[str]], List[int]] = (
+        collections.defaultdict(list)
+    )
+    for i, record in enumerate(recipe_records):
+        by_stage_and_class[(record["stage"], record.get("class"))].append(i)
+
+    # Records sorted by start time begin after their prerequisites, so
+    # finish times can be computed in one pass.
+    order = sorted(range(len(recipe_records)), key=lambda x: recipe_records[x]["start"])
+    finish: Dict[int, float] = dict()
+    predecessor: Dict[int, Optional[int]] = dict()
+    for i in order:
+        record = recipe_records[i]
+        best: Optional[int] = None
+        for stage in STAGE_PREREQUISITES.get(record["stage"], []):
+            candidates = by_stage_and_class[(stage, None)]
+            if record.get("class") is not None:
+                candidates = candidates + by_stage_and_class[(stage, record["class"])]
+            for j in candidates:
+                if j in finish and (best is None or finish[j] > finish[best]):
+                    best = j
+        predecessor[i] = best
+        finish[i] = duration(record) + (0.0 if best is None else finish[best])
+
+    if not finish:
+        return []
+    cursor: Optional[int] = max(finish, key=lambda x: finish[x])
+    path: List[Record] = []
+    while cursor is not None:
+        path.append(recipe_records[cursor])
+        cursor = predecessor[cursor]
+    return path[::-1]
+
+
+def assign_lanes(intervals: Sequence[Tuple[float, float]]) -> List[int]:
+    """
+    Assign each (start, end) interval the lowest-numbered lane free at its start, so lanes correspond to concurrent jobs.
+
+    >>> assign_lanes([(0, 2), (1, 3), (2, 4), (5, 6)])
+    [0, 1, 0, 0]
+    """
+    lane_ends: List[float] = []
+    lanes: List[int] = [0] * len(intervals)
+    for i in sorted(range(len(intervals)), key=lambda x: intervals[x]):
+        start, end = intervals[i]
+        for lane, lane_end in enumerate(lane_ends):
+            if lane_end <= start:
+                break
+        else:
+            lane = len(lane_ends)
+            lane_ends.append(end)
+        lane_ends[lane] = end
+        lanes[i] = lane
+    return lanes
+
+
+def chrome_trace(records: Sequence[Record]) -> Dict[str, Any]:
+    """
+    Render records as Chrome trace events.  Recipe records are laid out in lanes of concurrent jobs; stages within a generator process are drawn in the lane of their recipe.
+    """
+    if not records:
+        return {"traceEvents": []}
+    origin = min(x["start"] for x in records)
+    recipe_records = [x for x in records if is_recipe_stage(x["stage"])]
+    lanes = assign_lanes([(x["start"], x["end"]) for x in recipe_records])
+    # Stages within a generator process share the process ID recorded
+    # for its recipe.
+    record_lanes: Dict[int, int] = dict()
+    pid_lanes: Dict[Any, int] = dict()
+    for record, lane in zip(recipe_records, lanes):
+        record_lanes[id(record)] = lane
+        pid_lanes[record.get("pid")] = lane
+
+    events: List[Dict[str, Any]] = []
+    for record in records:
+        lane = record_lanes.get(id(record), pid_lanes.get(record.get("pid"), -1))
+        events.append(
+            {
+                "name": "%s %s" % (record["stage"], record["target"].split("/")[-1]),
+                "cat": record["stage"].split(":")[0],
+                "ph": "X",
+                "ts": (record["start"] - origin) * 1e6,
+                "dur": duration(record) * 1e6,
+                "pid": 0,
+                "tid": lane,
+                "args": {
+                    "target": record["target"],
+                    "class": record.get("class"),
+                    "peak_rss_kb": record.get("peak_rss_kb"),
+                },
+            }
+        )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=20,
+        help="Number of slowest classes to list.",
+    )
+    parser.add_argument(
+        "--chrome-trace",
+        help="Path to write the trace as Chrome trace-event JSON.",
+    )
+    parser.add_argument(
+        "--costs-output",
+        help="Path to write the seconds spent on each class, as JSON.",
+    )
+    parser.add_argument("trace_file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    records = load_records(args.trace_file)
+    recipe_records = [x for x in records if is_recipe_stage(x["stage"])]
+    if not records:
+        raise ValueError("No records in trace file: %r." % args.trace_file)
+
+    namespace_index = NamespaceIndex(
+        (prefix, str(namespace)) for (prefix, namespace) in CDO_CONTEXT.items()
+    )
+
+    wall_seconds = max(x["end"] for x in records) - min(x["start"] for x in records)
+    recipe_seconds = sum(duration(x) for x in recipe_records)
+    print("Records: %d (%d recipes)" % (len(records), len(recipe_records)))
+    print("Wall-clock span: %.2f s" % wall_seconds)
+    print("Total recipe time: %.2f s" % recipe_seconds)
+    if wall_seconds > 0:
+        print("Mean parallelism: %.2f" % (recipe_seconds / wall_seconds))
+
+    stage_seconds: Dict[str, float] = collections.defaultdict(float)
+    stage_counts: Dict[str, int] = collections.defaultdict(int)
+    stage_peak_rss_kb: Dict[str, int] = collections.defaultdict(int)
+    for record in records:
+        stage_seconds[record["stage"]] += duration(record)
+        stage_counts[record["stage"]] += 1
+        stage_peak_rss_kb[record["stage"]] = max(
+            stage_peak_rss_kb[record["stage"]], int(record.get("peak_rss_kb") or 0)
+        )
+    print()
+    print("Stages:")
+    print(
+        "  %-24s %6s %10s %10s %12s"
+        % ("stage", "count", "total s", "mean s", "peak RSS MB")
+    )
+    for stage in sorted(stage_seconds, key=lambda x: stage_seconds[x], reverse=True):
+        print(
+            "  %-24s %6d %10.2f %10.3f %12.1f"
+            % (
+                stage,
+                stage_counts[stage],
+                stage_seconds[stage],
+                stage_seconds[stage] / stage_counts[stage],
+                stage_peak_rss_kb[stage] / 1024,
+            )
+        )
+
+    class_stage_seconds: Dict[str, Dict[str, float]] = collections.defaultdict(
+        lambda: collections.defaultdict(float)
+    )
+    for record in recipe_records:
+        if record.get("class"):
+            class_stage_seconds[record["class"]][record["stage"]] += duration(record)
+    class_seconds = class_costs(recipe_records)
+
+    print()
+    print("Slowest classes:")
+    for class_iri in sorted(
+        class_seconds, key=lambda x: class_seconds[x], reverse=True
+    )[: args.top]:
+        breakdown = ", ".join(
+            "%s %.2f" % (stage, seconds)
+            for (stage, seconds) in sorted(class_stage_seconds[class_iri].items())
+        )
+        print("  %8.2f s  %s  (%s)" % (class_seconds[class_iri], class_iri, breakdown))
+
+    prefix_seconds: Dict[str, float] = collections.defaultdict(float)
+    prefix_classes: Dict[str, int] = collections.defaultdict(int)
+    for class_iri, seconds in class_seconds.items():
+        try:
+            prefix = namespace_index.compute_qname(class_iri, False)[0]
+        except KeyError:
+            prefix = class_iri.rsplit("/", 1)[0] + "/"
+        prefix_seconds[prefix] += seconds
+        prefix_classes[prefix] += 1
+    print()
+    print("Prefixes:")
+    for prefix in sorted(prefix_seconds, key=lambda x: prefix_seconds[x], reverse=True):
+        print(
+            "  %-24s %5d classes %10.2f s"
+            % (prefix, prefix_classes[prefix], prefix_seconds[prefix])
+        )
+
+    path = critical_path(records)
+    print()
+    print(
+        "Critical path estimate: %.2f s, over %d steps:"
+        % (sum(duration(x) for x in path), len(path))
+    )
+    for record in path:
+        print(
+            "  %8.2f s  %-20s %s"
+            % (duration(record), record["stage"], record["target"])
+        )
+
+    if args.chrome_trace:
+        with open(args.chrome_trace, "w") as out_fh:
+            json.dump(chrome_trace(records), out_fh)
+
+    if args.costs_output:
+        save_costs(class_seconds, args.costs_output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script builds, from the schema model (see `/src/schema_model.py`),
+a class-by-property matrix of effective maximum cardinality and a
+class-by-class inheritance closure matrix, and saves them to a `.npz`
+file.  The CardinalityMatrix class answers mapping-coverage questions
+with vectorized operations over the two matrices.
+
+Matrix cells hold the same value resolve_max_cardinality() would give
+for the class and property, with UNBOUNDED for no ceiling and ABSENT
+for properties not on the class.  As in the stubs, a property with
+maximum cardinality 0 is treated as absent.
+"""
+
+import argparse
+import logging
+from typing import List, Set
+
+import numpy as np
+import numpy.typing as npt
+
+from schema_model import UNBOUNDED, SchemaModel, load_schema_model
+
+ABSENT = 0
+
+# Placeholder for "no ceiling declared" while taking minimums.
+_NO_CEILING = np.iinfo(np.int32).max
+
+
+class CardinalityMatrix:
+    """
+    max_cardinality[i, j] is the effective maximum cardinality of property_iris[j] on class_iris[i].
+
+    subclass_closure[i, k] is True if class_iris[i] rdfs:subClassOf* class_iris[k].
+    """
+
+    def __init__(
+        self,
+        class_iris: List[str],
+        property_iris: List[str],
+        max_cardinality: npt.NDArray[np.int32],
+        subclass_closure: npt.NDArray[np.bool_],
+    ) -> None:
+        self.class_iris = class_iris
+        self.property_iris = property_iris
+        self.max_cardinality = max_cardinality
+        self.subclass_closure = subclass_closure
+        self._class_indices = {iri: i for (i, iri) in enumerate(class_iris)}
+        self._property_indices = {iri: j for (j, iri) in enumerate(property_iris)}
+
+    def class_index(self, class_iri: str) -> int:
+        if class_iri not in self._class_indices:
+            raise KeyError("Class not in matrix: %r." % class_iri)
+        return self._class_indices[class_iri]
+
+    def property_index(self, property_iri: str) -> int:
+        if property_iri not in self._property_indices:
+            raise KeyError("Property not in matrix: %r." % property_iri)
+        return self._property_indices[property_iri]
+
+    def _class_iris_where(self, mask: npt.NDArray[np.bool_]) -> List[str]:
+        return [self.class_iris[i] for i in np.flatnonzero(mask)]
+
+    def _property_iris_where(self, mask: npt.NDArray[np.bool_]) -> List[str]:
+        return [self.property_iris[j] for j in np.flatnonzero(mask)]
+
+    def subclasses_of(self, class_iri: str) -> List[str]:
+        """
+        Classes that are rdfs:subClassOf* the class, including the class itself.
+        """
+        return self._class_iris_where(
+            self.subclass_closure[:, self.class_index(class_iri)]
+        )
+
+    def classes_with_property(self, property_iri: str) -> List[str]:
+        column = self.max_cardinality[:, self.property_index(property_iri)]
+        return self._class_iris_where(column != ABSENT)
+
+    def classes_with_unbounded(self, property_iri: str) -> List[str]:
+        column = self.max_cardinality[:, self.property_index(property_iri)]
+        return self._class_iris_where(column == UNBOUNDED)
+
+    def properties_with_max_cardinality_on_subclasses(
+        self, class_iri: str, max_cardinality: int
+    ) -> List[str]:
+        """
+        Properties whose effective maximum cardinality is max_cardinality on the class and every one of its subclasses.
+        """
+        rows = self.max_cardinality[
+            self.subclass_closure[:, self.class_index(class_iri)]
+        ]
+        return self._property_iris_where(np.all(rows == max_cardinality, axis=0))
+
+    def single_valued_properties_on_subclasses(self, class_iri: str) -> List[str]:
+        return self.properties_with_max_cardinality_on_subclasses(class_iri, 1)
+
+    def save(self, out_path: str) -> None:
+        np.savez_compressed(
+            out_path,
+            class_iris=np.array(self.class_iris, dtype=np.str_),
+            property_iris=np.array(self.property_iris, dtype=np.str_),
+            max_cardinality=self.max_cardinality,
+            subclass_closure=self.subclass_closure,
+        )
+
+    @classmethod
+    def load(cls, in_path: str) -> "CardinalityMatrix":
+        with np.load(in_path, allow_pickle=False) as npz:
+            return cls(
+                npz["class_iris"].tolist(),
+                npz["property_iris"].tolist(),
+                npz["max_cardinality"],
+                npz["subclass_closure"],
+            )
+
+
+def build_cardinality_matrix(model: SchemaModel) -> CardinalityMatrix:
+    """
+    >>> import rdflib
+    >>> from schema_model import build_schema_model
+    >>> g = rdflib.Graph()
+    >>> data = '''\
+@prefix ex: <http://example.org/ontology/> .\
+@prefix owl: <http://www.w3.org/2002/07/owl#> .\
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .\
+@prefix sh: <http://www.w3.org/ns/shacl#> .\
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .\
+\
+ex:A\
+  a owl:Class , sh:NodeShape ;\
+  sh:property\
+    [\
+      sh:maxCount 1 ;\
+      sh:path ex:foo ;\
+    ] ,\
+    [\
+      sh:path ex:bar ;\
+    ]\
+    ;\
+  .\
+\
+ex:B\
+  a owl:Class , sh:NodeShape ;\
+  rdfs:subClassOf ex:A ;\
+  sh:property [\
+    sh:maxCount 2 ;\
+    sh:path ex:baz ;\
+  ] ;\
+  .\
+\
+ex:C\
+  a owl:Class ;\
+  .\
+'''
+    >>> _ = g.parse(data=data, format="turtle")
+    >>> matrix = build_cardinality_matrix(build_schema_model(g))
+    >>> matrix.class_iris
+    ['http://example.org/ontology/A', 'http://example.org/ontology/B', 'http://example.org/ontology/C']
+    >>> matrix.property_iris
+    ['http://example.org/ontology/bar', 'http://example.org/ontology/baz', 'http://example.org/ontology/foo']
+    >>> matrix.max_cardinality.tolist()
+    [[-1, 0, 1], [-1, 2, 1], [0, 0, 0]]
+    >>> matrix.classes_with_unbounded("http://example.org/ontology/bar")
+    ['http://example.org/ontology/A', 'http://example.org/ontology/B']
+    >>> matrix.subclasses_of("http://example.org/ontology/A")
+    ['http://example.org/ontology/A', 'http://example.org/ontology/B']
+    >>> matrix.single_valued_properties_on_subclasses("http://example.org/ontology/A")
+    ['http://example.org/ontology/foo']
+    """
+    n_nodes = len(model.iris)
+    class_ids = sorted(
+        (i for i in range(n_nodes) if model.is_class(i)), key=model.iris.__getitem__
+    )
+
+    candidate_property_ids: Set[int] = set()
+    for i in range(n_nodes):
+        candidate_property_ids.update(x[0] for x in model.cardinality_rows(i))
+        candidate_property_ids.update(model.domain_properties(i))
+    property_ids = sorted(candidate_property_ids, key=model.iris.__getitem__)
+    property_columns = {i_property: j for (j, i_property) in enumerate(property_ids)}
+
+    # Inheritance closure over all interned concepts, as superclasses
+    # need not be declared owl:Classes.
+    node_closure = np.zeros((n_nodes, n_nodes), dtype=np.bool_)
+    for i in range(n_nodes):
+        node_closure[i, list(model.superclass_closure(i))] = True
+
+    # Direct associations and ceilings, before inheritance.
+    direct_present = np.zeros((n_nodes, len(property_ids)), dtype=np.bool_)
+    direct_ceiling = np.full((n_nodes, len(property_ids)), _NO_CEILING, dtype=np.int32)
+    for i in range(n_nodes):
+        for i_property, max_count in model.cardinality_rows(i):
+            j = property_columns[i_property]
+            direct_present[i, j] = True
+            if max_count != UNBOUNDED:
+                direct_ceiling[i, j] = min(direct_ceiling[i, j], max_count)
+        for i_property in model.domain_properties(i):
+            direct_present[i, property_columns[i_property]] = True
+
+    class_closure = node_closure[class_ids]
+    present = (class_closure.astype(np.float32) @ direct_present.astype(np.float32)) > 0
+    ceiling = np.empty((len(class_ids), len(property_ids)), dtype=np.int32)
+    for k, row in enumerate(class_closure):
+        ceiling[k] = direct_ceiling[row].min(axis=0)
+    max_cardinality = np.where(
+        present,
+        np.where(ceiling == _NO_CEILING, UNBOUNDED, ceiling),
+        ABSENT,
+    ).astype(np.int32)
+
+    # Drop properties not found on any class.
+    used_columns = np.flatnonzero(present.any(axis=0))
+    property_ids = [property_ids[j] for j in used_columns]
+    max_cardinality = max_cardinality[:, used_columns]
+
+    return CardinalityMatrix(
+        [model.iris[i] for i in class_ids],
+        [model.iris[j] for j in property_ids],
+        max_cardinality,
+        class_closure[:, class_ids],
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument("out_npz")
+    parser.add_argument("schema_model", help="Schema model pickle.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    model = load_schema_model(args.schema_model)
+    matrix = build_cardinality_matrix(model)
+    logging.debug("matrix.max_cardinality.shape = %r.", matrix.max_cardinality.shape)
+    matrix.save(args.out_npz)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script confirms the triple-store backends (see
+`/src/graph_backend.py`) give identical generator outputs.  For every
+class with a directory under `/templates`, the JSON stub and the DOT
+source are generated against each backend and compared with the output
+of the rdflib backend.  The Facet cardinality graph is also compared,
+up to blank node labels.
+
+Exits non-zero if any output differs.
+"""
+
+import argparse
+import concurrent.futures
+import logging
+import os
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+from rdflib import Graph, URIRef
+from rdflib.compare import isomorphic
+
+import facet_cardinalities_ttl
+from graph_backend import BACKENDS
+from verify_templates import (
+    generate_from_graphs,
+    load_generation_graphs,
+    template_class_iris,
+)
+
+# Per-process state, set by _initialize_worker.
+# Backend name -> (JSON generation graph, DOT generation graph).
+_graphs: Dict[str, Tuple[Graph, Graph]] = dict()
+
+
+def _initialize_worker(
+    backends: List[str], supplemental_graph_filenames: List[str]
+) -> None:
+    for backend in backends:
+        logging.debug("Loading %s graphs.", backend)
+        _graphs[backend] = load_generation_graphs(supplemental_graph_filenames, backend)
+
+
+def _check_class(n_class: URIRef) -> List[str]:
+    """
+    Returns descriptions of mismatches.
+    """
+    mismatches: List[str] = []
+    reference: Optional[Tuple[str, str]] = None
+    for backend in _graphs:
+        outputs = generate_from_graphs(*_graphs[backend], n_class)
+        if reference is None:
+            reference = outputs
+            continue
+        for kind, reference_text, text in zip(("JSON", "DOT"), reference, outputs):
+            if text != reference_text:
+                mismatches.append("%s: %s differs for %s." % (n_class, kind, backend))
+    return mismatches
+
+
+def _facet_cardinalities(backend: str) -> Graph:
+    # The facet_cardinalities_ttl script writes its graph to a file, so
+    # its query logic is exercised through main().
+    with tempfile.TemporaryDirectory() as tmpdir:
+        out_path = os.path.join(tmpdir, "facet_cardinalities.ttl")
+        saved_argv = sys.argv
+        sys.argv = ["facet_cardinalities_ttl.py", "--backend", backend, out_path]
+        try:
+            facet_cardinalities_ttl.main()
+        finally:
+            sys.argv = saved_argv
+        graph = Graph()
+        graph.parse(out_path)
+    return graph
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes.  Each worker loads every backend's graphs.",
+    )
+    parser.add_argument("templates_dir")
+    parser.add_argument("supplemental_graph", nargs="*")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    mismatches: List[str] = []
+
+    reference_facet_cardinalities = _facet_cardinalities(BACKENDS[0])
+    for backend in BACKENDS[1:]:
+        if not isomorphic(reference_facet_cardinalities, _facet_cardinalities(backend)):
+            mismatches.append("Facet cardinality graph differs for %s." % backend)
+
+    n_classes = template_class_iris(args.templates_dir)
+    logging.info(
+        "Comparing %d classes across backends %s.", len(n_classes), ", ".join(BACKENDS)
+    )
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=args.jobs,
+        initializer=_initialize_worker,
+        initargs=(BACKENDS, args.supplemental_graph),
+    ) as executor:
+        for class_mismatches in executor.map(_check_class, n_classes, chunksize=8):
+            mismatches.extend(class_mismatches)
+
+    for mismatch in mismatches:
+        logging.error(mismatch)
+    if mismatches:
+        sys.exit(1)
+    logging.info("All backends agree.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script is a differential test of the generators' query logic.  The
+SPARQL implementations, evaluated by rdflib, are the reference:
+get_properties, resolve_max_cardinality and get_facet_classes of
+`/src/generate_single_stub_json.py`, and get_classes_to_display and
+get_triples_to_display of `/src/generate_single_stub_dot.py`.  Each
+alternate implementation in IMPLEMENTATIONS is compared against them:
+
+* `model`: The schema model (see `/src/schema_model.py`).
+* `oxigraph`: The same SPARQL, evaluated by Oxigraph (see
+  `/src/graph_backend.py`).
+
+A new or optimized implementation is checked by adding a subclass of
+Implementation to IMPLEMENTATIONS.
+
+A sample of the named classes of the CASE ontology (with any
+supplemental graphs) is compared, and every class of a number of
+randomly generated ontologies.  `--full` compares every CASE class and
+more random ontologies; it takes several minutes on one CPU, most of it
+evaluating the reference SPARQL.  These combine subclass chains and cycles, metaclasses,
+SHACL property shapes, OWL cardinality restrictions, union domains and
+union classes, and Facet restrictions, some naming classes that are not
+Facets.  Each is generated from a seed, so a mismatch can be reproduced
+with `--seed`, which also picks the sample of CASE classes.  Classes and random ontologies are spread across worker
+processes.
+
+Exits non-zero if any result differs.
+"""
+
+import argparse
+import concurrent.futures
+import logging
+import os
+import random
+import sys
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from case_utils.namespace import NS_OWL, NS_RDF, NS_RDFS, NS_UCO_CORE, NS_XSD
+from rdflib import SH, BNode, Graph, Literal, Namespace, URIRef
+from rdflib.collection import Collection
+
+import generate_single_stub_dot
+import generate_single_stub_json
+from graph_backend import load_ontology_graph, new_graph
+from schema_model import SchemaModel, build_schema_model
+
+Triple = Tuple[URIRef, URIRef, URIRef]
+
+
+class Implementation:
+    """
+    The operations compared, for the classes of one graph.
+    """
+
+    def properties(self, n_class: URIRef) -> Set[URIRef]:
+        raise NotImplementedError
+
+    def max_cardinality(self, n_class: URIRef, n_property: URIRef) -> Optional[int]:
+        raise NotImplementedError
+
+    def facet_classes(self, n_class: URIRef) -> Set[URIRef]:
+        raise NotImplementedError
+
+    def classes_to_display(self, n_class: URIRef) -> Set[URIRef]:
+        raise NotImplementedError
+
+    def triples_to_display(self, n_classes_to_display: Set[URIRef]) -> Set[Triple]:
+        raise NotImplementedError
+
+
+class SparqlImplementation(Implementation):
+    """
+    The generators' SPARQL queries, against copies of the graph in a backend's store, prepared as each generator prepares its graph.
+    """
+
+    def __init__(self, graph: Graph, backend: str = "rdflib") -> None:
+        self.json_graph = new_graph(backend)
+        self.json_graph += graph
+        self.dot_graph = new_graph(backend)
+        self.dot_graph += graph
+        generate_single_stub_dot.expand_graph(self.dot_graph)
+
+    def properties(self, n_class: URIRef) -> Set[URIRef]:
+        return generate_single_stub_json.get_properties(self.json_graph, n_class)
+
+    def max_cardinality(self, n_class: URIRef, n_property: URIRef) -> Optional[int]:
+        return generate_single_stub_json.resolve_max_cardinality(
+            self.json_graph, n_class, n_property
+        )
+
+    def facet_classes(self, n_class: URIRef) -> Set[URIRef]:
+        return generate_single_stub_json.get_facet_classes(self.json_graph, n_class)
+
+    def classes_to_display(self, n_class: URIRef) -> Set[URIRef]:
+        return generate_single_stub_dot.get_classes_to_display(self.dot_graph, n_class)
+
+    def triples_to_display(self, n_classes_to_display: Set[URIRef]) -> Set[Triple]:
+        return generate_single_stub_dot.get_triples_to_display(
+            self.dot_graph, n_classes_to_display
+        )
+
+
+class ModelImplementation(Implementation):
+    def __init__(self, graph: Graph) -> None:
+        self.model: SchemaModel = build_schema_model(graph)
+
+    def _id(self, n_thing: URIRef) -> Optional[int]:
+        return self.model.id_of(str(n_thing))
+
+    def _iris(self, ids: Set[int]) -> Set[URIRef]:
+        return {URIRef(self.model.iris[x]) for x in ids}
+
+    def properties(self, n_class: URIRef) -> Set[URIRef]:
+        i_class = self._id(n_class)
+        if i_class is None:
+            return set()
+        return self._iris(self.model.get_properties(i_class))
+
+    def max_cardinality(self, n_class: URIRef, n_property: URIRef) -> Optional[int]:
+        i_class = self._id(n_class)
+        i_property = self._id(n_property)
+        if i_class is None or i_property is None:
+            return None
+        return self.model.resolve_max_cardinality(i_class, i_property)
+
+    def facet_classes(self, n_class: URIRef) -> Set[URIRef]:
+        i_class = self._id(n_class)
+        if i_class is None:
+            return set()
+        return self._iris(self.model.get_facet_classes(i_class))
+
+    def classes_to_display(self, n_class: URIRef) -> Set[URIRef]:
+        return generate_single_stub_dot.get_classes_to_display_from_model(
+            self.model, n_class
+        )
+
+    def triples_to_display(self, n_classes_to_display: Set[URIRef]) -> Set[Triple]:
+        return generate_single_stub_dot.get_triples_to_display_from_model(
+            self.model, n_classes_to_display
+        )
+
+
+REFERENCE: Callable[[Graph], Implementation] = SparqlImplementation
+
+IMPLEMENTATIONS: Dict[str, Callable[[Graph], Implementation]] = {
+    "model": ModelImplementation,
+    "oxigraph": lambda graph: SparqlImplementation(graph, "oxigraph"),
+}
+
+# Defaults sized for a check run on every change; --full runs the full
+# sweep.
+DEFAULT_CASE_CLASSES = 40
+DEFAULT_RANDOM_ONTOLOGIES = 5
+FULL_RANDOM_ONTOLOGIES = 20
+
+
+def random_ontology(seed: int, n_classes: int = 40) -> Graph:
+    """
+    Returns an ontology with the shapes of CASE's class definitions, at random.
+
+    >>> g1 = random_ontology(7)
+    >>> g2 = random_ontology(7)
+    >>> len(g1) == len(g2) and len(g1) > 200
+    True
+    >>> len(class_iris(g1))
+    57
+    """
+    rng = random.Random(seed)
+    ns = Namespace("http://example.org/ontology/random-%d/" % seed)
+    graph = Graph()
+    graph.bind("ex", ns)
+    graph.bind("uco-core", NS_UCO_CORE)
+
+    n_plain_classes = [ns["C%d" % i] for i in range(n_classes)]
+    n_facet_classes = [ns["C%dFacet" % i] for i in range(n_classes // 4)]
+    n_metaclasses = [ns["M%d" % i] for i in range(4)]
+    n_properties = [ns["p%d" % i] for i in range(n_classes // 2)]
+    n_all_classes = n_plain_classes + n_facet_classes + n_metaclasses
+
+    def _restriction(n_class: URIRef, n_property: URIRef) -> BNode:
+        n_restriction = BNode()
+        graph.add((n_class, NS_RDFS.subClassOf, n_restriction))
+        graph.add((n_restriction, NS_RDF.type, NS_OWL.Restriction))
+        graph.add((n_restriction, NS_OWL.onProperty, n_property))
+        return n_restriction
+
+    def _list(n_members: Sequence[URIRef]) -> BNode:
+        n_list = BNode()
+        Collection(graph, n_list, list(n_members))
+        return n_list
+
+    def _count() -> Literal:
+        return Literal(rng.choice([0, 1, 1, 2, 3]), datatype=NS_XSD.nonNegativeInteger)
+
+    for n_class in n_all_classes + [NS_UCO_CORE.Facet]:
+        graph.add((n_class, NS_RDF.type, NS_OWL.Class))
+
+    # Hierarchies, with an occasional cycle.
+    for i, n_class in enumerate(n_plain_classes):
+        for n_superclass in rng.sample(
+            n_plain_classes[:i], min(i, rng.choice([0, 1, 1, 2]))
+        ):
+            graph.add((n_class, NS_RDFS.subClassOf, n_superclass))
+        if rng.random() < 0.3:
+            graph.add((n_class, NS_RDF.type, SH.NodeShape))
+        if rng.random() < 0.1:
+            graph.add((n_class, NS_RDF.type, rng.choice(n_metaclasses)))
+    if rng.random() < 0.3:
+        n_a, n_b = rng.sample(n_plain_classes, 2)
+        graph.add((n_a, NS_RDFS.subClassOf, n_b))
+        graph.add((n_b, NS_RDFS.subClassOf, n_a))
+    for i, n_facet_class in enumerate(n_facet_classes):
+        # Most Facet classes descend from uco-core:Facet.
+        n_superclass = rng.choice(
+            [NS_UCO_CORE.Facet] * 3 + n_facet_classes[:i] + n_plain_classes[:1]
+        )
+        graph.add((n_facet_class, NS_RDFS.subClassOf, n_superclass))
+    for i, n_metaclass in enumerate(n_metaclasses[1:], start=1):
+        graph.add((n_metaclass, NS_RDFS.subClassOf, rng.choice(n_metaclasses[:i])))
+
+    # Facet restrictions, some on classes that are not Facets.
+    for n_class in n_plain_classes:
+        if rng.random() < 0.3:
+            n_restriction = _restriction(n_class, NS_UCO_CORE.hasFacet)
+            n_on_class = rng.choice(n_facet_classes + n_plain_classes[:2])
+            graph.add((n_restriction, NS_OWL.onClass, n_on_class))
+            graph.add(
+                (
+                    n_restriction,
+                    NS_OWL.qualifiedCardinality,
+                    Literal(1, datatype=NS_XSD.nonNegativeInteger),
+                )
+            )
+
+    # Property domains, of one class or a union.
+    for n_property in n_properties:
+        roll = rng.random()
+        if roll < 0.5:
+            graph.add((n_property, NS_RDFS.domain, rng.choice(n_plain_classes)))
+        elif roll < 0.7:
+            n_union = BNode()
+            graph.add((n_union, NS_RDF.type, NS_OWL.Class))
+            graph.add(
+                (
+                    n_union,
+                    NS_OWL.unionOf,
+                    _list(rng.sample(n_plain_classes, rng.choice([1, 2, 3]))),
+                )
+            )
+            graph.add((n_property, NS_RDFS.domain, n_union))
+
+    # SHACL property shapes, and OWL restrictions, with and without
+    # ceilings.
+    for n_class in n_all_classes:
+        for _ in range(rng.choice([0, 0, 1, 2])):
+            n_property_shape = BNode()
+            graph.add((n_class, SH.property, n_property_shape))
+            graph.add((n_property_shape, SH.path, rng.choice(n_properties)))
+            if rng.random() < 0.6:
+                graph.add((n_property_shape, SH.maxCount, _count()))
+        for _ in range(rng.choice([0, 0, 1])):
+            n_restriction = _restriction(n_class, rng.choice(n_properties))
+            if rng.random() < 0.7:
+                graph.add(
+                    (
+                        n_restriction,
+                        rng.choice([NS_OWL.cardinality, NS_OWL.maxCardinality]),
+                        _count(),
+                    )
+                )
+
+    # Union classes, named and anonymous.
+    for i in range(rng.choice([1, 2, 3])):
+        n_union_class = ns["U%d" % i]
+        graph.add((n_union_class, NS_RDF.type, NS_OWL.Class))
+        graph.add(
+            (
+                n_union_class,
+                rng.choice([NS_OWL.unionOf, NS_OWL.disjointUnionOf]),
+                _list(rng.sample(n_plain_classes, 2)),
+            )
+        )
+    if rng.random() < 0.5:
+        n_union = BNode()
+        graph.add((n_union, NS_RDF.type, NS_OWL.Class))
+        graph.add((n_union, NS_OWL.unionOf, _list(rng.sample(n_plain_classes, 2))))
+        graph.add((rng.choice(n_plain_classes), NS_RDFS.subClassOf, n_union))
+
+    return graph
+
+
+def class_iris(graph: Graph) -> List[URIRef]:
+    return sorted(
+        {x for x in graph.subjects(NS_RDF.type, NS_OWL.Class) if isinstance(x, URIRef)}
+    )
+
+
+def class_results(implementation: Implementation, n_class: URIRef) -> Dict[str, Any]:
+    n_properties = implementation.properties(n_class)
+    n_classes_to_display = implementation.classes_to_display(n_class)
+    return {
+        "properties": n_properties,
+        "maximum cardinalities": {
+            x: implementation.max_cardinality(n_class, x) for x in n_properties
+        },
+        "Facet classes": implementation.facet_classes(n_class),
+        "classes to display": n_classes_to_display,
+        "triples to display": implementation.triples_to_display(n_classes_to_display),
+    }
+
+
+def describe_difference(expected: Any, actual: Any) -> str:
+    """
+    >>> describe_difference({1, 2}, {2, 3})
+    'missing [1]; unexpected [3]'
+    >>> describe_difference({"a": None}, {"a": 1})
+    "missing [('a', None)]; unexpected [('a', 1)]"
+    """
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        expected = set(expected.items())
+        actual = set(actual.items())
+    if isinstance(expected, set) and isinstance(actual, set):
+        return "missing %s; unexpected %s" % (
+            sorted(expected - actual, key=str),
+            sorted(actual - expected, key=str),
+        )
+    return "expected %r; got %r" % (expected, actual)
+
+
+def compare_class(
+    reference: Implementation,
+    alternates: Dict[str, Implementation],
+    n_class: URIRef,
+) -> List[str]:
+    """
+    Returns descriptions of mismatches.
+    """
+    mismatches: List[str] = []
+    expected = class_results(reference, n_class)
+    for name, alternate in alternates.items():
+        actual = class_results(alternate, n_class)
+        for aspect in expected:
+            if expected[aspect] != actual[aspect]:
+                mismatches.append(
+                    "%s: %s differ for %s: %s."
+                    % (
+                        n_class,
+                        aspect,
+                        name,
+                        describe_difference(expected[aspect], actual[aspect]),
+                    )
+                )
+    return mismatches
+
+
+def implementations(
+    graph: Graph, names: Sequence[str]
+) -> Tuple[Implementation, Dict[str, Implementation]]:
+    return (REFERENCE(graph), {x: IMPLEMENTATIONS[x](graph) for x in names})
+
+
+# Per-process state, set by _initialize_worker.
+_implementation_names: List[str] = []
+_supplemental_graph_filenames: List[str] = []
+_case_implementations: Optional[Tuple[Implementation, Dict[str, Implementation]]] = None
+
+
+def _initialize_worker(
+    implementation_names: List[str], supplemental_graph_filenames: List[str]
+) -> None:
+    _implementation_names[:] = implementation_names
+    _supplemental_graph_filenames[:] = supplemental_graph_filenames
+
+
+def _load_case_graph(supplemental_graph_filenames: Sequence[str]) -> Graph:
+    graph = load_ontology_graph(supplemental_graph_filenames)
+    for key in generate_single_stub_dot.CDO_CONTEXT:
+        graph.bind(key, generate_single_stub_dot.CDO_CONTEXT[key])
+    return graph
+
+
+def _check_case_classes(n_classes: List[URIRef]) -> List[str]:
+    global _case_implementations
+    if _case_implementations is None:
+        logging.debug("Loading CASE graphs.")
+        _case_implementations = implementations(
+            _load_case_graph(_supplemental_graph_filenames), _implementation_names
+        )
+    mismatches: List[str] = []
+    for n_class in n_classes:
+        mismatches += compare_class(*_case_implementations, n_class)
+    return mismatches
+
+
+def _check_random_ontology(seed: int) -> Tuple[int, List[str]]:
+    """
+    Returns the number of classes compared, and descriptions of mismatches.
+    """
+    graph = random_ontology(seed)
+    reference, alternates = implementations(graph, _implementation_names)
+    n_classes = class_iris(graph)
+    mismatches: List[str] = []
+    for n_class in n_classes:
+        mismatches += [
+            "Seed %d: %s" % (seed, x)
+            for x in compare_class(reference, alternates, n_class)
+        ]
+    return (len(n_classes), mismatches)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--implementation",
+        action="append",
+        choices=sorted(IMPLEMENTATIONS),
+        help="Implementation to compare against the reference.  May be repeated.  Default all.",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Compare every CASE class, and %d random ontologies unless --random-ontologies is given."
+        % FULL_RANDOM_ONTOLOGIES,
+    )
+    parser.add_argument(
+        "--case-classes",
+        type=int,
+        default=DEFAULT_CASE_CLASSES,
+        help="Number of CASE classes to compare, sampled by --seed, unless --full is given.  Default %(default)s.",
+    )
+    parser.add_argument(
+        "--random-ontologies",
+        type=int,
+        help="Number of random ontologies to compare.  Default %d, or %d with --full."
+        % (DEFAULT_RANDOM_ONTOLOGIES, FULL_RANDOM_ONTOLOGIES),
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the first random ontology, and of the sample of CASE classes.  The other ontologies' seeds follow it.",
+    )
+    parser.add_argument(
+        "--skip-case",
+        action="store_true",
+        help="Compare only random ontologies.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes.",
+    )
+    parser.add_argument("supplemental_graph", nargs="*")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    implementation_names = args.implementation or sorted(IMPLEMENTATIONS)
+    n_random_ontologies = args.random_ontologies
+    if n_random_ontologies is None:
+        n_random_ontologies = (
+            FULL_RANDOM_ONTOLOGIES if args.full else DEFAULT_RANDOM_ONTOLOGIES
+        )
+
+    n_case_classes: List[URIRef] = []
+    if not args.skip_case:
+        n_case_classes = class_iris(_load_case_graph(args.supplemental_graph))
+        if not args.full and args.case_classes < len(n_case_classes):
+            n_case_classes = sorted(
+                random.Random(args.seed).sample(n_case_classes, args.case_classes)
+            )
+    # Batches of CASE classes, so each worker loads the CASE graphs once.
+    # Batches of at most 8 classes, interleaved, still balance across
+    # workers.
+    n_batches = max(args.jobs, -(-len(n_case_classes) // 8))
+    batches = [n_case_classes[i::n_batches] for i in range(n_batches)]
+    batches = [x for x in batches if x]
+    seeds = range(args.seed, args.seed + n_random_ontologies)
+    logging.info(
+        "Comparing %s against SPARQL for %d CASE classes and %d random ontologies.",
+        ", ".join(implementation_names),
+        len(n_case_classes),
+        len(seeds),
+    )
+
+    mismatches: List[str] = []
+    n_random_classes = 0
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=args.jobs,
+        initializer=_initialize_worker,
+        initargs=(implementation_names, args.supplemental_graph),
+    ) as executor:
+        random_futures = [executor.submit(_check_random_ontology, x) for x in seeds]
+        case_futures = [executor.submit(_check_case_classes, x) for x in batches]
+        for random_future in random_futures:
+            n_classes, random_mismatches = random_future.result()
+            n_random_classes += n_classes
+            mismatches += random_mismatches
+        for case_future in case_futures:
+            mismatches += case_future.result()
+
+    for mismatch in mismatches:
+        logging.error(mismatch)
+    logging.info(
+        "Compared %d CASE classes and %d classes of random ontologies; %d mismatches.",
+        len(n_case_classes),
+        n_random_classes,
+        len(mismatches),
+    )
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
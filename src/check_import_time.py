@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script runs a command under `python -X importtime`, and fails if
+the total import time exceeds a budget, or if any forbidden module is
+imported.  It guards the start-up time of the per-class generator
+processes launched by the Make build.
+
+Usage example:
+
+    check_import_time.py --budget-ms 500 --forbid pyld -- \\
+      src/generate_single_stub_dot.py --schema-model var/schema_model.pickle \\
+      File.dot https://ontology.unifiedcyberontology.org/uco/observable/File
+"""
+
+import argparse
+import logging
+import re
+import subprocess
+import sys
+from typing import Dict, List
+
+_IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+def parse_import_times(stderr: str) -> Dict[str, int]:
+    """
+    Returns the cumulative import time, in microseconds, of each top-level import.  Nested imports are counted within their importer.
+
+    >>> stderr = '''\\
+    ... import time: self [us] | cumulative | imported package
+    ... import time:       221 |        221 |   _io
+    ... import time:       100 |        300 |   rdflib.term
+    ... import time:       500 |       1200 | rdflib
+    ... import time:        50 |         50 | json
+    ... '''
+    >>> parse_import_times(stderr)
+    {'rdflib': 1200, 'json': 50}
+    """
+    import_times: Dict[str, int] = dict()
+    for line in stderr.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if match is None:
+            continue
+        if len(match.group(3)) != 1:
+            continue
+        import_times[match.group(4)] = int(match.group(2))
+    return import_times
+
+
+def imported_modules(stderr: str) -> List[str]:
+    """
+    >>> imported_modules("import time:       500 |       1200 | rdflib\\nimport time:       100 |        300 |   rdflib.term\\n")
+    ['rdflib', 'rdflib.term']
+    """
+    modules: List[str] = []
+    for line in stderr.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if match is not None:
+            modules.append(match.group(4))
+    return modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        required=True,
+        help="Maximum total import time, in milliseconds.",
+    )
+    parser.add_argument(
+        "--forbid",
+        action="append",
+        default=[],
+        help="Module that must not be imported, including its submodules.  Can be given multiple times.",
+    )
+    parser.add_argument("command", nargs="+", help="Python script and arguments.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    completed_process = subprocess.run(
+        [sys.executable, "-X", "importtime"] + args.command,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if completed_process.returncode != 0:
+        sys.stderr.write(completed_process.stderr)
+        raise ValueError("Command failed: %r." % args.command)
+
+    import_times = parse_import_times(completed_process.stderr)
+    total_ms = sum(import_times.values()) / 1000
+    for module_name, import_time in sorted(
+        import_times.items(), key=lambda x: x[1], reverse=True
+    )[:10]:
+        logging.debug("%8.1f ms  %s", import_time / 1000, module_name)
+
+    failures: List[str] = []
+    if total_ms > args.budget_ms:
+        failures.append(
+            "Total import time %.1f ms exceeds budget of %.1f ms."
+            % (total_ms, args.budget_ms)
+        )
+    for module_name in imported_modules(completed_process.stderr):
+        for forbidden_module in args.forbid:
+            if module_name == forbidden_module or module_name.startswith(
+                forbidden_module + "."
+            ):
+                failures.append("Forbidden module imported: %s." % module_name)
+
+    for failure in failures:
+        logging.error(failure)
+    if failures:
+        sys.exit(1)
+    logging.info("Total import time %.1f ms.", total_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -55,41 +55,66 @@ ifeq ($(top_srcdir),)
 $(error top_srcdir must be given.)
 endif
 
+include $(top_srcdir)/src/build-trace.mk
+
 all: \
   $(LOCAL_NAME).svg \
-  $(LOCAL_NAME).json
+  $(LOCAL_NAME).json \
+  $(if $(SVGZ),$(LOCAL_NAME).svgz) \
+  $(if $(EXPANDED_STUBS),$(LOCAL_NAME).expanded.json $(LOCAL_NAME).nt)
 
 %.svg: \
-  %.dot
-	dot \
+  %.dot \
+  $(top_srcdir)/src/optimize_svg.py
+	$(call trace,svg,$(PREFIX_IRI)$(LOCAL_NAME)) dot \
 	  -T svg \
-	  -o _$@ \
+	  -o __$@ \
 	  $<
+	$(call trace,svg-optimize,$(PREFIX_IRI)$(LOCAL_NAME)) python3 $(top_srcdir)/src/optimize_svg.py \
+	  --output _$@ \
+	  __$@
+	rm __$@
+	mv _$@ $@
+
+# Compressed diagrams are only built if SVGZ is set, e.g. `make SVGZ=1`.
+%.svgz: \
+  %.svg
+	gzip -9 -n -c $< > _$@
 	mv _$@ $@
 
+# Options bounding the diagram's size can be given in DIAGRAM_OPTIONS,
+# e.g. `make DIAGRAM_OPTIONS="--collapse-facets --max-nodes 60"`.  See
+# `/src/generate_single_stub_dot.py`.
 $(LOCAL_NAME).dot: \
   $(top_srcdir)/.venv.done.log \
   $(top_srcdir)/src/generate_single_stub_dot.py \
   $(top_srcdir)/var/facet_cardinalities.ttl
 	rm -f _$@
 	source $(top_srcdir)/venv/bin/activate \
-	  && python3 $(top_srcdir)/src/generate_single_stub_dot.py \
+	  && $(call trace,dot,$(PREFIX_IRI)$(LOCAL_NAME)) python3 $(top_srcdir)/src/generate_single_stub_dot.py \
+	    $(DIAGRAM_OPTIONS) \
 	    _$@ \
 	    $(PREFIX_IRI)$(LOCAL_NAME) \
 	    $(top_srcdir)/var/facet_cardinalities.ttl
 	mv _$@ $@
 
-$(LOCAL_NAME).json: \
+# The stub's expanded and N-Triples forms are only built if
+# EXPANDED_STUBS is set, e.g. `make EXPANDED_STUBS=1`.  They are written
+# by the same run of the generator as the stub.
+%.json %.expanded.json %.nt: \
   $(top_srcdir)/.venv.done.log \
   $(top_srcdir)/src/generate_single_stub_json.py \
   $(top_srcdir)/var/facet_cardinalities.ttl
-	rm -f _$@
+	rm -f _$*.json _$*.expanded.json _$*.nt
 	source $(top_srcdir)/venv/bin/activate \
-	  && python3 $(top_srcdir)/src/generate_single_stub_json.py \
-	    _$@ \
-	    $(PREFIX_IRI)$(LOCAL_NAME) \
+	  && $(call trace,json,$(PREFIX_IRI)$*) python3 $(top_srcdir)/src/generate_single_stub_json.py \
+	    $(if $(EXPANDED_STUBS),--expanded-output _$*.expanded.json --ntriples-output _$*.nt) \
+	    _$*.json \
+	    $(PREFIX_IRI)$* \
 	    $(top_srcdir)/var/facet_cardinalities.ttl
-	mv _$@ $@
+	$(if $(EXPANDED_STUBS),mv _$*.expanded.json $*.expanded.json)
+	$(if $(EXPANDED_STUBS),mv _$*.nt $*.nt)
+	mv _$*.json $*.json
 
 check: \
   all
@@ -98,4 +123,6 @@ clean:
 	@rm -f \
 	  *.dot \
 	  *.json \
-	  *.svg
+	  *.nt \
+	  *.svg \
+	  *.svgz
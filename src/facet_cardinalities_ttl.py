@@ -15,28 +15,22 @@
 # We would appreciate acknowledgement if the software is used.
 
 import argparse
-import importlib.resources
 import logging
-from typing import Set
+from typing import Set, Tuple
 
 import case_utils.ontology
 from case_utils.namespace import NS_OWL, NS_RDF, NS_RDFS, NS_UCO_CORE, NS_XSD
 from rdflib import BNode, Graph, Literal, URIRef
 from rdflib.query import ResultRow
 
+from graph_backend import add_backend_arguments, load_ontology_graph
 
-def main() -> None:
-    parser = argparse.ArgumentParser()
-    parser.add_argument("out_graph")
-    args = parser.parse_args()
 
-    logging.basicConfig(level=logging.INFO)
-
-    in_graph = Graph()
+def facet_cardinality_graph(in_graph: Graph) -> Tuple[Graph, Set[URIRef]]:
+    """
+    Returns a graph requiring each UcoObject subclass to have exactly one Facet of the leaf Facet class named after it (the class IRI plus "Facet"), where there is one.  Also returns the leaf Facet classes named after no UcoObject subclass.
+    """
     out_graph = Graph()
-    ttl_data = importlib.resources.read_text(case_utils.ontology, "case-1.4.0.ttl")
-    in_graph.parse(data=ttl_data)
-    case_utils.ontology.load_subclass_hierarchy(in_graph)
 
     n_leaf_facet_classes: Set[URIRef] = set()
     leaf_facet_query = """\
@@ -100,11 +94,26 @@ WHERE {
             out_graph.add((n_uco_object_class, NS_RDFS.subClassOf, n_restriction))
             n_leaf_facet_classes_restricted.add(n_maybe_leaf_facet)
 
-    if len(n_leaf_facet_classes_restricted) < len(n_leaf_facet_classes):
+    return (out_graph, n_leaf_facet_classes - n_leaf_facet_classes_restricted)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    add_backend_arguments(parser)
+    parser.add_argument("out_graph")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    in_graph = load_ontology_graph(
+        backend=args.backend, store_path=args.store_path, ontology=args.ontology
+    )
+    case_utils.ontology.load_subclass_hierarchy(in_graph)
+
+    out_graph, n_unmatched_leaf_facet_classes = facet_cardinality_graph(in_graph)
+    if n_unmatched_leaf_facet_classes:
         logging.info("These classes had no pattern-matched UcoObject subclasses:")
-        for n_leaf_facet_class in sorted(
-            n_leaf_facet_classes - n_leaf_facet_classes_restricted
-        ):
+        for n_leaf_facet_class in sorted(n_unmatched_leaf_facet_classes):
             logging.info("* %s", str(n_leaf_facet_class))
 
     out_graph.serialize(args.out_graph)
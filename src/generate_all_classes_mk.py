@@ -22,32 +22,54 @@ classes in CASE's Investigation ontology).
 The intended execution location for this script is any 2nd-level
 directory `/templates/X`, where X is the prefix name for the ontology
 (e.g., `templates/case-investigation`).
+
+With `--costs`, a file of seconds per class written by
+`/src/build_trace_report.py`, the classes are listed longest-first, so
+under `make -j` the slowest classes start early rather than last.
 """
 
 import argparse
-import importlib.resources
+from typing import Dict, Set
 
-import case_utils.ontology
 from case_utils.namespace import NS_OWL, NS_RDF
 from rdflib import Graph, URIRef
 
+from build_costs import load_costs, longest_first
+from graph_backend import CASE_VERSION, read_ontology
+
+
+def prefix_classes(graph: Graph, prefix_iri: str) -> Set[URIRef]:
+    """
+    Returns the classes of the graph whose IRIs start with prefix_iri.
+    """
+    n_classes: Set[URIRef] = set()
+    for n_subject in graph.subjects(NS_RDF.type, NS_OWL.Class):
+        if not isinstance(n_subject, URIRef):
+            continue
+        if str(n_subject).startswith(prefix_iri):
+            n_classes.add(n_subject)
+    return n_classes
+
 
 def main() -> None:
     parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--ontology",
+        help="CASE version bundled with case_utils (default %s), or path of a Turtle file of an ontology and its imports."
+        % CASE_VERSION,
+    )
+    parser.add_argument(
+        "--costs",
+        help="Path to a JSON file of seconds per class IRI, as written by build_trace_report.py --costs-output.",
+    )
     parser.add_argument("out_mk")
     parser.add_argument("prefix_iri")
     args = parser.parse_args()
 
     graph = Graph()
-    ttl_data = importlib.resources.read_text(case_utils.ontology, "case-1.4.0.ttl")
-    graph.parse(data=ttl_data)
+    graph.parse(data=read_ontology(args.ontology), format="turtle")
 
-    n_classes: set[URIRef] = set()
-    for n_subject in graph.subjects(NS_RDF.type, NS_OWL.Class):
-        if not isinstance(n_subject, URIRef):
-            continue
-        if str(n_subject).startswith(args.prefix_iri):
-            n_classes.add(n_subject)
+    n_classes = prefix_classes(graph, args.prefix_iri)
 
     local_names: set[str] = set()
     for n_class in n_classes:
@@ -81,8 +103,15 @@ all-%s: \\
 \t  --directory %s
 """ % (local_name, local_name, local_name)
 
+    local_name_costs: Dict[str, float] = dict()
+    if args.costs:
+        class_costs = load_costs(args.costs)
+        for local_name in local_names:
+            if args.prefix_iri + local_name in class_costs:
+                local_name_costs[local_name] = class_costs[args.prefix_iri + local_name]
+
     targets_as_dependencies: str = "".join(
-        [" \\\n  " + x for x in sorted(target_to_recipe.keys()) if x.startswith("all-")]
+        [" \\\n  all-" + x for x in longest_first(local_names, local_name_costs)]
     )
 
     with open(args.out_mk, "w") as out_fh:
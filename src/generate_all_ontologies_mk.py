@@ -21,26 +21,26 @@ Observable ontology).
 
 The intended execution location for this script is the top-level
 directory `/templates`.
+
+With `--costs`, a file of seconds per class written by
+`/src/build_trace_report.py`, the ontologies are listed longest-first
+by the total seconds of their classes.
 """
 
 import argparse
-import importlib.resources
-from typing import Dict, Set
+from typing import Dict, Mapping, Set
 
-import case_utils.ontology
 from case_utils.namespace import NS_OWL, NS_RDF
 from rdflib import Graph, URIRef
 
+from build_costs import load_costs, longest_first
+from graph_backend import CASE_VERSION, read_ontology
 
-def main() -> None:
-    parser = argparse.ArgumentParser()
-    parser.add_argument("out_mk")
-    args = parser.parse_args()
-
-    graph = Graph()
-    ttl_data = importlib.resources.read_text(case_utils.ontology, "case-1.4.0.ttl")
-    graph.parse(data=ttl_data)
 
+def ontology_prefix_names(graph: Graph) -> Dict[URIRef, str]:
+    """
+    Returns the namespace IRIs of the ontologies in the graph that define classes, mapped to their prefix names (e.g. "case-investigation").
+    """
     n_classes: Set[URIRef] = set()
     for n_subject in graph.subjects(NS_RDF.type, NS_OWL.Class):
         if not isinstance(n_subject, URIRef):
@@ -74,6 +74,48 @@ def main() -> None:
         n_prefix_to_prefix_name[n_prefix] = "-".join(
             [prefix_iri_parts[-3], prefix_iri_parts[-2]]
         )
+    return n_prefix_to_prefix_name
+
+
+def prefix_costs(
+    n_prefix_to_prefix_name: Mapping[URIRef, str], class_costs: Mapping[str, float]
+) -> Dict[str, float]:
+    """
+    Returns the total seconds of the classes in each namespace, keyed by prefix name.  Namespaces without any recorded class are omitted.
+
+    >>> prefix_costs(
+    ...     {URIRef("urn:example:a/"): "a", URIRef("urn:example:b/"): "b"},
+    ...     {"urn:example:a/X": 1.5, "urn:example:a/Y": 2.0, "urn:example:a/c/Z": 4.0},
+    ... )
+    {'a': 3.5}
+    """
+    costs: Dict[str, float] = dict()
+    for n_prefix, prefix_name in n_prefix_to_prefix_name.items():
+        for class_iri, seconds in class_costs.items():
+            if class_iri.rsplit("/", 1)[0] + "/" != str(n_prefix):
+                continue
+            costs[prefix_name] = costs.get(prefix_name, 0.0) + seconds
+    return costs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--ontology",
+        help="CASE version bundled with case_utils (default %s), or path of a Turtle file of an ontology and its imports."
+        % CASE_VERSION,
+    )
+    parser.add_argument(
+        "--costs",
+        help="Path to a JSON file of seconds per class IRI, as written by build_trace_report.py --costs-output.",
+    )
+    parser.add_argument("out_mk")
+    args = parser.parse_args()
+
+    graph = Graph()
+    graph.parse(data=read_ontology(args.ontology), format="turtle")
+
+    n_prefix_to_prefix_name = ontology_prefix_names(graph)
 
     target_to_recipe: Dict[str, str] = dict()
     for n_prefix in n_prefix_to_prefix_name:
@@ -86,7 +128,14 @@ all-%s:
 \t  --directory %s
 """ % (prefix_name, str(n_prefix), prefix_name)
 
+    costs: Dict[str, float] = dict()
+    if args.costs:
+        costs = prefix_costs(n_prefix_to_prefix_name, load_costs(args.costs))
+
     with open(args.out_mk, "w") as out_fh:
+        dependencies_formatted = " \\\n  ".join(
+            "all-" + x for x in longest_first(n_prefix_to_prefix_name.values(), costs)
+        )
         targets_formatted = " \\\n  ".join(sorted(target_to_recipe.keys()))
         out_fh.write("""\
 #!/usr/bin/make -f
@@ -121,7 +170,7 @@ check: \\
   all
 
 clean:
-""" % (targets_formatted, targets_formatted))
+""" % (dependencies_formatted, targets_formatted))
 
         for target in sorted(target_to_recipe):
             out_fh.write(target_to_recipe[target])
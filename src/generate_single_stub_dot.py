@@ -17,12 +17,12 @@
 __version__ = "0.0.2"
 
 import argparse
+import collections
 import hashlib
-import importlib.resources
+import io
 import logging
-from typing import cast
+from typing import Callable, Optional, cast
 
-import case_utils.ontology
 from case_utils.namespace import (
     NS_CASE_INVESTIGATION,
     NS_CASE_VOCABULARY,
@@ -50,6 +50,19 @@ from rdflib import SH, Graph, Namespace, URIRef
 from rdflib.query import ResultRow
 from rdflib.term import IdentifiedNode
 
+from build_trace import trace_stage
+from graph_backend import add_backend_arguments, load_ontology_graph
+from namespace_index import NamespaceIndex
+from output_cache import (
+    add_output_cache_arguments,
+    input_digests,
+    open_output_cache,
+    request_key,
+    write_outputs,
+)
+from schema_model import SchemaModel, load_schema_model
+from sparql_queries import register_query, run_query
+
 CDO_CONTEXT: dict[str, Namespace] = {
     "case-investigation": NS_CASE_INVESTIGATION,
     "case-vocabulary": NS_CASE_VOCABULARY,
@@ -79,6 +92,12 @@ N_HAS_FACET_AT_CLASS_LEVEL = URIRef("urn:example:hasFacetAtClassLevel")
 
 NS_SH = SH
 
+# Modeling classes, not drawn.
+CLASSES_TO_NOT_DISPLAY = {NS_OWL.Class, NS_OWL.Restriction, NS_SH.NodeShape}
+
+# Namespace of the summary nodes standing for collapsed Facet classes.
+NS_FACET_SUMMARY = Namespace("urn:example:facetSummary:")
+
 
 def iri_to_gv_node_id(n_thing: IdentifiedNode) -> str:
     """
@@ -94,38 +113,9 @@ def iri_to_gv_node_id(n_thing: IdentifiedNode) -> str:
     return "_" + hasher.hexdigest()
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--debug", action="store_true")
-    parser.add_argument("out_dot")
-    parser.add_argument("class_iri")
-    parser.add_argument("supplemental_graph", nargs="*")
-    args = parser.parse_args()
-
-    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
-
-    graph = Graph()
-    ttl_data = importlib.resources.read_text(case_utils.ontology, "case-1.4.0.ttl")
-    graph.parse(data=ttl_data)
-    logging.debug("len(graph) = %d.", len(graph))
-
-    if args.supplemental_graph:
-        for supplemental_graph_filename in args.supplemental_graph:
-            logging.debug("Loading %r.", supplemental_graph_filename)
-            graph.parse(supplemental_graph_filename)
-            logging.debug("len(graph) = %d.", len(graph))
-
-    for key in CDO_CONTEXT:
-        graph.bind(key, CDO_CONTEXT[key])
-
-    n_subject_class = URIRef(args.class_iri)
-    if (n_subject_class, NS_RDF.type, NS_OWL.Class) not in graph:
-        raise ValueError(
-            "Requested class IRI not found in CASE graph: %r." % args.class_iri
-        )
-
-    for construct_query in [
-        """\
+EXPAND_UNIONS_QUERY = register_query(
+    "dot:expand-unions",
+    """\
 # 'Expand' syntax of OWL unions to get entailed direct-subclass relationships.
 # For OWL syntax notes on union forms, see tables 16 and 18 here:
 # https://www.w3.org/TR/2012/REC-owl2-mapping-to-rdf-20121211/
@@ -139,7 +129,11 @@ CONSTRUCT {
   FILTER (isIRI(?nSuperclass))
 }
 """,
-        """\
+)
+
+EXPAND_FACETS_QUERY = register_query(
+    "dot:expand-facets",
+    """\
 # 'Expand' model to add quick-link for Facet classes.
 PREFIX uco-core: <https://ontology.unifiedcyberontology.org/uco/core/>
 CONSTRUCT {
@@ -156,9 +150,16 @@ CONSTRUCT {
     .
 }
 """,
-    ]:
+)
+
+
+def expand_graph(graph: Graph) -> None:
+    """
+    Add to the graph entailed direct-subclass relationships from OWL union class expressions, and the quick-link predicate N_HAS_FACET_AT_CLASS_LEVEL.
+    """
+    for construct_query in [EXPAND_UNIONS_QUERY, EXPAND_FACETS_QUERY]:
         new_triples: set[tuple[URIRef, URIRef, URIRef]] = set()
-        for construct_result in graph.query(construct_query):
+        for construct_result in run_query(graph, construct_query):
             assert isinstance(construct_result, tuple)
             assert isinstance(construct_result[0], URIRef)
             assert isinstance(construct_result[1], URIRef)
@@ -173,8 +174,10 @@ CONSTRUCT {
         for new_triple in new_triples:
             graph.add(new_triple)
 
-    n_classes_to_display: set[URIRef] = {n_subject_class}
-    query = """\
+
+CLASSES_TO_DISPLAY_QUERY = register_query(
+    "dot:classes-to-display",
+    """\
 SELECT ?nRelatedClass
 WHERE {
   {
@@ -195,12 +198,27 @@ WHERE {
   }
   FILTER (isIRI(?nRelatedClass))
 }
-"""
-    for result in graph.query(query, initBindings={"nClass": n_subject_class}):
+""",
+)
+
+
+def get_classes_to_display(graph: Graph, n_subject_class: URIRef) -> set[URIRef]:
+    """
+    Precondition: expand_graph() has been run on the graph.
+    """
+    n_classes_to_display: set[URIRef] = {n_subject_class}
+    for result in run_query(
+        graph, CLASSES_TO_DISPLAY_QUERY, {"nClass": n_subject_class}
+    ):
         assert isinstance(result, ResultRow)
         assert isinstance(result[0], URIRef)
         n_classes_to_display.add(result[0])
+    return n_classes_to_display
+
 
+def get_triples_to_display(
+    graph: Graph, n_classes_to_display: set[URIRef]
+) -> set[tuple[URIRef, URIRef, URIRef]]:
     triples_to_display: set[tuple[URIRef, URIRef, URIRef]] = set()
     for n_class in n_classes_to_display:
         for n_linking_predicate in [
@@ -211,102 +229,318 @@ WHERE {
             for n_object in graph.objects(n_class, n_linking_predicate):
                 if isinstance(n_object, URIRef):
                     triples_to_display.add((n_class, n_linking_predicate, n_object))
+    return triples_to_display
+
+
+def get_classes_to_display_from_model(
+    model: SchemaModel, n_subject_class: URIRef
+) -> set[URIRef]:
+    """
+    Equivalent of get_classes_to_display, drawing from a SchemaModel instead of an expanded Graph.
+    """
+    i_subject_class = model.id_of(str(n_subject_class))
+    assert i_subject_class is not None
+    hierarchy = model.superclass_closure(i_subject_class, True)
+    related_classes: set[int] = set(hierarchy)
+    for i_class in hierarchy:
+        i_metaclasses = model.types(i_class)
+        i_metaclasses += model.anonymous_superclass_types(i_class)
+        for i_metaclass in i_metaclasses:
+            related_classes |= model.superclass_closure(i_metaclass, True)
+        for i_facet_class in model.direct_facet_classes(i_class, True):
+            related_classes |= model.superclass_closure(i_facet_class, True)
+    return {n_subject_class} | {URIRef(model.iris[x]) for x in related_classes}
+
+
+def get_triples_to_display_from_model(
+    model: SchemaModel, n_classes_to_display: set[URIRef]
+) -> set[tuple[URIRef, URIRef, URIRef]]:
+    """
+    Equivalent of get_triples_to_display, drawing from a SchemaModel instead of an expanded Graph.
+    """
+    triples_to_display: set[tuple[URIRef, URIRef, URIRef]] = set()
+    for n_class in n_classes_to_display:
+        i_class = model.id_of(str(n_class))
+        if i_class is None:
+            continue
+        for n_linking_predicate, i_objects in [
+            (N_HAS_FACET_AT_CLASS_LEVEL, model.direct_facet_classes(i_class, True)),
+            (NS_RDF.type, model.types(i_class)),
+            (NS_RDFS.subClassOf, model.superclasses(i_class, True)),
+        ]:
+            for i_object in i_objects:
+                triples_to_display.add(
+                    (n_class, n_linking_predicate, URIRef(model.iris[i_object]))
+                )
+    return triples_to_display
+
+
+def bound_display_sets(
+    n_subject_class: URIRef,
+    n_classes_to_display: set[URIRef],
+    triples_to_display: set[tuple[URIRef, URIRef, URIRef]],
+    max_depth: Optional[int] = None,
+    max_nodes: Optional[int] = None,
+    collapse_facets: bool = False,
+) -> tuple[
+    set[URIRef],
+    set[tuple[URIRef, URIRef, URIRef]],
+    dict[URIRef, list[URIRef]],
+    list[str],
+]:
+    """
+    Reduce the display-sets to a bounded diagram.  Returns the reduced display-sets, the summary nodes standing for collapsed Facet classes with the classes each stands for, and notes of what was omitted, for the legend.
+
+    If collapse_facets is true, the Facet classes of each class are replaced by one summary node, and classes only reached through Facet classes are omitted.  Then classes more than max_depth edges from the subject class are omitted, and the classes beyond the first max_nodes nearest it.
+
+    >>> ns = Namespace("http://example.org/ontology/")
+    >>> classes = {ns.A, ns.B, ns.C, ns.D, ns.AFacet, ns.BFacet, ns.Facet}
+    >>> triples = {
+    ...     (ns.A, NS_RDFS.subClassOf, ns.B),
+    ...     (ns.B, NS_RDFS.subClassOf, ns.C),
+    ...     (ns.C, NS_RDFS.subClassOf, ns.D),
+    ...     (ns.A, N_HAS_FACET_AT_CLASS_LEVEL, ns.AFacet),
+    ...     (ns.A, N_HAS_FACET_AT_CLASS_LEVEL, ns.BFacet),
+    ...     (ns.AFacet, NS_RDFS.subClassOf, ns.Facet),
+    ...     (ns.BFacet, NS_RDFS.subClassOf, ns.Facet),
+    ... }
+    >>> classes2, triples2, summaries, notes = bound_display_sets(ns.A, classes, triples, max_depth=2, collapse_facets=True)
+    >>> sorted(x.removeprefix(str(ns)) for x in classes2 if x not in summaries)
+    ['A', 'B', 'C']
+    >>> [[y.removeprefix(str(ns)) for y in x] for x in summaries.values()]
+    [['AFacet', 'BFacet']]
+    >>> notes
+    ['2 Facet classes of 1 class collapsed, omitting 1 class of their hierarchies.', '1 node more than 2 edges away omitted.']
+    >>> classes3, _, _, notes = bound_display_sets(ns.A, classes, triples, max_nodes=3)
+    >>> sorted(x.removeprefix(str(ns)) for x in classes3)
+    ['A', 'AFacet', 'B']
+    >>> notes
+    ['4 nodes beyond the limit of 3 omitted.']
+    """
+
+    def _count(count: int, noun: str) -> str:
+        if count != 1:
+            noun += "es" if noun.endswith("s") else "s"
+        return "%d %s" % (count, noun)
+
+    n_classes = {x for x in n_classes_to_display if x not in CLASSES_TO_NOT_DISPLAY}
+    triples = {
+        x
+        for x in triples_to_display
+        if x[0] not in CLASSES_TO_NOT_DISPLAY and x[2] not in CLASSES_TO_NOT_DISPLAY
+    }
+    summaries: dict[URIRef, list[URIRef]] = dict()
+    notes: list[str] = []
+
+    def _distances(
+        follow: Callable[[tuple[URIRef, URIRef, URIRef]], bool],
+    ) -> dict[URIRef, int]:
+        """
+        Breadth-first distances from the subject class, along the triples follow accepts.
+        """
+        successors: dict[URIRef, set[URIRef]] = collections.defaultdict(set)
+        for triple in triples:
+            if follow(triple):
+                successors[triple[0]].add(triple[2])
+        distances = {n_subject_class: 0}
+        queue = collections.deque([n_subject_class])
+        while queue:
+            n_class = queue.popleft()
+            for n_successor in sorted(successors[n_class]):
+                if n_successor not in distances:
+                    distances[n_successor] = distances[n_class] + 1
+                    queue.append(n_successor)
+        return distances
+
+    def _keep(n_kept_classes: set[URIRef]) -> None:
+        n_classes.intersection_update(n_kept_classes)
+        triples.difference_update(
+            [x for x in triples if x[0] not in n_classes or x[2] not in n_classes]
+        )
+
+    if collapse_facets:
+        n_core_classes = set(
+            _distances(lambda x: x[1] != N_HAS_FACET_AT_CLASS_LEVEL)
+        ) | {x for x in n_classes if x not in _distances(lambda x: True)}
+        facet_triples = sorted(
+            x
+            for x in triples
+            if x[1] == N_HAS_FACET_AT_CLASS_LEVEL and x[2] not in n_core_classes
+        )
+        n_collapsed_classes: set[URIRef] = set()
+        for n_bearer, _, n_facet_class in facet_triples:
+            n_summary = NS_FACET_SUMMARY[str(n_bearer)]
+            summaries.setdefault(n_summary, []).append(n_facet_class)
+            n_collapsed_classes.add(n_facet_class)
+        n_omitted_classes = n_classes - n_core_classes - n_collapsed_classes
+        _keep(n_core_classes)
+        for n_summary, n_facet_classes in summaries.items():
+            n_bearer = URIRef(n_summary.removeprefix(str(NS_FACET_SUMMARY)))
+            n_classes.add(n_summary)
+            triples.add((n_bearer, N_HAS_FACET_AT_CLASS_LEVEL, n_summary))
+        if summaries:
+            notes.append(
+                "%s of %s collapsed, omitting %s of their hierarchies."
+                % (
+                    _count(len(n_collapsed_classes), "Facet class"),
+                    _count(len(summaries), "class"),
+                    _count(len(n_omitted_classes), "class"),
+                )
+            )
+
+    distances = _distances(lambda x: True)
+    if max_depth is not None:
+        n_deep_classes = {
+            x for x in n_classes if distances.get(x, max_depth + 1) > max_depth
+        }
+        if n_deep_classes:
+            _keep(n_classes - n_deep_classes)
+            notes.append(
+                "%s more than %d edges away omitted."
+                % (_count(len(n_deep_classes), "node"), max_depth)
+            )
+    if max_nodes is not None and len(n_classes) > max_nodes:
+        n_ordered_classes = sorted(
+            n_classes, key=lambda x: (distances.get(x, len(distances)), x)
+        )
+        _keep(set(n_ordered_classes[:max_nodes]))
+        notes.append(
+            "%s beyond the limit of %d omitted."
+            % (_count(len(n_ordered_classes) - max_nodes, "node"), max_nodes)
+        )
+
+    summaries = {x: y for (x, y) in summaries.items() if x in n_classes}
+    return n_classes, triples, summaries, notes
+
+
+def render_dot(
+    n_classes_to_display: set[URIRef],
+    triples_to_display: set[tuple[URIRef, URIRef, URIRef]],
+    qname: Callable[[URIRef], str],
+    summaries: Optional[dict[URIRef, list[URIRef]]] = None,
+    notes: Optional[list[str]] = None,
+    layout: Optional[str] = None,
+) -> str:
+    """
+    Render the display-sets as a Dot digraph.  qname is used to make node labels.  summaries and notes are as returned by bound_display_sets: summary nodes are drawn as folders, with the classes they stand for in their tooltips, and notes are listed in the legend.  layout names a Graphviz layout engine to use instead of dot.
+    """
+    summaries = summaries or dict()
+    notes = notes or []
 
     # Reduce display-sets: Cut modeling classes.
-    classes_to_not_display = {NS_OWL.Class, NS_OWL.Restriction, NS_SH.NodeShape}
     filtered_classes = [
-        x for x in n_classes_to_display if x not in classes_to_not_display
+        x
+        for x in n_classes_to_display
+        if x not in CLASSES_TO_NOT_DISPLAY and x not in summaries
     ]
     filtered_triples = [
         x
         for x in triples_to_display
-        if x[0] not in classes_to_not_display and x[2] not in classes_to_not_display
+        if x[0] not in CLASSES_TO_NOT_DISPLAY and x[2] not in CLASSES_TO_NOT_DISPLAY
     ]
 
-    with open(args.out_dot, "w") as out_fh:
-        out_fh.write("""\
+    out_fh = io.StringIO()
+    out_fh.write("""\
 digraph "hierarchy" {
 \trankdir="BT";
+""")
+    if layout is not None:
+        out_fh.write("""\
+\tlayout="%s";
+""" % layout)
+    out_fh.write("""\
 \t//Nodes
 """)
-        for n_class in sorted(filtered_classes):
-            out_fh.write(
-                """\
+    for n_class in sorted(filtered_classes):
+        out_fh.write(
+            """\
 \t%s [label="%s" tooltip="%s"];
 """
-                % (
-                    iri_to_gv_node_id(n_class),
-                    graph.namespace_manager.qname(n_class),
-                    str(n_class),
-                )
+            % (
+                iri_to_gv_node_id(n_class),
+                qname(n_class),
+                str(n_class),
             )
-        out_fh.write("""\
+        )
+    for n_summary in sorted(summaries):
+        out_fh.write(
+            """\
+\t%s [label="%d Facet class%s" shape="folder" tooltip="%s"];
+"""
+            % (
+                iri_to_gv_node_id(n_summary),
+                len(summaries[n_summary]),
+                "" if len(summaries[n_summary]) == 1 else "es",
+                "\\n".join(qname(x) for x in summaries[n_summary]),
+            )
+        )
+    out_fh.write("""\
 \t//Edges
 """)
-        for triple in sorted(filtered_triples):
-            # NOTE - Code here has a currently-fragile manual
-            # synchronization need with code in the legend-rendering
-            # block below.  A function may better suit this.
-            edge_label = {
-                N_HAS_FACET_AT_CLASS_LEVEL: "",
-                NS_RDF.type: "∈",
-                NS_RDFS.subClassOf: "⊂",
-            }[triple[1]]
-            head_arrow = {
-                N_HAS_FACET_AT_CLASS_LEVEL: "dot",
-            }.get(triple[1], "normal")
-            head_label = {
-                N_HAS_FACET_AT_CLASS_LEVEL: "0..1",
-            }.get(triple[1], "")
-            out_fh.write(
-                """\
+    for triple in sorted(filtered_triples):
+        # NOTE - Code here has a currently-fragile manual
+        # synchronization need with code in the legend-rendering
+        # block below.  A function may better suit this.
+        edge_label = {
+            N_HAS_FACET_AT_CLASS_LEVEL: "",
+            NS_RDF.type: "∈",
+            NS_RDFS.subClassOf: "⊂",
+        }[triple[1]]
+        head_arrow = {
+            N_HAS_FACET_AT_CLASS_LEVEL: "dot",
+        }.get(triple[1], "normal")
+        head_label = {
+            N_HAS_FACET_AT_CLASS_LEVEL: "0..1",
+        }.get(triple[1], "")
+        out_fh.write(
+            """\
 \t%s -> %s [arrowhead="%s" headlabel="%s" label="%s"];
 """
-                % (
-                    iri_to_gv_node_id(triple[0]),
-                    iri_to_gv_node_id(triple[2]),
-                    head_arrow,
-                    head_label,
-                    edge_label,
-                )
+            % (
+                iri_to_gv_node_id(triple[0]),
+                iri_to_gv_node_id(triple[2]),
+                head_arrow,
+                head_label,
+                edge_label,
             )
+        )
 
-        for triple in sorted(
-            [x for x in filtered_triples if x[1] == N_HAS_FACET_AT_CLASS_LEVEL]
-        ):
-            out_fh.write(
-                """\
+    for triple in sorted(
+        [x for x in filtered_triples if x[1] == N_HAS_FACET_AT_CLASS_LEVEL]
+    ):
+        out_fh.write(
+            """\
 \tsubgraph ranker%s%s {
 \t\trank="same"
 \t\t%s
 \t\t%s
 \t}
 """
-                % (
-                    iri_to_gv_node_id(triple[0]),
-                    iri_to_gv_node_id(triple[2]),
-                    iri_to_gv_node_id(triple[0]),
-                    iri_to_gv_node_id(triple[2]),
-                )
+            % (
+                iri_to_gv_node_id(triple[0]),
+                iri_to_gv_node_id(triple[2]),
+                iri_to_gv_node_id(triple[0]),
+                iri_to_gv_node_id(triple[2]),
             )
+        )
 
-        # NOTE - Code here has a currently-fragile manual
-        # synchronization need with code in the edges-rendering block
-        # above.  A function may better suit this.
-        n_predicates_for_legend: set[URIRef] = {x[1] for x in filtered_triples} & {
-            N_HAS_FACET_AT_CLASS_LEVEL,
-            NS_RDF.type,
-            NS_RDFS.subClassOf,
-        }
-        if len(n_predicates_for_legend) > 0:
-            out_fh.write("""\
+    # NOTE - Code here has a currently-fragile manual
+    # synchronization need with code in the edges-rendering block
+    # above.  A function may better suit this.
+    n_predicates_for_legend: set[URIRef] = {x[1] for x in filtered_triples} & {
+        N_HAS_FACET_AT_CLASS_LEVEL,
+        NS_RDF.type,
+        NS_RDFS.subClassOf,
+    }
+    if len(n_predicates_for_legend) > 0 or len(notes) > 0:
+        out_fh.write("""\
 \tsubgraph cluster_legend {
 \t\tlabel="Legend";
 \t\tlabelloc="b";
 \t\trankdir="BT";
 """)
-            if N_HAS_FACET_AT_CLASS_LEVEL in n_predicates_for_legend:
-                out_fh.write("""\
+        if N_HAS_FACET_AT_CLASS_LEVEL in n_predicates_for_legend:
+            out_fh.write("""\
 \t\tsubgraph ranker_legend_facets {
 \t\t\trank="same"
 \t\t\tlegend_hf_bearer [label="UcoObject class"];
@@ -314,26 +548,181 @@ digraph "hierarchy" {
 \t\t\tlegend_hf_bearer -> legend_hf_facet [arrowhead="dot" headlabel="0..1" label=""];
 \t\t}
 """)
-            if NS_RDF.type in n_predicates_for_legend:
-                out_fh.write("""\
+        if NS_RDF.type in n_predicates_for_legend:
+            out_fh.write("""\
 \t\tlegend_instance [label="Instance"];
 \t\tlegend_class [label="Class"];
 \t\tlegend_instance -> legend_class [arrowhead="normal" headlabel="" label="∈"];
 """)
-            if NS_RDFS.subClassOf in n_predicates_for_legend:
-                out_fh.write("""\
+        if NS_RDFS.subClassOf in n_predicates_for_legend:
+            out_fh.write("""\
 \t\tlegend_subclass [label="Subclass"];
 \t\tlegend_superclass [label="Superclass"];
 \t\tlegend_subclass -> legend_superclass [arrowhead="normal" headlabel="" label="⊂"];
 """)
+        if len(summaries) > 0:
             out_fh.write("""\
+\t\tlegend_facet_summary [label="Collapsed Facet classes" shape="folder"];
+""")
+        if len(notes) > 0:
+            out_fh.write("""\
+\t\tlegend_omissions [label="%s" shape="note"];
+""" % "".join(x.replace('"', '\\"') + "\\l" for x in notes))
+        out_fh.write("""\
 }
 """)
 
-        out_fh.write("""\
+    out_fh.write("""\
 }
 """)
 
+    return out_fh.getvalue()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--schema-model",
+        help="Path to a schema model pickle, as made by schema_model_pickle.py.  If given, the ontology graph is not loaded.  Supplemental graphs must instead be included when building the model.",
+    )
+    add_backend_arguments(parser)
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        help="Omit classes more than this many edges from the class.",
+    )
+    parser.add_argument(
+        "--max-nodes",
+        type=int,
+        help="Omit classes beyond this many, keeping those nearest the class.",
+    )
+    parser.add_argument(
+        "--collapse-facets",
+        action="store_true",
+        help="Draw each class's Facet classes as one summary node, omitting their hierarchies.",
+    )
+    parser.add_argument(
+        "--fallback-layout-nodes",
+        type=int,
+        help="Above this many nodes, lay out the diagram with --fallback-layout instead of dot.",
+    )
+    parser.add_argument(
+        "--fallback-layout",
+        default="sfdp",
+        help="Graphviz layout engine for diagrams above --fallback-layout-nodes.  Default %(default)s.",
+    )
+    add_output_cache_arguments(parser)
+    parser.add_argument("out_dot")
+    parser.add_argument("class_iri")
+    parser.add_argument("supplemental_graph", nargs="*")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    n_subject_class = URIRef(args.class_iri)
+    if args.schema_model and args.supplemental_graph:
+        parser.error("supplemental_graph cannot be used with --schema-model.")
+
+    output_paths = {"dot": args.out_dot}
+    cache = open_output_cache(args)
+    if cache is not None:
+        cache_key = request_key(
+            "dot",
+            input_digests(args),
+            {
+                "class_iri": args.class_iri,
+                "max_depth": args.max_depth,
+                "max_nodes": args.max_nodes,
+                "collapse_facets": args.collapse_facets,
+                "fallback_layout_nodes": args.fallback_layout_nodes,
+                "fallback_layout": args.fallback_layout,
+            },
+        )
+        cached_outputs = cache.get(cache_key)
+        if cached_outputs is not None:
+            logging.debug("Writing outputs from the output cache.")
+            write_outputs(cached_outputs, output_paths)
+            return
+
+    qname: Callable[[URIRef], str]
+    if args.schema_model:
+        with trace_stage("dot:load", args.out_dot, args.class_iri):
+            model = load_schema_model(args.schema_model)
+        i_subject_class = model.id_of(args.class_iri)
+        if i_subject_class is None or not model.is_class(i_subject_class):
+            raise ValueError(
+                "Requested class IRI not found in schema model: %r." % args.class_iri
+            )
+        with trace_stage("dot:generate", args.out_dot, args.class_iri):
+            n_classes_to_display = get_classes_to_display_from_model(
+                model, n_subject_class
+            )
+            triples_to_display = get_triples_to_display_from_model(
+                model, n_classes_to_display
+            )
+        qname = model.qname
+    else:
+        with trace_stage("dot:load", args.out_dot, args.class_iri):
+            graph = load_ontology_graph(
+                args.supplemental_graph,
+                args.backend,
+                args.store_path,
+                args.supplemental_cache,
+                args.ontology,
+                args.schema_subset,
+            )
+
+        for key in CDO_CONTEXT:
+            graph.bind(key, CDO_CONTEXT[key])
+
+        if (n_subject_class, NS_RDF.type, NS_OWL.Class) not in graph:
+            raise ValueError(
+                "Requested class IRI not found in CASE graph: %r." % args.class_iri
+            )
+
+        with trace_stage("dot:generate", args.out_dot, args.class_iri):
+            expand_graph(graph)
+            n_classes_to_display = get_classes_to_display(graph, n_subject_class)
+            triples_to_display = get_triples_to_display(graph, n_classes_to_display)
+        qname = NamespaceIndex.from_graph(graph).qname
+
+    summaries: dict[URIRef, list[URIRef]] = dict()
+    notes: list[str] = []
+    if args.max_depth is not None or args.max_nodes is not None or args.collapse_facets:
+        n_classes_to_display, triples_to_display, summaries, notes = bound_display_sets(
+            n_subject_class,
+            n_classes_to_display,
+            triples_to_display,
+            args.max_depth,
+            args.max_nodes,
+            args.collapse_facets,
+        )
+    layout: Optional[str] = None
+    if args.fallback_layout_nodes is not None:
+        n_nodes = len(
+            [x for x in n_classes_to_display if x not in CLASSES_TO_NOT_DISPLAY]
+        )
+        if n_nodes > args.fallback_layout_nodes:
+            layout = args.fallback_layout
+            notes.append(
+                "Laid out with %s, as the %d nodes exceed %d."
+                % (layout, n_nodes, args.fallback_layout_nodes)
+            )
+
+    with trace_stage("dot:render", args.out_dot, args.class_iri):
+        dot_text = render_dot(
+            n_classes_to_display,
+            triples_to_display,
+            qname,
+            summaries,
+            notes,
+            layout,
+        )
+    write_outputs({"dot": dot_text}, output_paths)
+    if cache is not None:
+        cache.put(cache_key, {"dot": dot_text})
+
 
 if __name__ == "__main__":
     main()
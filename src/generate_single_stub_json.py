@@ -15,13 +15,21 @@
 # We would appreciate acknowledgement if the software is used.
 
 import argparse
-import importlib.resources
+import copy
 import json
 import logging
-from typing import Dict, List, Optional, Set, Union
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
-import case_utils.ontology
-import pyld  # type: ignore
 from case_utils.namespace import (
     NS_CASE_INVESTIGATION,
     NS_CASE_VOCABULARY,
@@ -47,6 +55,19 @@ from case_utils.namespace import (
 from rdflib import Graph, Literal, Namespace, URIRef
 from rdflib.query import ResultRow
 
+from build_trace import trace_stage
+from graph_backend import add_backend_arguments, load_ontology_graph
+from namespace_index import NamespaceIndex
+from output_cache import (
+    add_output_cache_arguments,
+    input_digests,
+    open_output_cache,
+    request_key,
+    write_outputs,
+)
+from schema_model import SchemaModel, load_schema_model
+from sparql_queries import register_query, run_query
+
 # JSON type via:
 # https://github.com/python/typing/issues/182#issuecomment-1320974824
 # Union is needed instead of '|' operator before Python 3.10.
@@ -54,6 +75,10 @@ JSON = Union[Dict[str, "JSON"], List["JSON"], str, int, float, bool, None]
 
 NS_KB = Namespace("http://example.org/kb/")
 
+# A term of a context can be used as the prefix of a compact IRI if its
+# IRI ends with one of these characters, as in JSON-LD 1.1.
+_PREFIX_IRI_END = ":/?#[]@"
+
 CDO_CONTEXT: Dict[str, Namespace] = {
     "case-investigation": NS_CASE_INVESTIGATION,
     "case-vocabulary": NS_CASE_VOCABULARY,
@@ -75,6 +100,43 @@ CDO_CONTEXT: Dict[str, Namespace] = {
 }
 
 
+RESOLVE_MAX_CARDINALITY_QUERY = register_query(
+    "json:resolve-max-cardinality",
+    """\
+SELECT ?lMaxCount
+WHERE {
+  ?nClass rdfs:subClassOf* ?nSuperClass .
+  {
+    ?nSuperClass sh:property ?nPropertyShape .
+    ?nPropertyShape
+      sh:maxCount ?lMaxCount ;
+      sh:path ?nProperty ;
+      .
+  }
+  UNION
+  {
+    ?nSuperClass rdfs:subClassOf ?nRestriction .
+    ?nRestriction
+      a owl:Restriction ;
+      owl:onProperty ?nProperty ;
+      .
+    {
+      ?nRestriction
+        owl:cardinality ?lMaxCount ;
+        .
+    }
+    UNION
+    {
+      ?nRestriction
+        owl:maxCardinality ?lMaxCount ;
+        .
+    }
+  }
+}
+""",
+)
+
+
 def resolve_max_cardinality(
     graph: Graph, n_class: URIRef, n_property: URIRef
 ) -> Optional[int]:
@@ -150,14 +212,30 @@ ex:foo\
     1
     """
     max_counts: Set[int] = set()
-    query = """\
-SELECT ?lMaxCount
+    for result in run_query(
+        graph,
+        RESOLVE_MAX_CARDINALITY_QUERY,
+        {"nClass": n_class, "nProperty": n_property},
+    ):
+        assert isinstance(result, ResultRow)
+        if not isinstance(result[0], Literal):
+            continue
+        max_counts.add(int(result[0]))
+    if len(max_counts) == 0:
+        return None
+    else:
+        return min(max_counts)
+
+
+GET_PROPERTIES_QUERY = register_query(
+    "json:get-properties",
+    """\
+SELECT ?nProperty
 WHERE {
   ?nClass rdfs:subClassOf* ?nSuperClass .
   {
     ?nSuperClass sh:property ?nPropertyShape .
     ?nPropertyShape
-      sh:maxCount ?lMaxCount ;
       sh:path ?nProperty ;
       .
   }
@@ -168,31 +246,14 @@ WHERE {
       a owl:Restriction ;
       owl:onProperty ?nProperty ;
       .
-    {
-      ?nRestriction
-        owl:cardinality ?lMaxCount ;
-        .
-    }
-    UNION
-    {
-      ?nRestriction
-        owl:maxCardinality ?lMaxCount ;
-        .
-    }
+  }
+  UNION
+  {
+    ?nProperty rdfs:domain/(owl:unionOf/rdf:rest*/rdf:first)? ?nSuperClass .
   }
 }
-"""
-    for result in graph.query(
-        query, initBindings={"nClass": n_class, "nProperty": n_property}
-    ):
-        assert isinstance(result, ResultRow)
-        if not isinstance(result[0], Literal):
-            continue
-        max_counts.add(int(result[0]))
-    if len(max_counts) == 0:
-        return None
-    else:
-        return min(max_counts)
+""",
+)
 
 
 def get_properties(graph: Graph, n_class: URIRef) -> Set[URIRef]:
@@ -275,31 +336,7 @@ ex:cname\
     ['http://example.org/ontology/cname']
     """
     n_properties: Set[URIRef] = set()
-    query = """\
-SELECT ?nProperty
-WHERE {
-  ?nClass rdfs:subClassOf* ?nSuperClass .
-  {
-    ?nSuperClass sh:property ?nPropertyShape .
-    ?nPropertyShape
-      sh:path ?nProperty ;
-      .
-  }
-  UNION
-  {
-    ?nSuperClass rdfs:subClassOf ?nRestriction .
-    ?nRestriction
-      a owl:Restriction ;
-      owl:onProperty ?nProperty ;
-      .
-  }
-  UNION
-  {
-    ?nProperty rdfs:domain/(owl:unionOf/rdf:rest*/rdf:first)? ?nSuperClass .
-  }
-}
-"""
-    for result in graph.query(query, initBindings={"nClass": n_class}):
+    for result in run_query(graph, GET_PROPERTIES_QUERY, {"nClass": n_class}):
         assert isinstance(result, ResultRow)
         if not isinstance(result[0], URIRef):
             continue
@@ -307,10 +344,9 @@ WHERE {
     return n_properties
 
 
-def get_facet_classes(graph: Graph, n_class: URIRef) -> Set[URIRef]:
-    logging.debug("get_facet_classes(graph, %r) ...", n_class)
-    n_facet_classes: Set[URIRef] = set()
-    query = """\
+GET_FACET_CLASSES_QUERY = register_query(
+    "json:get-facet-classes",
+    """\
 PREFIX uco-core: <https://ontology.unifiedcyberontology.org/uco/core/>
 SELECT ?nFacetClass
 WHERE {
@@ -325,8 +361,14 @@ WHERE {
     .
 }
 
-"""
-    for result in graph.query(query, initBindings={"nClass": n_class}):
+""",
+)
+
+
+def get_facet_classes(graph: Graph, n_class: URIRef) -> Set[URIRef]:
+    logging.debug("get_facet_classes(graph, %r) ...", n_class)
+    n_facet_classes: Set[URIRef] = set()
+    for result in run_query(graph, GET_FACET_CLASSES_QUERY, {"nClass": n_class}):
         assert isinstance(result, ResultRow)
         if not isinstance(result[0], URIRef):
             continue
@@ -334,38 +376,170 @@ WHERE {
     return n_facet_classes
 
 
-def generate_expanded_stub(graph: Graph, n_subject_class: URIRef) -> Dict[str, JSON]:
-    subject_prefix, n_namespace, local_name = graph.namespace_manager.compute_qname(
-        n_subject_class, False
-    )
+def min_max_cardinality(
+    max_cardinality_1: Optional[int], max_cardinality_2: Optional[int]
+) -> Optional[int]:
+    """
+    Combine two maximum cardinalities as resolve_max_cardinality combines the statements of superclasses: the least ceiling wins, and None (unbounded) yields to any ceiling.
 
-    expanded_individual: Dict[str, JSON] = {
-        "@id": str(NS_KB[local_name + "-1"]),
-        "@type": str(n_subject_class),
-    }
+    >>> min_max_cardinality(None, 2), min_max_cardinality(3, 2), min_max_cardinality(None, None)
+    (2, 2, None)
+    """
+    if max_cardinality_1 is None:
+        return max_cardinality_2
+    if max_cardinality_2 is None:
+        return max_cardinality_1
+    return min(max_cardinality_1, max_cardinality_2)
 
-    for n_property in get_properties(graph, n_subject_class):
-        max_cardinality = resolve_max_cardinality(graph, n_subject_class, n_property)
-        stub_value: JSON
-        if max_cardinality == 0:
-            continue
-        elif max_cardinality == 1:
-            stub_value = None
+
+class StubComposer:
+    """
+    Builds expanded stubs for individuals of one or more classes, from either a Graph or a SchemaModel.  Each class's properties with their maximum cardinalities, and its Facet classes, are computed once, and reused by every stub built with this composer, including the stubs of Facets.
+
+    For an individual of several classes, these are merged: properties are unioned, a property's maximum cardinalities are combined by min_max_cardinality(), and the Facet classes are unioned.
+
+    A composer drawing from a SchemaModel can be shared by threads.  Threads computing the same class at once compute the same value, and the first to be stored is kept.
+
+    >>> import rdflib
+    >>> g = rdflib.Graph()
+    >>> data = '''\
+@prefix ex: <http://example.org/ontology/> .\
+@prefix owl: <http://www.w3.org/2002/07/owl#> .\
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .\
+@prefix sh: <http://www.w3.org/ns/shacl#> .\
+\
+ex:A a owl:Class , sh:NodeShape ;\
+  sh:property [ sh:path ex:foo ] , [ sh:path ex:bar ; sh:maxCount 1 ] .\
+ex:B a owl:Class , sh:NodeShape ;\
+  sh:property [ sh:path ex:foo ; sh:maxCount 1 ] , [ sh:path ex:baz ] .\
+'''
+    >>> _ = g.parse(data=data, format="turtle")
+    >>> g.bind("ex", "http://example.org/ontology/")
+    >>> ns_ex = rdflib.Namespace("http://example.org/ontology/")
+    >>> composer = StubComposer(graph=g)
+    >>> stub = composer.compose([ns_ex["A"], ns_ex["B"]])
+    >>> stub["@type"]
+    ['http://example.org/ontology/A', 'http://example.org/ontology/B']
+    >>> [(x.removeprefix(str(ns_ex)), stub[x]) for x in sorted(stub) if not x.startswith("@")]
+    [('bar', None), ('baz', []), ('foo', None)]
+    """
+
+    def __init__(
+        self, graph: Optional[Graph] = None, model: Optional[SchemaModel] = None
+    ) -> None:
+        if (graph is None) == (model is None):
+            raise ValueError("Exactly one of graph and model must be given.")
+        self._graph = graph
+        self._model = model
+        self._max_cardinalities: Dict[URIRef, Dict[URIRef, Optional[int]]] = dict()
+        self._facet_classes: Dict[URIRef, Set[URIRef]] = dict()
+
+    def class_max_cardinalities(self, n_class: URIRef) -> Dict[URIRef, Optional[int]]:
+        """
+        Returns the properties of the class, each with its maximum cardinality (None for unbounded).
+        """
+        if n_class in self._max_cardinalities:
+            return self._max_cardinalities[n_class]
+        max_cardinalities: Dict[URIRef, Optional[int]] = dict()
+        if self._model is not None:
+            i_class = self._model.id_of(str(n_class))
+            assert i_class is not None
+            for i_property in self._model.get_properties(i_class):
+                max_cardinalities[URIRef(self._model.iris[i_property])] = (
+                    self._model.resolve_max_cardinality(i_class, i_property)
+                )
+        else:
+            assert self._graph is not None
+            for n_property in get_properties(self._graph, n_class):
+                max_cardinalities[n_property] = resolve_max_cardinality(
+                    self._graph, n_class, n_property
+                )
+        return self._max_cardinalities.setdefault(n_class, max_cardinalities)
+
+    def class_facet_classes(self, n_class: URIRef) -> Set[URIRef]:
+        if n_class in self._facet_classes:
+            return self._facet_classes[n_class]
+        n_facet_classes: Set[URIRef]
+        if self._model is not None:
+            i_class = self._model.id_of(str(n_class))
+            assert i_class is not None
+            n_facet_classes = {
+                URIRef(self._model.iris[x])
+                for x in self._model.get_facet_classes(i_class)
+            }
         else:
-            stub_value = []
-        expanded_individual[str(n_property)] = stub_value
+            assert self._graph is not None
+            n_facet_classes = get_facet_classes(self._graph, n_class)
+        return self._facet_classes.setdefault(n_class, n_facet_classes)
+
+    def _local_name(self, n_class: URIRef) -> str:
+        if self._model is not None:
+            return self._model.compute_qname(str(n_class), False)[2]
+        assert self._graph is not None
+        return self._graph.namespace_manager.compute_qname(n_class, False)[2]
+
+    def compose(self, n_classes: Sequence[URIRef]) -> Dict[str, JSON]:
+        """
+        Build the expanded stub of an individual of all the given classes.  The individual's identifier is derived from the first class.
+        """
+        n_classes = list(dict.fromkeys(n_classes))
+        if len(n_classes) == 0:
+            raise ValueError("At least one class is required.")
+
+        max_cardinalities: Dict[URIRef, Optional[int]] = dict()
+        for n_class in n_classes:
+            for n_property, max_cardinality in self.class_max_cardinalities(
+                n_class
+            ).items():
+                if n_property in max_cardinalities:
+                    max_cardinality = min_max_cardinality(
+                        max_cardinalities[n_property], max_cardinality
+                    )
+                max_cardinalities[n_property] = max_cardinality
+
+        expanded_individual: Dict[str, JSON] = {
+            "@id": str(NS_KB[self._local_name(n_classes[0]) + "-1"]),
+            "@type": (
+                str(n_classes[0])
+                if len(n_classes) == 1
+                else [str(x) for x in n_classes]
+            ),
+        }
+
+        for n_property, max_cardinality in max_cardinalities.items():
+            stub_value: JSON
+            if max_cardinality == 0:
+                continue
+            elif max_cardinality == 1:
+                stub_value = None
+            else:
+                stub_value = []
+            expanded_individual[str(n_property)] = stub_value
+
+        if expanded_individual.get(str(NS_UCO_CORE.hasFacet)) is not None:
+            facet_stubs_list = expanded_individual[str(NS_UCO_CORE.hasFacet)]
+            assert isinstance(facet_stubs_list, list)
+            n_facet_classes: Set[URIRef] = set()
+            for n_class in n_classes:
+                n_facet_classes |= self.class_facet_classes(n_class)
+            for n_facet_class in sorted(n_facet_classes):
+                logging.debug("n_facet_class = %r.", n_facet_class)
+                facet_stubs_list.append(self.compose([n_facet_class]))
+
+        return expanded_individual
 
-    logging.debug(expanded_individual.get(str(NS_UCO_CORE.hasFacet)))
 
-    if expanded_individual.get(str(NS_UCO_CORE.hasFacet)) is not None:
-        facet_stubs_list = expanded_individual[str(NS_UCO_CORE.hasFacet)]
-        assert isinstance(facet_stubs_list, list)
-        for n_facet_class in sorted(get_facet_classes(graph, n_subject_class)):
-            logging.debug("n_facet_class = %r.", n_facet_class)
-            expanded_facet_individual = generate_expanded_stub(graph, n_facet_class)
-            facet_stubs_list.append(expanded_facet_individual)
+def generate_expanded_stub(graph: Graph, n_subject_class: URIRef) -> Dict[str, JSON]:
+    return StubComposer(graph=graph).compose([n_subject_class])
 
-    return expanded_individual
+
+def generate_expanded_stub_from_model(
+    model: SchemaModel, n_subject_class: URIRef
+) -> Dict[str, JSON]:
+    """
+    Equivalent of generate_expanded_stub, drawing from a SchemaModel instead of a Graph.
+    """
+    return StubComposer(model=model).compose([n_subject_class])
 
 
 def get_concept_iris(document: JSON) -> Set[URIRef]:
@@ -398,88 +572,133 @@ def get_concept_iris(document: JSON) -> Set[URIRef]:
     return retval
 
 
-def swap_values(
-    document: JSON, from_value: Optional[int], to_value: Optional[int]
-) -> None:
+def compact_iri(iri: str, context: Mapping[str, str], vocab: bool) -> str:
     """
-    This is a hack to place a sentinel value in place of nulls.  The JSON-LD compaction algorithm does not necessarily preserve a key if its object is a null, so this function swaps in something that will be preserved.
-    >>> d = {"foo": None, "bar": 9}
-    >>> swap_values(d, None, 8)
-    >>> d
-    {'foo': 8, 'bar': 9}
-    >>> swap_values(d, 9, None)
-    >>> d
-    {'foo': 8, 'bar': None}
+    Compact an IRI with a context of prefix terms, as JSON-LD compaction does: to a term naming the IRI itself if vocab is true (as for keys and types, but not @id values), else to the shortest, then least, compact IRI, else unchanged.
+
+    >>> context = {"ex": "http://example.org/", "ex-a": "http://example.org/a/"}
+    >>> compact_iri("http://example.org/b", context, True)
+    'ex:b'
+    >>> compact_iri("http://example.org/a/bcdef", context, True)
+    'ex-a:bcdef'
+    >>> compact_iri("http://example.org/", context, True)
+    'ex'
+    >>> compact_iri("http://example.org/", context, False)
+    'http://example.org/'
+    >>> compact_iri("urn:example:x", context, True)
+    'urn:example:x'
     """
-    assert isinstance(document, dict)
-    for key in document:
-        if isinstance(document[key], dict):
-            swap_values(document[key], from_value, to_value)
-        if isinstance(document[key], list):
-            child_things = document[key]
-            assert isinstance(child_things, list)
-            for child_thing in child_things:
-                if isinstance(child_thing, dict):
-                    swap_values(child_thing, from_value, to_value)
-        elif isinstance(document[key], int):
-            if isinstance(from_value, int):
-                if document[key] == from_value:
-                    document[key] = to_value
-        elif document[key] is None:
-            if from_value is None:
-                document[key] = to_value
-
-
-def main() -> None:
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--debug", action="store_true")
-    parser.add_argument("out_json")
-    parser.add_argument("class_iri")
-    parser.add_argument("supplemental_graph", nargs="*")
-    args = parser.parse_args()
-
-    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
-
-    graph = Graph()
-    ttl_data = importlib.resources.read_text(case_utils.ontology, "case-1.4.0.ttl")
-    graph.parse(data=ttl_data)
-    logging.debug("len(graph) = %d.", len(graph))
-
-    if args.supplemental_graph:
-        for supplemental_graph_filename in args.supplemental_graph:
-            logging.debug("Loading %r.", supplemental_graph_filename)
-            graph.parse(supplemental_graph_filename)
-            logging.debug("len(graph) = %d.", len(graph))
-
-    for key in CDO_CONTEXT:
-        graph.bind(key, CDO_CONTEXT[key])
-
-    n_subject_class = URIRef(args.class_iri)
-    if (n_subject_class, NS_RDF.type, NS_OWL.Class) not in graph:
-        raise ValueError(
-            "Requested class IRI not found in CASE graph: %r." % args.class_iri
-        )
+    if vocab:
+        terms = [x for x in context if context[x] == iri]
+        if terms:
+            return min(terms, key=lambda x: (len(x), x))
+    candidate: Optional[str] = None
+    for term, namespace in context.items():
+        if ":" in term or namespace == iri or not iri.startswith(namespace):
+            continue
+        if not namespace or namespace[-1] not in _PREFIX_IRI_END:
+            continue
+        curie = term + ":" + iri.replace(namespace, "", 1)
+        if candidate is None or (len(curie), curie) < (len(candidate), candidate):
+            candidate = curie
+    return iri if candidate is None else candidate
 
-    expanded_stub = generate_expanded_stub(graph, n_subject_class)
 
+def _compact_node(node: Dict[str, JSON], context: Mapping[str, str]) -> Dict[str, JSON]:
+    """
+    Compact an expanded node object of a stub, whose values are nulls, empty lists, or node objects and lists of them.  As with JSON-LD compaction's compactArrays option, a list of one value is replaced by the value.
+    """
+    compacted_node: Dict[str, JSON] = dict()
+    for key, value in node.items():
+        if key == "@id":
+            assert isinstance(value, str)
+            compacted_node[key] = compact_iri(value, context, False)
+        elif key == "@type":
+            type_iris = [value] if isinstance(value, str) else value
+            assert isinstance(type_iris, list)
+            compacted_types: List[JSON] = []
+            for type_iri in type_iris:
+                assert isinstance(type_iri, str)
+                compacted_types.append(compact_iri(type_iri, context, True))
+            compacted_node[key] = (
+                compacted_types[0] if len(compacted_types) == 1 else compacted_types
+            )
+        else:
+            compacted_value: JSON
+            if isinstance(value, dict):
+                compacted_value = _compact_node(value, context)
+            elif isinstance(value, list):
+                compacted_values: List[JSON] = [
+                    _compact_node(x, context) if isinstance(x, dict) else x
+                    for x in value
+                ]
+                compacted_value = (
+                    compacted_values[0]
+                    if len(compacted_values) == 1
+                    else compacted_values
+                )
+            else:
+                compacted_value = value
+            compacted_node[compact_iri(key, context, True)] = compacted_value
+    return compacted_node
+
+
+def compact_stub(
+    expanded_stub: Dict[str, JSON],
+    compute_namespace: Callable[[URIRef], Tuple[str, str]],
+) -> Dict[str, JSON]:
+    """
+    Compact an expanded stub with a context dictionary built only from the prefixes of concepts used in the stub.  compute_namespace maps a concept IRI to its prefix and namespace IRI, such as from a NamespaceManager.compute_qname.  The expanded stub is not modified.
+
+    The context holds only prefixes, so the stub is compacted in-house, with the results of JSON-LD compaction by PyLD, except that null values are kept rather than dropped.  PyLD's compaction caches are shared by all threads, and are not thread-safe.
+
+    >>> print(serialize_stub(compact_stub(
+    ...     {
+    ...         "@id": "http://example.org/kb/A-1",
+    ...         "@type": "http://example.org/ontology/A",
+    ...         "http://example.org/ontology/foo": None,
+    ...         "http://example.org/ontology/bar": [],
+    ...         "http://example.org/ontology/hasFacet": [
+    ...             {"@id": "http://example.org/kb/AFacet-1", "@type": "http://example.org/ontology/AFacet"},
+    ...         ],
+    ...     },
+    ...     lambda x: ("ex", "http://example.org/ontology/"),
+    ... )), end="")
+    {
+        "@context": {
+            "ex": "http://example.org/ontology/",
+            "kb": "http://example.org/kb/",
+            "xsd": "http://www.w3.org/2001/XMLSchema#"
+        },
+        "@graph": [
+            {
+                "@id": "kb:A-1",
+                "@type": "ex:A",
+                "ex:bar": [],
+                "ex:foo": null,
+                "ex:hasFacet": {
+                    "@id": "kb:AFacet-1",
+                    "@type": "ex:AFacet"
+                }
+            }
+        ]
+    }
+    """
     all_concept_iris = get_concept_iris(expanded_stub)
-    all_used_prefixes: Set[str] = set()
+    all_used_prefixes: Dict[str, str] = dict()
     for concept_iri in all_concept_iris:
-        prefix, _1, _2 = graph.namespace_manager.compute_qname(concept_iri, False)
-        all_used_prefixes.add(prefix)
+        prefix, namespace = compute_namespace(concept_iri)
+        all_used_prefixes[prefix] = namespace
 
     # Build context dictionary that only uses prefixes for concepts that appear in the expanded document.
     context: Dict[str, str] = {
         "kb": str(NS_KB),
         "xsd": str(NS_XSD),
     }
-    for prefix in all_used_prefixes:
-        context[prefix] = str(CDO_CONTEXT[prefix])
+    context.update(all_used_prefixes)
 
-    swap_values(expanded_stub, None, 9)
-    # logging.debug("expanded_stub = %r.", expanded_stub)
-    compacted_graph = pyld.jsonld.compact(expanded_stub, context)
-    swap_values(compacted_graph, 9, None)
+    compacted_graph: Dict[str, JSON] = {"@context": dict(context)}
+    compacted_graph.update(_compact_node(expanded_stub, context))
 
     # Guarantee "@graph" key is used and list-valued.
     if "@graph" not in compacted_graph.keys():
@@ -487,11 +706,178 @@ def main() -> None:
         new_graph["@context"] = compacted_graph["@context"]
         del compacted_graph["@context"]
         new_graph["@graph"] = [compacted_graph]
-        compacted_graph = new_graph
+        return new_graph
+
+    return compacted_graph
 
-    with open(args.out_json, "w") as out_fh:
-        json.dump(compacted_graph, out_fh, indent=4, sort_keys=True)
-        out_fh.write("\n")
+
+def serialize_stub(compacted_graph: Dict[str, JSON]) -> str:
+    """
+    Render a compacted stub as written to the stub file.
+
+    >>> print(serialize_stub({"@graph": [], "@context": {}}), end="")
+    {
+        "@context": {},
+        "@graph": []
+    }
+    """
+    return json.dumps(compacted_graph, indent=4, sort_keys=True) + "\n"
+
+
+def serialize_expanded_stub(expanded_stub: Dict[str, JSON]) -> str:
+    """
+    Render an expanded stub in the layout of a compacted stub file, without a context: every key and type is a full IRI.  Null and empty-list placeholders are kept, as JSON-LD expansion would drop them.
+
+    >>> print(serialize_expanded_stub({"@id": "http://example.org/kb/A-1", "http://example.org/ontology/foo": None}), end="")
+    {
+        "@graph": [
+            {
+                "@id": "http://example.org/kb/A-1",
+                "http://example.org/ontology/foo": null
+            }
+        ]
+    }
+    """
+    return json.dumps({"@graph": [expanded_stub]}, indent=4, sort_keys=True) + "\n"
+
+
+def serialize_stub_ntriples(expanded_stub: Dict[str, JSON]) -> str:
+    """
+    Render the triples of an expanded stub as sorted N-Triples.  These are the types of the individual and its Facets, and its links to its Facets; placeholder values have no triples.
+
+    >>> print(serialize_stub_ntriples({
+    ...     "@id": "http://example.org/kb/A-1",
+    ...     "@type": "http://example.org/ontology/A",
+    ...     "http://example.org/ontology/foo": None,
+    ...     "http://example.org/ontology/bar": [],
+    ... }), end="")
+    <http://example.org/kb/A-1> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://example.org/ontology/A> .
+    """
+    # PyLD is imported only here, as loading it (with its default
+    # network document loaders) dominates the start-up time of paths that
+    # do not write N-Triples.  A stub has no @context, so converting it
+    # does not touch PyLD's context caches, and needs no lock.
+    import pyld  # type: ignore
+
+    nquads: str = pyld.jsonld.to_rdf(
+        copy.deepcopy(expanded_stub), {"format": "application/n-quads"}
+    )
+    return "".join(sorted(nquads.splitlines(keepends=True)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--schema-model",
+        help="Path to a schema model pickle, as made by schema_model_pickle.py.  If given, the ontology graph is not loaded.  Supplemental graphs must instead be included when building the model.",
+    )
+    add_backend_arguments(parser)
+    parser.add_argument(
+        "--additional-class-iri",
+        action="append",
+        default=[],
+        help="Another class of the stubbed individual.  The stub has the properties and Facets of every class, with conflicting maximum cardinalities resolved to the least.  Can be given multiple times.",
+    )
+    parser.add_argument(
+        "--expanded-output",
+        help="Path to also write the stub before compaction, with full IRIs, for consumers that would otherwise run JSON-LD expansion.",
+    )
+    parser.add_argument(
+        "--ntriples-output",
+        help="Path to also write the triples of the stub as N-Triples.",
+    )
+    add_output_cache_arguments(parser)
+    parser.add_argument("out_json")
+    parser.add_argument("class_iri")
+    parser.add_argument("supplemental_graph", nargs="*")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    n_subject_classes = [
+        URIRef(x) for x in [args.class_iri] + args.additional_class_iri
+    ]
+    if args.schema_model and args.supplemental_graph:
+        parser.error("supplemental_graph cannot be used with --schema-model.")
+
+    output_paths = {
+        "json": args.out_json,
+        "expanded": args.expanded_output,
+        "ntriples": args.ntriples_output,
+    }
+    cache = open_output_cache(args)
+    cached_outputs: Dict[str, str] = dict()
+    if cache is not None:
+        cache_key = request_key(
+            "json",
+            input_digests(args),
+            {"class_iris": [str(x) for x in n_subject_classes]},
+        )
+        cached_outputs = cache.get(cache_key) or dict()
+        # An entry may hold fewer outputs than requested.
+        if all(x in cached_outputs for x in output_paths if output_paths[x]):
+            logging.debug("Writing outputs from the output cache.")
+            write_outputs(cached_outputs, output_paths)
+            return
+
+    expanded_stub: Dict[str, JSON]
+    if args.schema_model:
+        with trace_stage("json:load", args.out_json, args.class_iri):
+            model = load_schema_model(args.schema_model)
+        for n_subject_class in n_subject_classes:
+            i_subject_class = model.id_of(str(n_subject_class))
+            if i_subject_class is None or not model.is_class(i_subject_class):
+                raise ValueError(
+                    "Requested class IRI not found in schema model: %r."
+                    % str(n_subject_class)
+                )
+        with trace_stage("json:generate", args.out_json, args.class_iri):
+            expanded_stub = StubComposer(model=model).compose(n_subject_classes)
+        with trace_stage("json:compact", args.out_json, args.class_iri):
+            compacted_graph = compact_stub(
+                expanded_stub,
+                lambda x: model.compute_qname(str(x), False)[:2],
+            )
+    else:
+        with trace_stage("json:load", args.out_json, args.class_iri):
+            graph = load_ontology_graph(
+                args.supplemental_graph,
+                args.backend,
+                args.store_path,
+                args.supplemental_cache,
+                args.ontology,
+                args.schema_subset,
+            )
+
+        for key in CDO_CONTEXT:
+            graph.bind(key, CDO_CONTEXT[key])
+
+        for n_subject_class in n_subject_classes:
+            if (n_subject_class, NS_RDF.type, NS_OWL.Class) not in graph:
+                raise ValueError(
+                    "Requested class IRI not found in CASE graph: %r."
+                    % str(n_subject_class)
+                )
+
+        with trace_stage("json:generate", args.out_json, args.class_iri):
+            expanded_stub = StubComposer(graph=graph).compose(n_subject_classes)
+
+        with trace_stage("json:compact", args.out_json, args.class_iri):
+            namespace_index = NamespaceIndex.from_graph(graph)
+            compacted_graph = compact_stub(
+                expanded_stub,
+                lambda x: namespace_index.compute_qname(x, False)[:2],
+            )
+
+    outputs = {"json": serialize_stub(compacted_graph)}
+    if args.expanded_output:
+        outputs["expanded"] = serialize_expanded_stub(expanded_stub)
+    if args.ntriples_output:
+        outputs["ntriples"] = serialize_stub_ntriples(expanded_stub)
+    write_outputs(outputs, output_paths)
+    if cache is not None:
+        cache.put(cache_key, {**cached_outputs, **outputs})
 
 
 if __name__ == "__main__":
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script generates the JSON stub and DOT diagram of many classes, on
+threads sharing one schema model (see `/src/schema_model.py`), instead
+of in processes each holding a copy of the ontology.  On a free-threaded
+build of Python, the threads generate in parallel, as the stubs are
+compacted without PyLD's shared caches.
+
+Files are written in the layout of `/templates`, e.g.
+`uco-observable/File/File.json`.  The classes are those of the
+`/templates` tree, or those given with `--class-iri`:
+
+    generate_templates_threaded.py \\
+      --schema-model var/schema_model.pickle \\
+      --threads 8 \\
+      var/threaded-templates
+
+See `/src/benchmark_threads.py` for measuring throughput.
+"""
+
+import argparse
+import concurrent.futures
+import logging
+import os
+from typing import List, Optional, Sequence
+
+from rdflib import URIRef
+
+import generate_single_stub_dot
+from graph_backend import add_backend_arguments, load_ontology_graph
+from schema_model import SchemaModel, build_schema_model, load_schema_model
+from verify_templates import generate_from_model, template_class_iris, template_path
+
+TOP_SRCDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_model(
+    schema_model_path: Optional[str],
+    args: argparse.Namespace,
+    supplemental_graph_filenames: Sequence[str],
+) -> SchemaModel:
+    """
+    Load a schema model pickle, or else build a model from the ontology graph and supplemental graphs, as the generators would load them.
+    """
+    if schema_model_path:
+        return load_schema_model(schema_model_path)
+    graph = load_ontology_graph(
+        supplemental_graph_filenames,
+        args.backend,
+        args.store_path,
+        args.supplemental_cache,
+        args.ontology,
+        args.schema_subset,
+    )
+    for key in generate_single_stub_dot.CDO_CONTEXT:
+        graph.bind(key, generate_single_stub_dot.CDO_CONTEXT[key])
+    return build_schema_model(graph)
+
+
+def _write(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as out_fh:
+        out_fh.write(text)
+    os.replace(tmp_path, path)
+
+
+def generate_class_files(model: SchemaModel, out_dir: str, n_class: URIRef) -> None:
+    json_text, dot_text = generate_from_model(model, n_class)
+    _write(template_path(out_dir, n_class, ".json"), json_text)
+    _write(template_path(out_dir, n_class, ".dot"), dot_text)
+
+
+def generate_classes(
+    model: SchemaModel, out_dir: str, n_classes: Sequence[URIRef], threads: int
+) -> None:
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = [
+            executor.submit(generate_class_files, model, out_dir, x) for x in n_classes
+        ]
+        for future in futures:
+            future.result()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--schema-model",
+        help="Path to a schema model pickle, as made by schema_model_pickle.py.  If given, the ontology graph is not loaded.",
+    )
+    add_backend_arguments(parser)
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker threads.",
+    )
+    parser.add_argument(
+        "--class-iri",
+        action="append",
+        default=[],
+        help="Class to generate.  May be repeated.  Default the classes of /templates.",
+    )
+    parser.add_argument("out_dir")
+    parser.add_argument("supplemental_graph", nargs="*")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    if args.schema_model and args.supplemental_graph:
+        parser.error("supplemental_graph cannot be used with --schema-model.")
+    model = load_model(args.schema_model, args, args.supplemental_graph)
+
+    n_classes: List[URIRef] = [URIRef(x) for x in args.class_iri]
+    if not n_classes:
+        n_classes = template_class_iris(os.path.join(TOP_SRCDIR, "templates"))
+    logging.info("Generating %d classes on %d threads.", len(n_classes), args.threads)
+    generate_classes(model, args.out_dir, n_classes, args.threads)
+
+
+if __name__ == "__main__":
+    main()
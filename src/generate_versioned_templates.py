@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script generates template trees for several ontology versions in
+one run, e.g. to compare the stubs of CASE releases:
+
+    generate_versioned_templates.py --ontology 1.3.0 --ontology 1.4.0 var/versions
+
+Each `--ontology` is a CASE version bundled with case_utils, or the path
+of a Turtle file of an ontology and its imports.  Its tree is written
+under `OUT_DIR/case-<version>` (or the file's base name), in the layout
+of `/templates`: e.g. `OUT_DIR/case-1.4.0/uco-observable/File/File.json`.
+The classes generated are those `/templates` generates: the classes of
+each ontology with an `https://ontology.` IRI.  SVG files are not
+rendered.
+
+Each version's Facet cardinalities are derived from it, as
+`/var/Makefile` derives `var/facet_cardinalities.ttl` for the default
+version, so that file should not be given as a supplemental graph.
+
+Outputs are generated from a schema model of each version (see
+`/src/schema_model.py`).  A class's JSON stub and DOT source depend only
+on the prefix bindings and on the classes its diagram displays (its
+superclasses, metaclasses and Facets, and theirs), so they are keyed by
+a hash of those classes' facts (see `/src/watch_templates.py`), and of
+the generators' source code.  A class whose key was already seen, for
+an earlier version in the run or in a cache directory from an earlier
+run, is copied instead of generated.  So each further version costs its
+parse, plus the classes that changed.
+"""
+
+import argparse
+import hashlib
+import importlib.metadata
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import rdflib
+from rdflib import URIRef
+
+import generate_single_stub_dot
+import generate_single_stub_json
+import namespace_index
+import schema_model
+import verify_templates
+from facet_cardinalities_ttl import facet_cardinality_graph
+from generate_all_ontologies_mk import ontology_prefix_names
+from graph_backend import (
+    BACKENDS,
+    CASE_VERSION,
+    case_versions,
+    load_ontology_graph,
+    parse_supplemental_graphs,
+)
+from schema_model import SchemaModel, build_schema_model
+from watch_templates import node_facts, write_if_changed
+
+# Increment when the key or entry format changes.
+CACHE_FORMAT_VERSION = 1
+
+
+def code_fingerprint() -> str:
+    """
+    Returns a hash of the generator source code and library versions that outputs depend on.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(
+        (
+            "%d\0%s\0%s\0"
+            % (
+                CACHE_FORMAT_VERSION,
+                rdflib.__version__,
+                importlib.metadata.version("PyLD"),
+            )
+        ).encode()
+    )
+    for module in (
+        generate_single_stub_dot,
+        generate_single_stub_json,
+        namespace_index,
+        schema_model,
+        verify_templates,
+    ):
+        assert module.__file__ is not None
+        with open(module.__file__, "rb") as in_fh:
+            hasher.update(hashlib.sha256(in_fh.read()).digest())
+    return hasher.hexdigest()
+
+
+def tree_name(ontology: str) -> str:
+    """
+    >>> tree_name("1.4.0")
+    'case-1.4.0'
+    >>> tree_name("var/my-ontology.ttl")
+    'my-ontology'
+    """
+    if ontology in case_versions():
+        return "case-" + ontology
+    return os.path.splitext(os.path.basename(ontology))[0]
+
+
+class OutputCache:
+    """
+    Content-addressed store of generated (JSON, DOT) outputs, held in memory for the run, and optionally in a directory across runs.  Entries are written atomically, so concurrent processes can share a cache directory.
+    """
+
+    def __init__(self, code_key: str, cache_dir: Optional[str] = None) -> None:
+        self.code_key = code_key
+        self.cache_dir = cache_dir
+        self._entries: Dict[str, Tuple[str, str]] = dict()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def key(
+        self,
+        model: SchemaModel,
+        facts: Dict[str, Tuple[object, ...]],
+        n_class: URIRef,
+    ) -> str:
+        n_classes_to_display = (
+            generate_single_stub_dot.get_classes_to_display_from_model(model, n_class)
+        )
+        hasher = hashlib.sha256()
+        hasher.update(self.code_key.encode() + b"\0" + str(n_class).encode())
+        hasher.update(json.dumps(sorted(model.namespaces.items())).encode())
+        for iri in sorted({str(x) for x in n_classes_to_display} | {str(n_class)}):
+            hasher.update(json.dumps([iri, facts.get(iri)]).encode())
+        return hasher.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        assert self.cache_dir is not None
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def get(self, key: str) -> Tuple[Optional[Tuple[str, str]], str]:
+        """
+        Returns the outputs for the key, if stored, and where they were found: "run", "disk" or "miss".
+        """
+        if key in self._entries:
+            return (self._entries[key], "run")
+        if self.cache_dir is not None:
+            try:
+                with open(self._entry_path(key), "r") as in_fh:
+                    entry = json.load(in_fh)
+            except (FileNotFoundError, ValueError):
+                pass
+            else:
+                self._entries[key] = (entry["json"], entry["dot"])
+                return (self._entries[key], "disk")
+        return (None, "miss")
+
+    def put(self, key: str, outputs: Tuple[str, str]) -> None:
+        self._entries[key] = outputs
+        if self.cache_dir is None:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix="_", suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as out_fh:
+                json.dump({"json": outputs[0], "dot": outputs[1]}, out_fh)
+            os.replace(tmp_path, self._entry_path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+def generate_version(
+    out_dir: str,
+    ontology: str,
+    supplemental_graph_filenames: List[str],
+    output_cache: OutputCache,
+    backend: str = "rdflib",
+    supplemental_cache_dir: Optional[str] = None,
+    schema_subset: bool = False,
+) -> Dict[str, int]:
+    """
+    Write the template tree of one ontology version.  Returns counts of classes by where their outputs came from, and of files written.
+    """
+    graph = load_ontology_graph(backend=backend, ontology=ontology)
+    graph += facet_cardinality_graph(graph)[0]
+    parse_supplemental_graphs(
+        graph, supplemental_graph_filenames, supplemental_cache_dir, schema_subset
+    )
+    for key in generate_single_stub_dot.CDO_CONTEXT:
+        graph.bind(key, generate_single_stub_dot.CDO_CONTEXT[key])
+    model = build_schema_model(graph)
+    n_prefix_to_prefix_name = ontology_prefix_names(graph)
+    del graph
+    facts = node_facts(model)
+
+    counts = {"classes": 0, "run": 0, "disk": 0, "miss": 0, "failed": 0, "written": 0}
+    for i, iri in enumerate(model.iris):
+        if not model.is_class(i):
+            continue
+        for n_prefix, prefix_name in n_prefix_to_prefix_name.items():
+            if iri.startswith(str(n_prefix)):
+                break
+        else:
+            continue
+        counts["classes"] += 1
+        n_class = URIRef(iri)
+        key = output_cache.key(model, facts, n_class)
+        outputs, source = output_cache.get(key)
+        if outputs is None:
+            try:
+                outputs = verify_templates.generate_from_model(model, n_class)
+            except Exception as e:
+                logging.error("Unable to generate %s for %s: %s", iri, ontology, e)
+                counts["failed"] += 1
+                continue
+            output_cache.put(key, outputs)
+        counts[source] += 1
+
+        local_name = iri.removeprefix(str(n_prefix))
+        stem = os.path.join(
+            out_dir, tree_name(ontology), prefix_name, local_name, local_name
+        )
+        for extension, text in zip((".json", ".dot"), outputs):
+            if write_if_changed(stem + extension, text):
+                counts["written"] += 1
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--ontology",
+        action="append",
+        help="CASE version bundled with case_utils (%s), or path of a Turtle file of an ontology and its imports.  May be repeated.  Default %s."
+        % (", ".join(case_versions()), CASE_VERSION),
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="rdflib",
+        help="Triple store for loading each version.",
+    )
+    parser.add_argument(
+        "--supplemental-cache",
+        help="Directory for caching parsed supplemental graphs across runs.",
+    )
+    parser.add_argument(
+        "--schema-subset",
+        action="store_true",
+        help="Keep only the triples of supplemental graphs that the generators read.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory for keeping generated outputs across runs, keyed by content.",
+    )
+    parser.add_argument("out_dir")
+    parser.add_argument("supplemental_graph", nargs="*")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    output_cache = OutputCache(code_fingerprint(), args.cache_dir)
+    n_failed = 0
+    for ontology in args.ontology or [CASE_VERSION]:
+        start_time = time.perf_counter()
+        counts = generate_version(
+            args.out_dir,
+            ontology,
+            args.supplemental_graph,
+            output_cache,
+            args.backend,
+            args.supplemental_cache,
+            args.schema_subset,
+        )
+        logging.info(
+            "%s: %d classes, %d generated, %d shared with earlier versions, %d from cache directory, %d failed; wrote %d files in %.2f seconds.",
+            tree_name(ontology),
+            counts["classes"],
+            counts["miss"],
+            counts["run"],
+            counts["disk"],
+            counts["failed"],
+            counts["written"],
+            time.perf_counter() - start_time,
+        )
+        n_failed += counts["failed"]
+    if n_failed > 0:
+        logging.error("%d classes could not be generated.", n_failed)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
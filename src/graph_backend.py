@@ -0,0 +1,314 @@
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module loads the CASE ontology, and any supplemental graphs, into
+an rdflib Graph backed by a selectable triple store.  The generators'
+SPARQL queries run unchanged against either backend.
+
+* `rdflib` (default): rdflib's in-memory store and pure-Python SPARQL
+  engine.  This is the reference implementation.
+* `oxigraph`: An embedded Oxigraph store (PyPI packages `oxrdflib` and
+  `pyoxigraph`; no server), which evaluates SPARQL natively.  If a store
+  path is given, the parsed store is kept on disk and reused across runs
+  for as long as the input files are unchanged.
+"""
+
+import argparse
+import fcntl
+import hashlib
+import importlib.resources
+import json
+import logging
+import os
+import re
+import shutil
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import case_utils.ontology
+from rdflib import Graph, URIRef
+from rdflib.graph import DATASET_DEFAULT_GRAPH_ID
+from rdflib.term import Identifier
+
+from graph_cache import parse_cached
+
+BACKENDS = ["rdflib", "oxigraph"]
+
+CASE_VERSION = "1.4.0"
+
+CASE_ONTOLOGY_RESOURCE = "case-%s.ttl" % CASE_VERSION
+
+
+def values_clause(init_bindings: Mapping[str, Identifier]) -> str:
+    """
+    Render initial bindings as a trailing SPARQL VALUES clause.  This is how rdflib defines initBindings, and unlike Oxigraph's substitutions, it does not require the variables to be projected.
+
+    >>> print(values_clause({"nProperty": URIRef("http://example.org/ontology/foo"), "nClass": URIRef("http://example.org/ontology/A")}))
+    <BLANKLINE>
+    VALUES ( ?nClass ?nProperty ) {
+      ( <http://example.org/ontology/A> <http://example.org/ontology/foo> )
+    }
+    <BLANKLINE>
+    """
+    names = sorted(init_bindings)
+    return "\nVALUES ( %s ) {\n  ( %s )\n}\n" % (
+        " ".join("?" + x for x in names),
+        " ".join(init_bindings[x].n3() for x in names),
+    )
+
+
+def _new_oxigraph_graph(ox_store: Optional[Any] = None) -> Graph:
+    # Imported here so the default backend does not pay for loading
+    # Oxigraph.
+    from oxrdflib import OxigraphStore
+
+    class ValuesBindingOxigraphStore(OxigraphStore):
+        def query(
+            self,
+            query: Any,
+            initNs: Mapping[str, Any],
+            initBindings: Mapping[str, Identifier],
+            queryGraph: str,
+            **kwargs: object,
+        ) -> Any:
+            if initBindings and isinstance(query, str):
+                query += values_clause(initBindings)
+                initBindings = dict()
+            return super().query(query, initNs, initBindings, queryGraph, **kwargs)
+
+    return Graph(
+        store=ValuesBindingOxigraphStore(store=ox_store),
+        identifier=DATASET_DEFAULT_GRAPH_ID,
+    )
+
+
+def new_graph(backend: str = "rdflib") -> Graph:
+    if backend == "rdflib":
+        return Graph()
+    elif backend == "oxigraph":
+        return _new_oxigraph_graph()
+    raise ValueError("Unknown backend: %r." % backend)
+
+
+def case_versions() -> List[str]:
+    """
+    Returns the CASE releases bundled with case_utils, oldest first.
+
+    >>> CASE_VERSION in case_versions()
+    True
+    """
+    versions: List[str] = []
+    for resource in importlib.resources.files(case_utils.ontology).iterdir():
+        match = re.fullmatch(r"case-(\d+(?:\.\d+)*)\.ttl", resource.name)
+        if match is not None:
+            versions.append(match.group(1))
+    return sorted(versions, key=lambda x: tuple(int(y) for y in x.split(".")))
+
+
+def read_ontology(ontology: Optional[str] = None) -> str:
+    """
+    Returns the Turtle text of an ontology: a CASE release bundled with case_utils, named by its version, or else a Turtle file of an ontology and its imports.  Defaults to CASE_VERSION.
+    """
+    if ontology is None:
+        ontology = CASE_VERSION
+    if ontology in case_versions():
+        return (
+            importlib.resources.files(case_utils.ontology)
+            .joinpath("case-%s.ttl" % ontology)
+            .read_text()
+        )
+    if not os.path.exists(ontology):
+        raise ValueError(
+            "Not a bundled CASE version (%s) or a file: %r."
+            % (", ".join(case_versions()), ontology)
+        )
+    with open(ontology, "r") as in_fh:
+        return in_fh.read()
+
+
+def add_backend_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--ontology",
+        help="CASE version bundled with case_utils (default %s), or path of a Turtle file of an ontology and its imports."
+        % CASE_VERSION,
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="rdflib",
+        help="Triple store for evaluating queries.  rdflib is the reference.",
+    )
+    parser.add_argument(
+        "--store-path",
+        help="Directory for an on-disk store to reuse across runs.  Only used with --backend oxigraph.",
+    )
+    parser.add_argument(
+        "--supplemental-cache",
+        help="Directory for caching parsed supplemental graphs across runs.  Entries are keyed by file path and content.",
+    )
+    parser.add_argument(
+        "--schema-subset",
+        action="store_true",
+        help="Keep only the triples of supplemental graphs that the generators read, dropping instance data.  N-Triples, N-Quads and Turtle files are read in a stream, so memory is bounded by the schema rather than the file.",
+    )
+
+
+def parse_supplemental_graphs(
+    graph: Graph,
+    supplemental_graph_filenames: Sequence[str],
+    supplemental_cache_dir: Optional[str] = None,
+    schema_subset: bool = False,
+) -> None:
+    """
+    If schema_subset is true, only the triples the generators read are added.  See `/src/schema_subset.py`.
+    """
+    if supplemental_cache_dir is not None:
+        parse_cached(
+            graph,
+            supplemental_graph_filenames,
+            supplemental_cache_dir,
+            schema_subset=schema_subset,
+        )
+        logging.debug("len(graph) = %d.", len(graph))
+        return
+    for supplemental_graph_filename in supplemental_graph_filenames:
+        logging.debug("Loading %r.", supplemental_graph_filename)
+        if schema_subset:
+            # Imported here so paths that read no graphs do not load the
+            # parsers.
+            from schema_subset import parse_schema_subset
+
+            parse_schema_subset(graph, supplemental_graph_filename)
+        else:
+            graph.parse(supplemental_graph_filename)
+        logging.debug("len(graph) = %d.", len(graph))
+
+
+def _parse_into(
+    graph: Graph,
+    ttl_data: str,
+    supplemental_graph_filenames: Sequence[str],
+    supplemental_cache_dir: Optional[str] = None,
+    schema_subset: bool = False,
+) -> None:
+    graph.parse(data=ttl_data, format="turtle")
+    logging.debug("len(graph) = %d.", len(graph))
+    parse_supplemental_graphs(
+        graph, supplemental_graph_filenames, supplemental_cache_dir, schema_subset
+    )
+
+
+def _fingerprint(
+    ttl_data: str,
+    supplemental_graph_filenames: Sequence[str],
+    schema_subset: bool = False,
+) -> str:
+    hasher = hashlib.sha256()
+    hasher.update(ttl_data.encode())
+    if schema_subset:
+        hasher.update(b"\0schema-subset")
+    for supplemental_graph_filename in supplemental_graph_filenames:
+        hasher.update(b"\0" + os.path.abspath(supplemental_graph_filename).encode())
+        with open(supplemental_graph_filename, "rb") as in_fh:
+            hasher.update(hashlib.sha256(in_fh.read()).digest())
+    return hasher.hexdigest()
+
+
+def _load_persistent_oxigraph_graph(
+    store_path: str,
+    ttl_data: str,
+    supplemental_graph_filenames: Sequence[str],
+    supplemental_cache_dir: Optional[str],
+    schema_subset: bool = False,
+) -> Graph:
+    """
+    The on-disk store is (re)built under an exclusive lock when its recorded fingerprint does not match the inputs.  Otherwise it is opened read-only and copied into memory, so queries and any graph expansions never write to disk.
+    """
+    import pyoxigraph
+
+    fingerprint = _fingerprint(ttl_data, supplemental_graph_filenames, schema_subset)
+    sidecar_path = store_path.rstrip(os.sep) + ".json"
+    with open(store_path.rstrip(os.sep) + ".lock", "a") as lock_fh:
+        fcntl.flock(lock_fh, fcntl.LOCK_EX)
+        sidecar: Dict[str, Any] = dict()
+        if os.path.exists(sidecar_path):
+            with open(sidecar_path, "r") as in_fh:
+                sidecar = json.load(in_fh)
+        if sidecar.get("fingerprint") != fingerprint:
+            logging.debug("Building on-disk store %r.", store_path)
+            if os.path.exists(sidecar_path):
+                os.remove(sidecar_path)
+            shutil.rmtree(store_path, ignore_errors=True)
+            on_disk_store = pyoxigraph.Store(store_path)
+            on_disk_graph = _new_oxigraph_graph(on_disk_store)
+            _parse_into(
+                on_disk_graph,
+                ttl_data,
+                supplemental_graph_filenames,
+                supplemental_cache_dir,
+                schema_subset,
+            )
+            sidecar = {
+                "fingerprint": fingerprint,
+                "namespaces": {
+                    prefix: str(namespace)
+                    for (prefix, namespace) in on_disk_graph.namespaces()
+                },
+            }
+            on_disk_store.flush()
+            del on_disk_graph, on_disk_store
+            with open(sidecar_path, "w") as out_fh:
+                json.dump(sidecar, out_fh, indent=4)
+        fcntl.flock(lock_fh, fcntl.LOCK_SH)
+        logging.debug("Reusing on-disk store %r.", store_path)
+        in_memory_store = pyoxigraph.Store()
+        in_memory_store.bulk_extend(
+            pyoxigraph.Store.read_only(store_path).quads_for_pattern(None, None, None)
+        )
+    graph = _new_oxigraph_graph(in_memory_store)
+    for prefix, namespace in sidecar["namespaces"].items():
+        graph.bind(prefix, URIRef(namespace))
+    return graph
+
+
+def load_ontology_graph(
+    supplemental_graph_filenames: Sequence[str] = (),
+    backend: str = "rdflib",
+    store_path: Optional[str] = None,
+    supplemental_cache_dir: Optional[str] = None,
+    ontology: Optional[str] = None,
+    schema_subset: bool = False,
+) -> Graph:
+    ttl_data = read_ontology(ontology)
+    if store_path is not None:
+        if backend != "oxigraph":
+            raise ValueError(
+                "A store path is only supported with the oxigraph backend."
+            )
+        return _load_persistent_oxigraph_graph(
+            store_path,
+            ttl_data,
+            supplemental_graph_filenames,
+            supplemental_cache_dir,
+            schema_subset,
+        )
+    graph = new_graph(backend)
+    _parse_into(
+        graph,
+        ttl_data,
+        supplemental_graph_filenames,
+        supplemental_cache_dir,
+        schema_subset,
+    )
+    return graph
@@ -0,0 +1,235 @@
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module caches parsed graph files, such as the supplemental graphs
+given to the generators, as pickles of their triples and namespace
+bindings.  Loading a pickle skips the parser, which dominates the cost
+of reading a large Turtle file.
+
+Cache entries are named by a hash of the file's absolute path and a
+hash of its content (and of the rdflib version and cache format), so an
+edited file is parsed again on its next use.  Writing an entry removes
+the superseded entries for the same path.  Entries are written
+atomically, so concurrent processes can share a cache directory.
+
+When several files miss the cache, they are parsed in parallel worker
+processes, each writing its own entry.
+
+The schema subset of a file depends on the schema nodes already in the
+graph it is added to (see `/src/schema_subset.py`): those of the
+ontology and of the files before it.  Those nodes are hashed into the
+names of schema subset entries, alongside the path, so runs over
+different graphs keep separate entries.  As each file's subset depends
+on the files before it, schema subsets are parsed one file at a time.
+"""
+
+import concurrent.futures
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from typing import AbstractSet, List, Optional, Sequence, Tuple
+
+import rdflib
+from rdflib import Graph, URIRef
+from rdflib.term import Node
+
+# Increment when the pickled structure changes.
+CACHE_FORMAT_VERSION = 1
+
+CacheEntry = Tuple[List[Tuple[str, str]], List[Tuple[Node, Node, Node]]]
+
+
+def _path_key(
+    filename: str, known_schema_nodes: Optional[AbstractSet[URIRef]] = None
+) -> str:
+    hasher = hashlib.sha256(os.path.abspath(filename).encode())
+    if known_schema_nodes is not None:
+        hasher.update(b"\0schema-subset")
+        for n_node in sorted(known_schema_nodes):
+            hasher.update(b"\0" + n_node.encode())
+    return hasher.hexdigest()[:16]
+
+
+def cache_entry_path(
+    cache_dir: str,
+    filename: str,
+    known_schema_nodes: Optional[AbstractSet[URIRef]] = None,
+) -> str:
+    """
+    Returns the path of the cache entry for the current content of filename, whole, or, if known_schema_nodes is given, its schema subset.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(b"%d\0%s\0" % (CACHE_FORMAT_VERSION, rdflib.__version__.encode()))
+    with open(filename, "rb") as in_fh:
+        for chunk in iter(lambda: in_fh.read(1 << 20), b""):
+            hasher.update(chunk)
+    return os.path.join(
+        cache_dir,
+        "%s-%s.pickle" % (_path_key(filename, known_schema_nodes), hasher.hexdigest()),
+    )
+
+
+def _parse_to_cache(
+    filename: str,
+    entry_path: str,
+    known_schema_nodes: Optional[AbstractSet[URIRef]] = None,
+) -> None:
+    """
+    Parse filename and save its cache entry, whole, or, if known_schema_nodes is given, its schema subset.  Runs in worker processes.
+    """
+    entry: CacheEntry
+    if known_schema_nodes is not None:
+        from schema_subset import read_schema_subset
+
+        bindings, triples = read_schema_subset(
+            filename, known_schema_nodes=known_schema_nodes
+        )
+        entry = (bindings, list(triples))
+    else:
+        graph = Graph(bind_namespaces="none")
+        graph.parse(filename)
+        entry = (
+            [(prefix, str(namespace)) for (prefix, namespace) in graph.namespaces()],
+            list(graph),
+        )
+    cache_dir = os.path.dirname(entry_path)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix="_", suffix=".pickle")
+    try:
+        with os.fdopen(fd, "wb") as out_fh:
+            pickle.dump(entry, out_fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    # Remove entries for earlier content of the same file, in the same
+    # graph.
+    path_key = _path_key(filename, known_schema_nodes)
+    for sibling_name in os.listdir(cache_dir):
+        sibling_path = os.path.join(cache_dir, sibling_name)
+        if sibling_name.startswith(path_key + "-") and sibling_path != entry_path:
+            try:
+                os.remove(sibling_path)
+            except FileNotFoundError:
+                pass
+
+
+def _load_entry(
+    graph: Graph,
+    filename: str,
+    entry_path: str,
+    known_schema_nodes: Optional[AbstractSet[URIRef]] = None,
+) -> None:
+    """
+    Add the triples and namespace bindings of a cache entry to graph.
+    """
+    logging.debug("Loading %r from cache.", filename)
+    try:
+        with open(entry_path, "rb") as in_fh:
+            bindings, triples = pickle.load(in_fh)
+    except FileNotFoundError:
+        # Pruned by a process that saw different content.
+        _parse_to_cache(filename, entry_path, known_schema_nodes)
+        with open(entry_path, "rb") as in_fh:
+            bindings, triples = pickle.load(in_fh)
+    graph.store.addN((s, p, o, graph) for (s, p, o) in triples)
+    for prefix, namespace in bindings:
+        graph.bind(prefix, URIRef(namespace))
+
+
+def parse_cached(
+    graph: Graph,
+    filenames: Sequence[str],
+    cache_dir: str,
+    max_workers: int = 0,
+    schema_subset: bool = False,
+) -> None:
+    """
+    Add the triples and namespace bindings of each file to graph, as graph.parse() would, drawing on and filling the cache in cache_dir.  max_workers bounds the parallel parsers; 0 means one per CPU.  If schema_subset is true, only the triples the generators read are added and cached (see `/src/schema_subset.py`).
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as tmpdir:
+    ...     ttl_path = os.path.join(tmpdir, "ex.ttl")
+    ...     with open(ttl_path, "w") as out_fh:
+    ...         _ = out_fh.write("@prefix ex: <http://example.org/ontology/> .\\nex:A a ex:B .\\n")
+    ...     cache_dir = os.path.join(tmpdir, "cache")
+    ...     for _ in range(2):
+    ...         g = Graph()
+    ...         parse_cached(g, [ttl_path], cache_dir)
+    ...     with open(ttl_path, "a") as out_fh:
+    ...         _ = out_fh.write("ex:C a ex:B .\\n")
+    ...     g = Graph()
+    ...     parse_cached(g, [ttl_path], cache_dir)
+    ...     len(os.listdir(cache_dir))
+    1
+    >>> len(g)
+    2
+    >>> g.namespace_manager.store.namespace("ex")
+    rdflib.term.URIRef('http://example.org/ontology/')
+
+    A schema subset keeps the type a file gives a class declared in an earlier file, as parse_schema_subset() would:
+
+    >>> from schema_subset import parse_schema_subset
+    >>> with tempfile.TemporaryDirectory() as tmpdir:
+    ...     a_path = os.path.join(tmpdir, "a.ttl")
+    ...     with open(a_path, "w") as out_fh:
+    ...         _ = out_fh.write("@prefix ex: <http://example.org/ontology/> .\\n@prefix owl: <http://www.w3.org/2002/07/owl#> .\\nex:Thing a owl:Class .\\n")
+    ...     b_path = os.path.join(tmpdir, "b.nt")
+    ...     with open(b_path, "w") as out_fh:
+    ...         _ = out_fh.write("<http://example.org/ontology/Thing> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://example.org/ontology/Meta> .\\n")
+    ...     uncached = Graph()
+    ...     for filename in [a_path, b_path]:
+    ...         parse_schema_subset(uncached, filename)
+    ...     cached = Graph()
+    ...     parse_cached(cached, [a_path, b_path], os.path.join(tmpdir, "cache"), schema_subset=True)
+    >>> len(cached), set(cached) == set(uncached)
+    (2, True)
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    if schema_subset:
+        from schema_subset import graph_schema_nodes
+
+        for filename in filenames:
+            known_schema_nodes = frozenset(graph_schema_nodes(graph))
+            entry_path = cache_entry_path(cache_dir, filename, known_schema_nodes)
+            if not os.path.exists(entry_path):
+                logging.debug("Parsing %r into cache.", filename)
+                _parse_to_cache(filename, entry_path, known_schema_nodes)
+            _load_entry(graph, filename, entry_path, known_schema_nodes)
+        return
+
+    entry_paths = [cache_entry_path(cache_dir, x) for x in filenames]
+
+    misses = sorted(
+        {
+            (filename, entry_path)
+            for (filename, entry_path) in zip(filenames, entry_paths)
+            if not os.path.exists(entry_path)
+        }
+    )
+    if len(misses) == 1:
+        logging.debug("Parsing %r into cache.", misses[0][0])
+        _parse_to_cache(*misses[0])
+    elif len(misses) > 1:
+        logging.debug("Parsing %d files into cache.", len(misses))
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(len(misses), max_workers or os.cpu_count() or 1)
+        ) as executor:
+            for future in [executor.submit(_parse_to_cache, *x) for x in misses]:
+                future.result()
+
+    for filename, entry_path in zip(filenames, entry_paths):
+        _load_entry(graph, filename, entry_path)
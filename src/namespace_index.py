@@ -0,0 +1,165 @@
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module resolves IRIs to prefixed names against a fixed set of
+namespace bindings, such as CDO_CONTEXT plus the bindings of any
+supplemental graphs.  The generators use it in place of rdflib's
+NamespaceManager, which is built for bindings that can change at any
+time.
+
+The namespaces are held sorted, each with a pointer to the longest
+other namespace that is a prefix of it.  The longest namespace that is
+a prefix of an IRI is found by bisecting to the greatest namespace
+sorting at or before the IRI, and then walking up the pointers.
+
+Results match NamespaceManager.compute_qname() for the same bindings.
+An index can be shared by threads.
+"""
+
+import bisect
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rdflib import Graph
+from rdflib.namespace import split_uri
+
+# Local names that rdflib's split_uri() would not split further.  Other
+# local names are checked with split_uri().
+_SIMPLE_LOCAL_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_.\-]*")
+
+
+class NamespaceIndex:
+    """
+    >>> index = NamespaceIndex([
+    ...     ("ex", "http://example.org/"),
+    ...     ("ex-ontology", "http://example.org/ontology/"),
+    ... ])
+    >>> index.compute_qname("http://example.org/ontology/Thing")
+    ('ex-ontology', 'http://example.org/ontology/', 'Thing')
+    >>> index.qname("http://example.org/kb/thing-1")
+    'ns1:thing-1'
+    >>> index.compute_qname("http://example.net/Thing", False)
+    Traceback (most recent call last):
+        ...
+    KeyError: 'No known prefix for http://example.net/ and generate=False'
+    """
+
+    def __init__(self, bindings: Iterable[Tuple[str, str]]) -> None:
+        """
+        bindings is an iterable of (prefix, namespace IRI) pairs, as from Graph.namespaces().  If a namespace is bound more than once, the last prefix is used.
+        """
+        namespace_to_prefix: Dict[str, str] = dict()
+        for prefix, namespace in bindings:
+            namespace_to_prefix[str(namespace)] = prefix
+        self._namespaces: List[str] = sorted(namespace_to_prefix)
+        self._prefixes: List[str] = [namespace_to_prefix[x] for x in self._namespaces]
+        # _parents[i] is the index of the longest namespace that is a
+        # proper prefix of _namespaces[i], or -1.
+        self._parents: List[int] = []
+        ancestors: List[int] = []
+        for i, namespace in enumerate(self._namespaces):
+            while ancestors and not namespace.startswith(
+                self._namespaces[ancestors[-1]]
+            ):
+                ancestors.pop()
+            self._parents.append(ancestors[-1] if ancestors else -1)
+            ancestors.append(i)
+        self._generated_prefixes: Dict[str, str] = dict()
+        self._cache: Dict[str, Tuple[str, str, str]] = dict()
+        self._generation_lock = threading.Lock()
+
+    @classmethod
+    def from_graph(cls, graph: Graph) -> "NamespaceIndex":
+        """
+        Capture the graph's current bindings.  As rdflib does, the prefix the store reports for each namespace is used.
+        """
+        bindings: List[Tuple[str, str]] = []
+        for _, n_namespace in graph.namespaces():
+            prefix = graph.namespace_manager.store.prefix(n_namespace)
+            if prefix is not None:
+                bindings.append((prefix, str(n_namespace)))
+        return cls(bindings)
+
+    def _longest_namespace_position(self, iri: str) -> int:
+        i = bisect.bisect_right(self._namespaces, iri) - 1
+        while i >= 0 and not iri.startswith(self._namespaces[i]):
+            i = self._parents[i]
+        return i
+
+    def longest_namespace(self, iri: str) -> Optional[str]:
+        """
+        >>> index = NamespaceIndex([("a", "http://example.org/a/"), ("b", "http://example.org/b/")])
+        >>> index.longest_namespace("http://example.org/a/Thing")
+        'http://example.org/a/'
+        >>> index.longest_namespace("http://example.org/c/Thing") is None
+        True
+        """
+        i = self._longest_namespace_position(iri)
+        return None if i < 0 else self._namespaces[i]
+
+    def _resolve(self, iri: str) -> Tuple[Optional[str], str, str]:
+        i = self._longest_namespace_position(iri)
+        if i >= 0:
+            name = iri.removeprefix(self._namespaces[i])
+            if _SIMPLE_LOCAL_NAME.fullmatch(name):
+                return (self._prefixes[i], self._namespaces[i], name)
+        # Follow rdflib: split the IRI, and use the longest bound
+        # namespace only if it extends the split point.
+        try:
+            split_namespace, name = split_uri(iri)
+        except ValueError:
+            split_namespace, name = iri, ""
+        if i >= 0 and len(self._namespaces[i]) >= len(split_namespace):
+            return (
+                self._prefixes[i],
+                self._namespaces[i],
+                iri.removeprefix(self._namespaces[i]),
+            )
+        return (None, split_namespace, name)
+
+    def compute_qname(self, iri: str, generate: bool = True) -> Tuple[str, str, str]:
+        """
+        Returns (prefix, namespace IRI, local name).  For namespaces without a bound prefix, a prefix "ns1", "ns2", ... is generated as rdflib does, unless generate is False, when KeyError is raised.
+        """
+        cached = self._cache.get(iri)
+        if cached is not None:
+            return cached
+        prefix, namespace, name = self._resolve(iri)
+        if prefix is None:
+            prefix = self._generated_prefixes.get(namespace)
+        if prefix is None:
+            if not generate:
+                raise KeyError("No known prefix for %s and generate=False" % namespace)
+            # A prefix is chosen by reading the prefixes generated so far,
+            # so threads generate them one at a time.
+            with self._generation_lock:
+                prefix = self._generated_prefixes.get(namespace)
+                if prefix is None:
+                    used_prefixes = set(self._prefixes) | set(
+                        self._generated_prefixes.values()
+                    )
+                    num = 1
+                    while "ns%d" % num in used_prefixes:
+                        num += 1
+                    prefix = "ns%d" % num
+                    self._generated_prefixes[namespace] = prefix
+        return self._cache.setdefault(iri, (prefix, namespace, name))
+
+    def qname(self, iri: str) -> str:
+        prefix, _, name = self.compute_qname(iri)
+        if prefix == "":
+            return name
+        return prefix + ":" + name
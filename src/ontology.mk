@@ -29,6 +29,8 @@ SHELL := /bin/bash
 
 top_srcdir := ../..
 
+include $(top_srcdir)/src/build-trace.mk
+
 all: \
   all-classes.mk
 	$(MAKE) \
@@ -36,9 +38,12 @@ all: \
 
 all-classes.mk: \
   $(top_srcdir)/.venv.done.log \
-  $(top_srcdir)/src/generate_all_classes_mk.py
+  $(top_srcdir)/src/build_costs.py \
+  $(top_srcdir)/src/generate_all_classes_mk.py \
+  $(BUILD_COSTS)
 	source $(top_srcdir)/venv/bin/activate \
-	  && python3 $(top_srcdir)/src/generate_all_classes_mk.py \
+	  && $(call trace,classes-mk) python3 $(top_srcdir)/src/generate_all_classes_mk.py \
+	    $(if $(BUILD_COSTS),--costs $(BUILD_COSTS)) \
 	    _$@ \
 	    $(PREFIX_IRI)
 	mv _$@ $@
@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script shrinks SVG files rendered by Graphviz, without changing
+how they render:
+
+* The XML declaration, document type declaration and comments are
+  removed.
+* Unreferenced `id` attributes are removed, and the `<g>` elements left
+  without attributes are unwrapped.  `class` attributes are kept for
+  styling.
+* The hashed node names in `<title>` elements are shortened, e.g. to
+  `n1`.  Titles only show as tooltips.
+* Numbers lose trailing zeros, e.g. `14.00` becomes `14`.
+* Attributes equal to the value they would inherit, or to their
+  default, are removed.  `xml:space="preserve"` is removed from text
+  whose whitespace it does not affect.
+* Font attributes shared by every text are set once on the graph's
+  group, from which the texts inherit them.
+
+Line breaks between elements are kept, so the files still diff
+usefully.  Each optimized document is checked against the original:
+every drawn element must keep its geometry, its effective presentation
+attributes (including inherited ones), its links and its rendered
+text.
+
+The legend is left in each file.  Referencing a shared legend file
+from each diagram would change how the diagrams render where external
+references are not loaded, such as in `<img>` elements.
+
+Files are rewritten in place, unless `--output` is given.  With
+`--svgz`, a gzip-compressed copy is also written beside each output.
+The byte savings are reported.
+
+Usage example:
+
+    optimize_svg.py --svgz templates/*/*/*.svg
+"""
+
+import argparse
+import gzip
+import logging
+import os
+import re
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+SVG_NAMESPACE = "http://www.w3.org/2000/svg"
+XLINK_NAMESPACE = "http://www.w3.org/1999/xlink"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+ET.register_namespace("", SVG_NAMESPACE)
+ET.register_namespace("xlink", XLINK_NAMESPACE)
+
+# Presentation attributes that are inherited, with their initial
+# values.  None marks an attribute without a removable default, such as
+# font-family, which defaults to a user agent's choice.
+INHERITED_ATTRIBUTES: Dict[str, Optional[str]] = {
+    "fill": "black",
+    "fill-opacity": "1",
+    "font-family": None,
+    "font-size": None,
+    "font-style": "normal",
+    "font-weight": "normal",
+    "stroke": "none",
+    "stroke-opacity": "1",
+    "stroke-width": "1",
+    "text-anchor": "start",
+    XML_SPACE: "default",
+}
+
+# Attributes shared by every text are moved to the graph's group.
+HOISTED_ATTRIBUTES = ["font-family", "font-size"]
+
+# Attributes whose numbers can be rewritten.
+NUMERIC_ATTRIBUTES = {
+    "cx",
+    "cy",
+    "d",
+    "font-size",
+    "height",
+    "points",
+    "r",
+    "rx",
+    "ry",
+    "stroke-width",
+    "transform",
+    "viewBox",
+    "width",
+    "x",
+    "x1",
+    "x2",
+    "y",
+    "y1",
+    "y2",
+}
+
+DRAWN_ELEMENTS = {
+    "circle",
+    "ellipse",
+    "image",
+    "line",
+    "path",
+    "polygon",
+    "polyline",
+    "rect",
+    "text",
+}
+
+# Node names generated by generate_single_stub_dot.py.
+HASHED_NAME_PATTERN = re.compile(r"_[0-9a-f]{64}")
+
+# Inherited attributes that only affect text.
+TEXT_ATTRIBUTES = {
+    "font-family",
+    "font-size",
+    "font-style",
+    "font-weight",
+    "text-anchor",
+}
+
+
+def local_name(tag: str) -> str:
+    """
+    >>> local_name("{http://www.w3.org/2000/svg}g")
+    'g'
+    """
+    return tag.rsplit("}", 1)[-1]
+
+
+def trim_numbers(value: str) -> str:
+    """
+    Remove trailing zeros from the decimal numbers in an attribute value.
+
+    >>> trim_numbers("0.00 0.00 992.00 605.50")
+    '0 0 992 605.5'
+    >>> trim_numbers("M463.63,-139.27C463.94,-155.80 10.0,2")
+    'M463.63,-139.27C463.94,-155.8 10,2'
+    >>> trim_numbers("scale(1 1) rotate(0) translate(4 600.5)")
+    'scale(1 1) rotate(0) translate(4 600.5)'
+    """
+    return re.sub(
+        r"(\d+)\.(\d*?)0*(?![\d])",
+        lambda x: x.group(1) + ("." + x.group(2) if x.group(2) else ""),
+        value,
+    )
+
+
+def _normalized_numbers(value: str) -> str:
+    return re.sub(r"-?\d+(?:\.\d*)?", lambda x: repr(float(x.group(0))), value)
+
+
+def rendered_text(text: str, space: str) -> str:
+    """
+    Returns the characters a text element renders, per its xml:space handling.
+
+    >>> rendered_text("  a\\tb  c ", "default")
+    'a b c'
+    >>> rendered_text("  a b ", "preserve")
+    '  a b '
+    """
+    if space == "preserve":
+        return text.replace("\n", " ").replace("\t", " ")
+    return re.sub(r" +", " ", text.replace("\n", "").replace("\t", " ")).strip()
+
+
+def _text_content(element: ET.Element) -> str:
+    return "".join(element.itertext())
+
+
+def _walk(
+    element: ET.Element,
+    inherited: Dict[str, str],
+    context: Tuple[Tuple[str, str], ...],
+) -> Iterator[Tuple[ET.Element, Dict[str, str], Tuple[Tuple[str, str], ...]]]:
+    """
+    Yields each element, with the inheritable attribute values in effect for it, and the transforms and links of its ancestors.
+    """
+    effective = dict(inherited)
+    for key in INHERITED_ATTRIBUTES:
+        if key in element.attrib:
+            effective[key] = element.attrib[key]
+    yield (element, effective, context)
+    own_context: List[Tuple[str, str]] = []
+    if "transform" in element.attrib:
+        own_context.append(
+            ("transform", _normalized_numbers(element.attrib["transform"]))
+        )
+    if local_name(element.tag) == "a":
+        for key, value in sorted(element.attrib.items()):
+            if key not in ("id", "class"):
+                own_context.append((key, value))
+    for child in element:
+        yield from _walk(child, effective, context + tuple(own_context))
+
+
+def rendering_signature(root: ET.Element) -> List[Tuple[object, ...]]:
+    """
+    Returns, for each drawn element in document order, what determines its appearance.
+    """
+    defaults = {x: y for (x, y) in INHERITED_ATTRIBUTES.items() if y is not None}
+    signature: List[Tuple[object, ...]] = []
+    for element, effective, context in _walk(root, defaults, ()):
+        tag = local_name(element.tag)
+        if tag == "svg":
+            signature.append(
+                (
+                    tag,
+                    tuple(
+                        (x, _normalized_numbers(element.attrib.get(x, "")))
+                        for x in ("width", "height", "viewBox")
+                    ),
+                )
+            )
+        if tag not in DRAWN_ELEMENTS:
+            continue
+        own = tuple(
+            sorted(
+                (x, _normalized_numbers(y) if x in NUMERIC_ATTRIBUTES else y)
+                for (x, y) in element.attrib.items()
+                if x not in INHERITED_ATTRIBUTES and x not in ("id", "class")
+            )
+        )
+        presentation = tuple(
+            sorted(
+                (x, _normalized_numbers(y) if x in NUMERIC_ATTRIBUTES else y)
+                for (x, y) in effective.items()
+                if x != XML_SPACE and (x not in TEXT_ATTRIBUTES or tag == "text")
+            )
+        )
+        text = (
+            rendered_text(_text_content(element), effective[XML_SPACE])
+            if tag == "text"
+            else ""
+        )
+        signature.append((tag, own, presentation, context, text))
+    return signature
+
+
+def _referenced_ids(svg_text: str) -> Set[str]:
+    return set(re.findall(r"url\(#([^)]+)\)", svg_text)) | set(
+        re.findall(r"href=\"#([^\"]+)\"", svg_text)
+    )
+
+
+def _remove_redundant_attributes(
+    element: ET.Element, inherited: Dict[str, Optional[str]]
+) -> None:
+    effective = dict(inherited)
+    for key in INHERITED_ATTRIBUTES:
+        if key not in element.attrib:
+            continue
+        value = element.attrib[key]
+        if key == XML_SPACE and value == "preserve":
+            text = _text_content(element)
+            if rendered_text(text, "default") != text:
+                effective[key] = value
+                continue
+            value = "default"
+        if effective.get(key) == value:
+            del element.attrib[key]
+        else:
+            effective[key] = value
+    for child in element:
+        _remove_redundant_attributes(child, effective)
+
+
+def _unwrap_bare_groups(element: ET.Element) -> None:
+    for child in list(element):
+        _unwrap_bare_groups(child)
+    i = 0
+    while i < len(element):
+        child = element[i]
+        if local_name(child.tag) == "g" and not child.attrib and len(child) > 0:
+            grandchildren = list(child)
+            grandchildren[-1].tail = child.tail
+            element.remove(child)
+            for j, grandchild in enumerate(grandchildren):
+                element.insert(i + j, grandchild)
+            i += len(grandchildren)
+        else:
+            i += 1
+
+
+def _hoist_text_attributes(root: ET.Element) -> None:
+    graph_group = root.find("{%s}g" % SVG_NAMESPACE)
+    if graph_group is None:
+        return
+    texts = list(root.iter("{%s}text" % SVG_NAMESPACE))
+    if not texts:
+        return
+    for key in HOISTED_ATTRIBUTES:
+        values = {x.attrib.get(key) for x in texts}
+        if len(values) != 1 or None in values:
+            continue
+        # Only hoist where nothing between the group and the texts sets
+        # the attribute.
+        if any(key in x.attrib for x in graph_group.iter() if x not in texts):
+            continue
+        graph_group.set(key, texts[0].attrib[key])
+        for text in texts:
+            del text.attrib[key]
+
+
+def optimize_svg(svg_text: str) -> str:
+    """
+    Returns the optimized SVG document.  Raises ValueError if the optimized document would render differently.
+
+    >>> svg = '''<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+    ... <!-- Generated by graphviz -->
+    ... <svg width="62pt" height="44pt" viewBox="0.00 0.00 62.00 44.00" xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink">
+    ... <g id="graph0" class="graph" transform="translate(4 40)">
+    ... <polygon fill="white" stroke="none" points="-4,4 -4,-40 58,-40 58,4 -4,4"/>
+    ... <g id="node1" class="node">
+    ... <title>_511841b5c5761c0b43cd87c860955ce44b5328e2bd665042bee25eae1d6fe57a</title>
+    ... <g id="a_node1"><a xlink:title="http://www.w3.org/2002/07/owl#Thing">
+    ... <ellipse fill="none" stroke="black" cx="27.00" cy="-18.00" rx="27.00" ry="18.00"/>
+    ... <text xml:space="preserve" text-anchor="middle" x="27.00" y="-13.80" font-family="Times,serif" font-size="14.00">owl:Thing</text>
+    ... </a>
+    ... </g>
+    ... </g>
+    ... </g>
+    ... </svg>
+    ... '''
+    >>> print(optimize_svg(svg), end="")
+    <svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" width="62pt" height="44pt" viewBox="0 0 62 44">
+    <g class="graph" transform="translate(4 40)" font-family="Times,serif" font-size="14">
+    <polygon fill="white" points="-4,4 -4,-40 58,-40 58,4 -4,4" />
+    <g class="node">
+    <title>n1</title>
+    <a xlink:title="http://www.w3.org/2002/07/owl#Thing">
+    <ellipse fill="none" stroke="black" cx="27" cy="-18" rx="27" ry="18" />
+    <text text-anchor="middle" x="27" y="-13.8">owl:Thing</text>
+    </a>
+    </g>
+    </g>
+    </svg>
+    """
+    original_root = ET.fromstring(svg_text)
+    root = ET.fromstring(svg_text)
+    referenced_ids = _referenced_ids(svg_text)
+
+    short_names: Dict[str, str] = dict()
+
+    def _short_name(match: "re.Match[str]") -> str:
+        if match.group(0) not in short_names:
+            short_names[match.group(0)] = "n%d" % (len(short_names) + 1)
+        return short_names[match.group(0)]
+
+    for element in root.iter():
+        if element.attrib.get("id") not in referenced_ids:
+            element.attrib.pop("id", None)
+        for key in list(element.attrib):
+            if key in NUMERIC_ATTRIBUTES:
+                element.set(key, trim_numbers(element.attrib[key]))
+        if local_name(element.tag) == "title" and element.text:
+            element.text = HASHED_NAME_PATTERN.sub(_short_name, element.text)
+
+    _unwrap_bare_groups(root)
+    # Removed comments leave blank lines.
+    for element in root.iter():
+        if local_name(element.tag) == "text":
+            continue
+        for child in element:
+            if child.tail is not None and "\n" in child.tail and not child.tail.strip():
+                child.tail = "\n"
+    _hoist_text_attributes(root)
+    _remove_redundant_attributes(
+        root,
+        {x: y for (x, y) in INHERITED_ATTRIBUTES.items() if y is not None},
+    )
+
+    if rendering_signature(root) != rendering_signature(original_root):
+        raise ValueError("Optimizing would change how the SVG renders.")
+    return ET.tostring(root, encoding="unicode") + "\n"
+
+
+def write_svgz(svg_path: str, svg_text: str) -> int:
+    """
+    Writes a gzip-compressed copy of the SVG beside it, without a timestamp so the output is reproducible.  Returns its size in bytes.
+    """
+    svgz_data = gzip.compress(svg_text.encode(), compresslevel=9, mtime=0)
+    svgz_path = os.path.splitext(svg_path)[0] + ".svgz"
+    with open(svgz_path + "_", "wb") as out_fh:
+        out_fh.write(svgz_data)
+    os.replace(svgz_path + "_", svgz_path)
+    return len(svgz_data)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--output",
+        help="Path to write the optimized SVG.  Only allowed with one input file.  By default, input files are rewritten in place.",
+    )
+    parser.add_argument(
+        "--svgz",
+        action="store_true",
+        help="Also write a gzip-compressed .svgz file beside each output.",
+    )
+    parser.add_argument("in_svg", nargs="+")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    if args.output is not None and len(args.in_svg) > 1:
+        parser.error("--output requires exactly one input file.")
+
+    n_bytes_in = 0
+    n_bytes_out = 0
+    n_bytes_svgz = 0
+    for in_svg in args.in_svg:
+        with open(in_svg, "r", encoding="utf-8") as in_fh:
+            svg_text = in_fh.read()
+        optimized_text = optimize_svg(svg_text)
+        out_svg = in_svg if args.output is None else args.output
+        with open(out_svg + "_", "w", encoding="utf-8") as out_fh:
+            out_fh.write(optimized_text)
+        os.replace(out_svg + "_", out_svg)
+
+        size_in = len(svg_text.encode())
+        size_out = len(optimized_text.encode())
+        n_bytes_in += size_in
+        n_bytes_out += size_out
+        logging.debug("%s: %d -> %d bytes.", out_svg, size_in, size_out)
+        if args.svgz:
+            n_bytes_svgz += write_svgz(out_svg, optimized_text)
+
+    logging.info(
+        "Optimized %d files: %d -> %d bytes (%.1f%% smaller).",
+        len(args.in_svg),
+        n_bytes_in,
+        n_bytes_out,
+        100.0 * (n_bytes_in - n_bytes_out) / max(n_bytes_in, 1),
+    )
+    if args.svgz:
+        logging.info(
+            "Compressed copies: %d bytes (%.1f%% smaller than the originals).",
+            n_bytes_svgz,
+            100.0 * (n_bytes_in - n_bytes_svgz) / max(n_bytes_in, 1),
+        )
+
+
+if __name__ == "__main__":
+    main()
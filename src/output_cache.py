@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module keeps a user-level cache of the outputs of the stub
+generators, `/src/generate_single_stub_json.py` and
+`/src/generate_single_stub_dot.py`, for pipelines that repeat the same
+requests.  With `--output-cache`, a generator looks up its request
+before loading any graph, and on a hit writes the stored outputs.
+
+Requests are keyed by a hash of:
+
+* The generator, and a fingerprint of the source code in `/src` and the
+  versions of the libraries outputs depend on.
+* The content of the ontology, or of the schema model pickle.
+* The content of each supplemental graph, in order.
+* The class IRIs, and the options that affect the outputs.
+
+The cache directory, `--output-cache-dir`, defaults to
+`$XDG_CACHE_HOME/case-mapping-template-stubs/outputs` (by default under
+`~/.cache`).  Entries are written atomically, so parallel processes can
+share the directory.  Reading an entry marks it recently used, and
+after each write the least recently used entries are evicted until the
+cache is within `--output-cache-max-mb`.  One process evicts at a time;
+the others skip eviction rather than wait.
+"""
+
+import argparse
+import errno
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import platform
+import tempfile
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from graph_backend import read_ontology
+
+# Increment when the key or entry format changes.
+CACHE_FORMAT_VERSION = 1
+
+DEFAULT_MAX_MB = 256
+
+_EVICTION_LOCK_NAME = ".eviction.lock"
+
+
+def _touch(path: str) -> None:
+    """
+    Set the modification time, which records the last use, from the clock rather than the file system's coarser timestamps.
+    """
+    now = time.time_ns()
+    os.utime(path, ns=(now, now))
+
+
+def default_cache_dir(environ: Mapping[str, str] = os.environ) -> str:
+    """
+    >>> default_cache_dir({"XDG_CACHE_HOME": "/tmp/xdg-cache"})
+    '/tmp/xdg-cache/case-mapping-template-stubs/outputs'
+    >>> default_cache_dir({"XDG_CACHE_HOME": ""}) == os.path.join(os.path.expanduser("~"), ".cache", "case-mapping-template-stubs", "outputs")
+    True
+    """
+    cache_home = environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "case-mapping-template-stubs", "outputs")
+
+
+def file_digest(filename: str) -> str:
+    hasher = hashlib.sha256()
+    with open(filename, "rb") as in_fh:
+        for chunk in iter(lambda: in_fh.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def code_fingerprint() -> str:
+    """
+    Returns a hash of the source code in this directory and the versions of the libraries outputs depend on.
+    """
+    import importlib.metadata
+
+    hasher = hashlib.sha256()
+    hasher.update(
+        ("%d\0%s\0" % (CACHE_FORMAT_VERSION, platform.python_implementation())).encode()
+    )
+    for distribution in ("rdflib", "PyLD", "case-utils"):
+        hasher.update(
+            (
+                "%s=%s\0" % (distribution, importlib.metadata.version(distribution))
+            ).encode()
+        )
+    srcdir = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(srcdir)):
+        if name.endswith(".py"):
+            hasher.update(name.encode() + b"\0")
+            hasher.update(bytes.fromhex(file_digest(os.path.join(srcdir, name))))
+    return hasher.hexdigest()
+
+
+def input_digests(args: argparse.Namespace) -> List[Tuple[str, str]]:
+    """
+    Returns (role, content hash) of the ontology or schema model, and the supplemental graphs, named by a generator's arguments.
+    """
+    digests: List[Tuple[str, str]] = []
+    if args.schema_model:
+        digests.append(("schema-model", file_digest(args.schema_model)))
+    else:
+        digests.append(
+            (
+                "ontology",
+                hashlib.sha256(read_ontology(args.ontology).encode()).hexdigest(),
+            )
+        )
+    for filename in args.supplemental_graph:
+        digests.append(("supplemental-graph", file_digest(filename)))
+    return digests
+
+
+def request_key(
+    generator: str,
+    digests: List[Tuple[str, str]],
+    parameters: Mapping[str, Any],
+    code_key: Optional[str] = None,
+) -> str:
+    """
+    parameters are the class IRIs and options that affect the outputs.  They must be JSON-serializable.
+
+    >>> key = request_key("json", [("ontology", "ab")], {"class_iri": "urn:A"}, "c")
+    >>> key == request_key("json", [("ontology", "ab")], {"class_iri": "urn:A"}, "c")
+    True
+    >>> key == request_key("json", [("ontology", "ab")], {"class_iri": "urn:B"}, "c")
+    False
+    >>> key == request_key("dot", [("ontology", "ab")], {"class_iri": "urn:A"}, "c")
+    False
+    """
+    if code_key is None:
+        code_key = code_fingerprint()
+    return hashlib.sha256(
+        json.dumps([generator, code_key, digests, parameters], sort_keys=True).encode()
+    ).hexdigest()
+
+
+class RequestOutputCache:
+    """
+    Directory of outputs of generator requests, one JSON file of output names to text per request key, bounded to max_bytes by least-recent use.
+
+    >>> with tempfile.TemporaryDirectory() as tmpdir:
+    ...     cache = RequestOutputCache(tmpdir, max_bytes=150)
+    ...     cache.put("a" * 64, {"json": "x" * 50})
+    ...     cache.put("b" * 64, {"json": "y" * 50})
+    ...     _ = cache.get("a" * 64)
+    ...     cache.put("c" * 64, {"json": "z" * 50})
+    ...     [cache.get(x * 64) is not None for x in "abc"]
+    [True, False, True]
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_MB << 20) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "r") as in_fh:
+                entry: Dict[str, str] = json.load(in_fh)
+        except (FileNotFoundError, ValueError):
+            return None
+        try:
+            _touch(entry_path)
+        except FileNotFoundError:
+            # Evicted by another process since reading.
+            pass
+        return entry
+
+    def put(self, key: str, outputs: Mapping[str, str]) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix="_", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as out_fh:
+                json.dump(dict(outputs), out_fh)
+            _touch(tmp_path)
+            os.replace(tmp_path, self._entry_path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used entries until the cache is within max_bytes.  If another process is evicting, return at once.
+        """
+        with open(os.path.join(self.cache_dir, _EVICTION_LOCK_NAME), "a") as lock_fh:
+            try:
+                fcntl.flock(lock_fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EACCES):
+                    return
+                raise
+            entries: List[Tuple[int, int, str]] = []
+            for dir_entry in os.scandir(self.cache_dir):
+                if not dir_entry.name.endswith(".json"):
+                    continue
+                try:
+                    stat = dir_entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, dir_entry.path))
+            total_bytes = sum(x[1] for x in entries)
+            for _, size, path in sorted(entries):
+                if total_bytes <= self.max_bytes:
+                    break
+                logging.debug("Evicting %r.", path)
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total_bytes -= size
+
+
+def add_output_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--output-cache",
+        action="store_true",
+        help="Reuse the outputs of an identical earlier request, without loading any graph, and store the outputs of new requests.",
+    )
+    parser.add_argument(
+        "--output-cache-dir",
+        help="Directory of the output cache.  Default $XDG_CACHE_HOME/case-mapping-template-stubs/outputs.",
+    )
+    parser.add_argument(
+        "--output-cache-max-mb",
+        type=int,
+        default=DEFAULT_MAX_MB,
+        help="Evict the least recently used outputs beyond this size.  Default %(default)s.",
+    )
+
+
+def open_output_cache(args: argparse.Namespace) -> Optional[RequestOutputCache]:
+    if not args.output_cache:
+        return None
+    return RequestOutputCache(
+        args.output_cache_dir or default_cache_dir(), args.output_cache_max_mb << 20
+    )
+
+
+def write_outputs(
+    outputs: Mapping[str, str], paths: Mapping[str, Optional[str]]
+) -> None:
+    """
+    Write each output to its path, skipping outputs without a path.
+    """
+    for name, path in paths.items():
+        if path is not None:
+            with open(path, "w") as out_fh:
+                out_fh.write(outputs[name])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Report the size of the output cache, or clear it."
+    )
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument("--clear", action="store_true")
+    parser.add_argument("cache_dir", nargs="?", default=default_cache_dir())
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    if not os.path.isdir(args.cache_dir):
+        print("%s: no cache." % args.cache_dir)
+        return
+    entries = [x for x in os.scandir(args.cache_dir) if x.name.endswith(".json")]
+    if args.clear:
+        RequestOutputCache(args.cache_dir, 0).evict()
+        print("%s: cleared %d entries." % (args.cache_dir, len(entries)))
+        return
+    total_bytes = sum(x.stat().st_size for x in entries)
+    print(
+        "%s: %d entries, %.1f MB."
+        % (args.cache_dir, len(entries), total_bytes / (1 << 20))
+    )
+
+
+if __name__ == "__main__":
+    main()
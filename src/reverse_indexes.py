@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script builds reverse indexes from the schema model (see
+`/src/schema_model.py`), and saves them as JSON:
+
+* Property IRI to the IRIs of classes whose stubs carry the property.
+* Facet class IRI to the IRIs of classes that can bear the Facet by
+  `uco-core:hasFacet`.
+
+The indexes follow get_properties(), resolve_max_cardinality() and
+get_facet_classes() in `/src/generate_single_stub_json.py`, so a class
+is listed for a property exactly when the class's stub has a key for
+the property.
+"""
+
+import argparse
+import json
+import logging
+from typing import Dict, List, Tuple
+
+from schema_model import SchemaModel, load_schema_model
+
+
+class ReverseIndexes:
+    def __init__(
+        self,
+        property_to_classes: Dict[str, List[str]],
+        facet_to_bearer_classes: Dict[str, List[str]],
+    ) -> None:
+        self._property_to_classes: Dict[str, Tuple[str, ...]] = {
+            key: tuple(value) for (key, value) in property_to_classes.items()
+        }
+        self._facet_to_bearer_classes: Dict[str, Tuple[str, ...]] = {
+            key: tuple(value) for (key, value) in facet_to_bearer_classes.items()
+        }
+
+    def classes_with_property(self, property_iri: str) -> Tuple[str, ...]:
+        """
+        Returns an empty tuple for properties not used by any class.
+        """
+        return self._property_to_classes.get(property_iri, tuple())
+
+    def bearer_classes_of_facet(self, facet_class_iri: str) -> Tuple[str, ...]:
+        """
+        Returns an empty tuple for classes that are not Facets of any class.
+        """
+        return self._facet_to_bearer_classes.get(facet_class_iri, tuple())
+
+    def to_json(self) -> Dict[str, Dict[str, List[str]]]:
+        return {
+            "facet_to_bearer_classes": {
+                key: list(value)
+                for (key, value) in sorted(self._facet_to_bearer_classes.items())
+            },
+            "property_to_classes": {
+                key: list(value)
+                for (key, value) in sorted(self._property_to_classes.items())
+            },
+        }
+
+    def save(self, out_path: str) -> None:
+        with open(out_path, "w") as out_fh:
+            json.dump(self.to_json(), out_fh, indent=4)
+            out_fh.write("\n")
+
+    @classmethod
+    def load(cls, in_path: str) -> "ReverseIndexes":
+        with open(in_path, "r") as in_fh:
+            data = json.load(in_fh)
+        return cls(data["property_to_classes"], data["facet_to_bearer_classes"])
+
+
+def build_reverse_indexes(model: SchemaModel) -> ReverseIndexes:
+    """
+    >>> import rdflib
+    >>> from schema_model import build_schema_model
+    >>> g = rdflib.Graph()
+    >>> data = '''\
+@prefix ex: <http://example.org/ontology/> .\
+@prefix owl: <http://www.w3.org/2002/07/owl#> .\
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .\
+@prefix sh: <http://www.w3.org/ns/shacl#> .\
+@prefix uco-core: <https://ontology.unifiedcyberontology.org/uco/core/> .\
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .\
+\
+ex:A\
+  a owl:Class , sh:NodeShape ;\
+  sh:property [\
+    sh:path ex:foo ;\
+  ] ;\
+  .\
+\
+ex:B\
+  a owl:Class ;\
+  rdfs:subClassOf\
+    ex:A ,\
+    [\
+      a owl:Restriction ;\
+      owl:onProperty uco-core:hasFacet ;\
+      owl:onClass ex:BFacet ;\
+      owl:qualifiedCardinality "1"^^xsd:nonNegativeInteger ;\
+    ]\
+    ;\
+  .\
+\
+ex:BFacet\
+  a owl:Class ;\
+  rdfs:subClassOf uco-core:Facet ;\
+  .\
+'''
+    >>> _ = g.parse(data=data, format="turtle")
+    >>> indexes = build_reverse_indexes(build_schema_model(g))
+    >>> indexes.classes_with_property("http://example.org/ontology/foo")
+    ('http://example.org/ontology/A', 'http://example.org/ontology/B')
+    >>> indexes.bearer_classes_of_facet("http://example.org/ontology/BFacet")
+    ('http://example.org/ontology/B',)
+    >>> indexes.classes_with_property("http://example.org/ontology/bar")
+    ()
+    """
+    property_to_classes: Dict[str, List[str]] = dict()
+    facet_to_bearer_classes: Dict[str, List[str]] = dict()
+    class_ids = sorted(
+        (i for i in range(len(model.iris)) if model.is_class(i)),
+        key=model.iris.__getitem__,
+    )
+    for i_class in class_ids:
+        class_iri = model.iris[i_class]
+        for i_property in model.get_properties(i_class):
+            # Properties with maximum cardinality 0 are omitted from stubs.
+            if model.resolve_max_cardinality(i_class, i_property) == 0:
+                continue
+            property_to_classes.setdefault(model.iris[i_property], []).append(class_iri)
+        for i_facet_class in model.get_facet_classes(i_class):
+            facet_to_bearer_classes.setdefault(model.iris[i_facet_class], []).append(
+                class_iri
+            )
+    return ReverseIndexes(property_to_classes, facet_to_bearer_classes)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument("out_json")
+    parser.add_argument("schema_model", help="Schema model pickle.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    model = load_schema_model(args.schema_model)
+    indexes = build_reverse_indexes(model)
+    indexes.save(args.out_json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script measures how the generators scale with ontology size.  For
+each size, a synthetic ontology of that many classes is written (see
+`/src/synthetic_ontology.py`), and the JSON and DOT generators are run
+for its deepest class, with the synthetic ontology as a supplemental
+graph.  Each run's wall-clock and CPU seconds and peak resident set size
+are reported, with the seconds of each stage the generator records in
+a build trace (see `/src/build_trace.py`), e.g. `json:load` and
+`json:generate`.
+
+    scaling_curve.py --sizes 100,1000,10000 --output var/scaling-curve.tsv
+
+The output is tab-separated, a row per size and generator, for plotting
+against the `classes` or `triples` column.  Options after `--` are given
+to both generators, e.g. `-- --backend oxigraph`.  The synthetic
+ontology options of `/src/synthetic_ontology.py` are accepted too.
+"""
+
+import argparse
+import collections
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Sequence
+
+from build_trace import TRACE_FILE_VARIABLE
+from build_trace_report import duration, load_records
+from synthetic_ontology import (
+    add_synthetic_ontology_arguments,
+    class_iri,
+    deepest_class_index,
+    synthetic_ontology_from_arguments,
+)
+
+GENERATORS: Dict[str, str] = {
+    "json": "generate_single_stub_json.py",
+    "dot": "generate_single_stub_dot.py",
+}
+
+COLUMNS = [
+    "classes",
+    "triples",
+    "generator",
+    "seconds",
+    "cpu_seconds",
+    "peak_rss_mb",
+    "stages",
+]
+
+
+def parse_sizes(sizes: str) -> List[int]:
+    """
+    >>> parse_sizes("100, 1000,10000")
+    [100, 1000, 10000]
+    """
+    return [int(x) for x in sizes.split(",")]
+
+
+def run_measured(command: Sequence[str], trace_file: str) -> Dict[str, Any]:
+    """
+    Run a command, with a build trace recorded to trace_file, and return its wall-clock and CPU seconds, peak resident set size, and seconds per traced stage.
+    """
+    env = dict(os.environ)
+    env[TRACE_FILE_VARIABLE] = trace_file
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=env)
+    # wait4 gives the resource usage of this child alone.
+    _, status, rusage = os.wait4(process.pid, 0)
+    seconds = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command)
+    stage_seconds: Dict[str, float] = collections.defaultdict(float)
+    if os.path.exists(trace_file):
+        for record in load_records(trace_file):
+            stage_seconds[record["stage"]] += duration(record)
+    return {
+        "seconds": seconds,
+        "cpu_seconds": rusage.ru_utime + rusage.ru_stime,
+        "peak_rss_mb": rusage.ru_maxrss / 1024,
+        "stages": dict(stage_seconds),
+    }
+
+
+def format_row(row: Dict[str, Any]) -> str:
+    """
+    >>> format_row({"classes": 100, "triples": 1800, "generator": "json", "seconds": 2.5, "cpu_seconds": 2.25, "peak_rss_mb": 120.0, "stages": {"json:load": 1.5, "json:compact": 0.25}})
+    '100\\t1800\\tjson\\t2.500\\t2.250\\t120.0\\tjson:compact=0.250,json:load=1.500'
+    """
+    return "\t".join(
+        [
+            str(row["classes"]),
+            str(row["triples"]),
+            row["generator"],
+            "%.3f" % row["seconds"],
+            "%.3f" % row["cpu_seconds"],
+            "%.1f" % row["peak_rss_mb"],
+            ",".join("%s=%.3f" % x for x in sorted(row["stages"].items())),
+        ]
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--sizes",
+        default="100,1000,10000",
+        help="Comma-separated numbers of synthetic classes.",
+    )
+    parser.add_argument(
+        "--generator",
+        action="append",
+        choices=sorted(GENERATORS),
+        help="Generator to measure.  May be repeated.  Default all.",
+    )
+    parser.add_argument("--output", help="Path to write the tab-separated table.")
+    add_synthetic_ontology_arguments(parser)
+    parser.add_argument(
+        "generator_option",
+        nargs="*",
+        help="Options given to the generators, after `--`.",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    srcdir = os.path.dirname(os.path.abspath(__file__))
+    generators = args.generator or sorted(GENERATORS)
+    lines = ["\t".join(COLUMNS)]
+    print(lines[0], flush=True)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n_classes in parse_sizes(args.sizes):
+            graph = synthetic_ontology_from_arguments(args, n_classes)
+            ontology_path = os.path.join(tmpdir, "synthetic-%d.ttl" % n_classes)
+            graph.serialize(ontology_path, format="turtle")
+            n_class = class_iri(
+                deepest_class_index(n_classes, args.depth, args.branching)
+            )
+            for generator in generators:
+                out_path = os.path.join(tmpdir, "out-%d.%s" % (n_classes, generator))
+                trace_file = out_path + ".trace.jsonl"
+                logging.debug("Running %s for %d classes.", generator, n_classes)
+                row = run_measured(
+                    [
+                        sys.executable,
+                        os.path.join(srcdir, GENERATORS[generator]),
+                        *args.generator_option,
+                        out_path,
+                        str(n_class),
+                        ontology_path,
+                    ],
+                    trace_file,
+                )
+                row.update(classes=n_classes, triples=len(graph), generator=generator)
+                lines.append(format_row(row))
+                print(lines[-1], flush=True)
+
+    if args.output:
+        with open(args.output, "w") as out_fh:
+            out_fh.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script writes a SQLite catalogue of the classes in CDO namespaces, for
+applications that look up classes and properties interactively, such as
+autocompletion.  Its tables are:
+
+* `classes` and `properties`: IRI, prefix, local name, and the
+  rdfs:label and rdfs:comment text of each concept.
+* `class_properties`: The properties of each class's stub, with their
+  effective maximum cardinality (NULL for unbounded).
+* `class_facets`: The Facet classes each class can bear by
+  `uco-core:hasFacet`.
+* `superclasses`: The rdfs:subClassOf* closure of each class.
+* `stubs`: Each class's JSON stub, as written to `/templates`.
+* `search`: An FTS5 full-text index over qualified names, local names
+  split into words (e.g. "Archive File"), labels and comments.
+
+The catalogue follows the schema model (see `/src/schema_model.py`), so
+its properties, cardinalities and Facets match the stubs.  The
+SchemaCatalogue class answers lookups from a catalogue file:
+
+    schema_catalogue.py var/schema_catalogue.sqlite var/facet_cardinalities.ttl
+"""
+
+import argparse
+import logging
+import os
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from case_utils.namespace import NS_RDFS, NS_UCO_CORE
+from rdflib import Graph, Literal, URIRef
+
+import generate_single_stub_json
+from graph_backend import add_backend_arguments, load_ontology_graph
+from namespace_index import NamespaceIndex
+from schema_model import SchemaModel, build_schema_model
+
+SCHEMA = """\
+CREATE TABLE classes (
+    id INTEGER PRIMARY KEY,
+    iri TEXT NOT NULL UNIQUE,
+    prefix TEXT NOT NULL,
+    local_name TEXT NOT NULL,
+    label TEXT NOT NULL,
+    comment TEXT NOT NULL,
+    is_facet INTEGER NOT NULL
+);
+CREATE TABLE properties (
+    id INTEGER PRIMARY KEY,
+    iri TEXT NOT NULL UNIQUE,
+    prefix TEXT NOT NULL,
+    local_name TEXT NOT NULL,
+    label TEXT NOT NULL,
+    comment TEXT NOT NULL
+);
+CREATE TABLE class_properties (
+    class_id INTEGER NOT NULL REFERENCES classes (id),
+    property_id INTEGER NOT NULL REFERENCES properties (id),
+    max_cardinality INTEGER,
+    PRIMARY KEY (class_id, property_id)
+) WITHOUT ROWID;
+CREATE INDEX class_properties_by_property ON class_properties (property_id);
+CREATE TABLE class_facets (
+    class_id INTEGER NOT NULL REFERENCES classes (id),
+    facet_class_id INTEGER NOT NULL REFERENCES classes (id),
+    PRIMARY KEY (class_id, facet_class_id)
+) WITHOUT ROWID;
+CREATE INDEX class_facets_by_facet_class ON class_facets (facet_class_id);
+CREATE TABLE superclasses (
+    class_id INTEGER NOT NULL REFERENCES classes (id),
+    superclass_id INTEGER NOT NULL REFERENCES classes (id),
+    PRIMARY KEY (class_id, superclass_id)
+) WITHOUT ROWID;
+CREATE INDEX superclasses_by_superclass ON superclasses (superclass_id);
+CREATE TABLE stubs (
+    class_id INTEGER PRIMARY KEY REFERENCES classes (id),
+    json TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE search USING fts5 (
+    kind UNINDEXED,
+    iri UNINDEXED,
+    qname,
+    words,
+    label,
+    comment,
+    prefix = '2 3 4'
+);
+"""
+
+# bm25() weights of the search columns, ranking name matches above
+# label matches above comment matches.
+SEARCH_WEIGHTS = "0.0, 0.0, 10.0, 10.0, 5.0, 1.0"
+
+
+def split_camel_case(local_name: str) -> str:
+    """
+    >>> split_camel_case("ArchiveFile")
+    'Archive File'
+    >>> split_camel_case("URLHistoryFacet")
+    'URL History Facet'
+    >>> split_camel_case("hasFacet")
+    'has Facet'
+    """
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])", " ", local_name)
+
+
+def fts_query(text: str) -> str:
+    """
+    Returns an FTS5 query matching concepts with every word of the text as a word prefix.  Words are quoted, so FTS5 operators in the text are searched for as words.
+
+    >>> fts_query('Archive fi')
+    '"archive"* "fi"*'
+    >>> fts_query('"NOT"')
+    '"not"*'
+    >>> fts_query('')
+    ''
+    """
+    return " ".join('"%s"*' % x.lower() for x in re.findall(r"\w+", text))
+
+
+def _text(graph: Graph, n_concept: URIRef, n_predicate: URIRef) -> str:
+    return "\n".join(
+        sorted(
+            str(x)
+            for x in graph.objects(n_concept, n_predicate)
+            if isinstance(x, Literal)
+        )
+    )
+
+
+def catalogue_class_ids(model: SchemaModel) -> List[int]:
+    """
+    Returns the IDs of the classes in the namespaces of CDO_CONTEXT, in IRI order.
+    """
+    cdo_index = NamespaceIndex(
+        (prefix, str(namespace))
+        for (prefix, namespace) in generate_single_stub_json.CDO_CONTEXT.items()
+    )
+    class_ids: List[int] = []
+    for i, iri in enumerate(model.iris):
+        if not model.is_class(i):
+            continue
+        try:
+            _, _, local_name = cdo_index.compute_qname(iri, False)
+        except KeyError:
+            continue
+        if local_name:
+            class_ids.append(i)
+    return sorted(class_ids, key=model.iris.__getitem__)
+
+
+def write_schema_catalogue(
+    connection: sqlite3.Connection,
+    graph: Graph,
+    model: SchemaModel,
+    class_ids: Sequence[int],
+) -> None:
+    """
+    Write the catalogue tables of the given classes.  The graph supplies labels and comments, and should be the graph the model was built from.
+
+    >>> g = Graph()
+    >>> data = '''\
+@prefix ex: <http://example.org/ontology/> .\
+@prefix owl: <http://www.w3.org/2002/07/owl#> .\
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .\
+@prefix sh: <http://www.w3.org/ns/shacl#> .\
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .\
+\
+ex:ArchiveFile\
+  a owl:Class , sh:NodeShape ;\
+  rdfs:label "ArchiveFile"@en ;\
+  rdfs:comment "A file that bundles other files."@en ;\
+  sh:property [\
+    sh:path ex:archiveType ;\
+    sh:maxCount "1"^^xsd:integer ;\
+  ] ;\
+  .\
+\
+ex:Bag\
+  a owl:Class , sh:NodeShape ;\
+  rdfs:subClassOf ex:ArchiveFile ;\
+  .\
+'''
+    >>> _ = g.parse(data=data, format="turtle")
+    >>> model = build_schema_model(g)
+    >>> connection = sqlite3.connect(":memory:")
+    >>> class_ids = [model.id_of("http://example.org/ontology/" + x) for x in ["ArchiveFile", "Bag"]]
+    >>> write_schema_catalogue(connection, g, model, class_ids)
+    >>> catalogue = SchemaCatalogue(connection)
+    >>> catalogue.search("file")
+    [('class', 'http://example.org/ontology/ArchiveFile', 'ex:ArchiveFile')]
+    >>> catalogue.search("arch")
+    [('property', 'http://example.org/ontology/archiveType', 'ex:archiveType'), ('class', 'http://example.org/ontology/ArchiveFile', 'ex:ArchiveFile')]
+    >>> catalogue.search("bundles oth")
+    [('class', 'http://example.org/ontology/ArchiveFile', 'ex:ArchiveFile')]
+    >>> catalogue.properties("http://example.org/ontology/Bag")
+    [('http://example.org/ontology/archiveType', 1)]
+    >>> catalogue.superclasses("http://example.org/ontology/Bag")
+    ['http://example.org/ontology/ArchiveFile', 'http://example.org/ontology/Bag']
+    >>> catalogue.stub("http://example.org/ontology/Bag") is not None
+    True
+    >>> catalogue.stub("http://example.org/ontology/Thing") is None
+    True
+    """
+    connection.executescript(SCHEMA)
+
+    class_row_ids = {i: row_id for (row_id, i) in enumerate(class_ids, start=1)}
+    n_facet = model.id_of(str(NS_UCO_CORE.Facet))
+
+    def _concept_row(i: int) -> Tuple[str, str, str, str, str]:
+        iri = model.iris[i]
+        prefix, _, local_name = model.compute_qname(iri)
+        return (
+            iri,
+            prefix,
+            local_name,
+            _text(graph, URIRef(iri), NS_RDFS.label),
+            _text(graph, URIRef(iri), NS_RDFS.comment),
+        )
+
+    def _search_rows(
+        kind: str, rows: Iterable[Tuple[str, str, str, str, str]]
+    ) -> Iterable[Tuple[str, str, str, str, str, str]]:
+        for iri, prefix, local_name, label, comment in rows:
+            yield (
+                kind,
+                iri,
+                "%s:%s" % (prefix, local_name),
+                split_camel_case(local_name),
+                label,
+                comment,
+            )
+
+    class_rows = [_concept_row(i) for i in class_ids]
+    connection.executemany(
+        "INSERT INTO classes VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                class_row_ids[i],
+                *row,
+                int(n_facet is not None and model.is_strict_subclass(i, n_facet)),
+            )
+            for (i, row) in zip(class_ids, class_rows)
+        ),
+    )
+
+    class_property_rows: List[Tuple[int, int, Optional[int]]] = []
+    property_row_ids: Dict[int, int] = dict()
+    for i in class_ids:
+        for n_property in model.get_properties(i):
+            max_cardinality = model.resolve_max_cardinality(i, n_property)
+            # Properties with maximum cardinality 0 are omitted from stubs.
+            if max_cardinality == 0:
+                continue
+            property_row_ids.setdefault(n_property, 0)
+            class_property_rows.append((i, n_property, max_cardinality))
+    property_ids = sorted(property_row_ids, key=model.iris.__getitem__)
+    property_row_ids = {i: row_id for (row_id, i) in enumerate(property_ids, start=1)}
+    property_rows = [_concept_row(i) for i in property_ids]
+    connection.executemany(
+        "INSERT INTO properties VALUES (?, ?, ?, ?, ?, ?)",
+        ((property_row_ids[i], *row) for (i, row) in zip(property_ids, property_rows)),
+    )
+    connection.executemany(
+        "INSERT INTO class_properties VALUES (?, ?, ?)",
+        (
+            (class_row_ids[i], property_row_ids[j], max_cardinality)
+            for (i, j, max_cardinality) in class_property_rows
+        ),
+    )
+
+    connection.executemany(
+        "INSERT INTO class_facets VALUES (?, ?)",
+        (
+            (class_row_ids[i], class_row_ids[j])
+            for i in class_ids
+            for j in model.get_facet_classes(i)
+            if j in class_row_ids
+        ),
+    )
+    connection.executemany(
+        "INSERT INTO superclasses VALUES (?, ?)",
+        (
+            (class_row_ids[i], class_row_ids[j])
+            for i in class_ids
+            for j in model.superclass_closure(i)
+            if j in class_row_ids
+        ),
+    )
+
+    composer = generate_single_stub_json.StubComposer(model=model)
+    stub_rows: List[Tuple[int, str]] = []
+    for i in class_ids:
+        compacted_graph = generate_single_stub_json.compact_stub(
+            composer.compose([URIRef(model.iris[i])]),
+            lambda x: model.compute_qname(str(x), False)[:2],
+        )
+        stub_rows.append(
+            (
+                class_row_ids[i],
+                generate_single_stub_json.serialize_stub(compacted_graph),
+            )
+        )
+    connection.executemany("INSERT INTO stubs VALUES (?, ?)", stub_rows)
+
+    connection.executemany(
+        "INSERT INTO search VALUES (?, ?, ?, ?, ?, ?)",
+        _search_rows("class", class_rows),
+    )
+    connection.executemany(
+        "INSERT INTO search VALUES (?, ?, ?, ?, ?, ?)",
+        _search_rows("property", property_rows),
+    )
+    connection.execute("INSERT INTO search (search) VALUES ('optimize')")
+    connection.commit()
+
+
+class SchemaCatalogue:
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self._connection = connection
+
+    @classmethod
+    def load(cls, in_path: str) -> "SchemaCatalogue":
+        """
+        Open a catalogue file read-only.  Any number of processes can read it at once.
+        """
+        connection = sqlite3.connect(
+            "file:%s?mode=ro" % os.path.abspath(in_path),
+            uri=True,
+            check_same_thread=False,
+        )
+        return cls(connection)
+
+    def search(self, text: str, limit: int = 20) -> List[Tuple[str, str, str]]:
+        """
+        Returns (kind, IRI, qname) of the classes and properties with every word of the text as a word prefix of their qualified name, local name, label or comment, best matches first.  kind is "class" or "property".
+        """
+        query = fts_query(text)
+        if not query:
+            return []
+        return [
+            (kind, iri, qname)
+            for (kind, iri, qname) in self._connection.execute(
+                "SELECT kind, iri, qname FROM search WHERE search MATCH ?"
+                " ORDER BY bm25(search, %s), qname LIMIT ?" % SEARCH_WEIGHTS,
+                (query, limit),
+            )
+        ]
+
+    def stub(self, class_iri: str) -> Optional[str]:
+        """
+        Returns None for classes not in the catalogue.
+        """
+        row = self._connection.execute(
+            "SELECT json FROM stubs JOIN classes ON classes.id = stubs.class_id"
+            " WHERE classes.iri = ?",
+            (class_iri,),
+        ).fetchone()
+        return None if row is None else str(row[0])
+
+    def properties(self, class_iri: str) -> List[Tuple[str, Optional[int]]]:
+        """
+        Returns (property IRI, maximum cardinality) of the properties of the class's stub, with None for unbounded.
+        """
+        return [
+            (iri, max_cardinality)
+            for (iri, max_cardinality) in self._connection.execute(
+                "SELECT properties.iri, class_properties.max_cardinality"
+                " FROM class_properties"
+                " JOIN classes ON classes.id = class_properties.class_id"
+                " JOIN properties ON properties.id = class_properties.property_id"
+                " WHERE classes.iri = ? ORDER BY properties.iri",
+                (class_iri,),
+            )
+        ]
+
+    def _class_iris(self, query: str, iri: str) -> List[str]:
+        return [str(row[0]) for row in self._connection.execute(query, (iri,))]
+
+    def facet_classes(self, class_iri: str) -> List[str]:
+        return self._class_iris(
+            "SELECT facet.iri FROM class_facets"
+            " JOIN classes AS bearer ON bearer.id = class_facets.class_id"
+            " JOIN classes AS facet ON facet.id = class_facets.facet_class_id"
+            " WHERE bearer.iri = ? ORDER BY facet.iri",
+            class_iri,
+        )
+
+    def bearer_classes_of_facet(self, facet_class_iri: str) -> List[str]:
+        return self._class_iris(
+            "SELECT bearer.iri FROM class_facets"
+            " JOIN classes AS bearer ON bearer.id = class_facets.class_id"
+            " JOIN classes AS facet ON facet.id = class_facets.facet_class_id"
+            " WHERE facet.iri = ? ORDER BY bearer.iri",
+            facet_class_iri,
+        )
+
+    def superclasses(self, class_iri: str) -> List[str]:
+        """
+        Reflexive-transitive superclasses, i.e. rdfs:subClassOf*.
+        """
+        return self._class_iris(
+            "SELECT superclass.iri FROM superclasses"
+            " JOIN classes AS subclass ON subclass.id = superclasses.class_id"
+            " JOIN classes AS superclass ON superclass.id = superclasses.superclass_id"
+            " WHERE subclass.iri = ? ORDER BY superclass.iri",
+            class_iri,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    add_backend_arguments(parser)
+    parser.add_argument("out_sqlite")
+    parser.add_argument("supplemental_graph", nargs="*")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    graph = load_ontology_graph(
+        args.supplemental_graph,
+        args.backend,
+        args.store_path,
+        args.supplemental_cache,
+        args.ontology,
+        args.schema_subset,
+    )
+    for key in generate_single_stub_json.CDO_CONTEXT:
+        graph.bind(key, generate_single_stub_json.CDO_CONTEXT[key])
+    model = build_schema_model(graph)
+    class_ids = catalogue_class_ids(model)
+    logging.debug("Cataloguing %d classes.", len(class_ids))
+
+    if os.path.exists(args.out_sqlite):
+        os.remove(args.out_sqlite)
+    connection = sqlite3.connect(args.out_sqlite)
+    try:
+        write_schema_catalogue(connection, graph, model, class_ids)
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
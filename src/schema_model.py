@@ -0,0 +1,503 @@
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module provides a compact, read-only model of the portions of an
+ontology graph that the stub generators consult.
+
+Every class and property IRI is interned to an integer.  Subclass,
+type, facet and domain edges are stored as compressed-sparse-row (CSR)
+adjacency in `array`s, and cardinalities from SHACL property shapes and
+OWL restrictions are kept in a packed per-class table.  The model can be
+pickled once (see `/src/schema_model_pickle.py`) and loaded by the
+generators in place of parsing the full ontology graph.
+
+Blank-node class expressions other than `owl:Restriction`s (e.g.,
+anonymous `owl:intersectionOf` classes) are not traversed.  In CDO they
+carry no property definitions.
+"""
+
+import pickle
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from case_utils.namespace import NS_OWL, NS_RDF, NS_RDFS, NS_UCO_CORE
+from rdflib import SH, Graph, Literal, URIRef
+from rdflib.term import Node
+
+from namespace_index import NamespaceIndex
+
+# Value recorded in the cardinality table when a property is associated
+# with a class without a maximum count.
+UNBOUNDED = -1
+
+
+def _csr(
+    n_nodes: int, edges: Iterable[Tuple[int, int]]
+) -> Tuple["array[int]", "array[int]"]:
+    """
+    Pack (source, target) edges into CSR offset and target arrays.  Duplicate edges are removed, and targets are sorted per source.
+
+    >>> offsets, targets = _csr(3, [(0, 2), (0, 1), (2, 0), (0, 1)])
+    >>> offsets.tolist()
+    [0, 2, 2, 3]
+    >>> targets.tolist()
+    [1, 2, 0]
+    """
+    sorted_edges = sorted(set(edges))
+    offsets = _offsets(n_nodes, (x[0] for x in sorted_edges))
+    targets = array("I", (x[1] for x in sorted_edges))
+    return offsets, targets
+
+
+def _offsets(n_nodes: int, sorted_sources: Iterable[int]) -> "array[int]":
+    """
+    Compute CSR offsets from the sorted source-column of a packed table.
+
+    >>> _offsets(3, [0, 0, 2]).tolist()
+    [0, 2, 2, 3]
+    """
+    offsets = array("I", [0] * (n_nodes + 1))
+    for source in sorted_sources:
+        offsets[source + 1] += 1
+    for i in range(n_nodes):
+        offsets[i + 1] += offsets[i]
+    return offsets
+
+
+def _row(offsets: "array[int]", targets: "array[int]", i: int) -> "array[int]":
+    start = offsets[i]
+    end = offsets[i + 1]
+    return targets[start:end]
+
+
+def _list_members(graph: Graph, n_list: Node) -> Iterator[Node]:
+    """
+    Yield the rdf:first members of an RDF list, following rdf:rest.  Equivalent to the SPARQL path rdf:rest*/rdf:first.
+    """
+    seen: Set[Node] = set()
+    n_cursor: Optional[Node] = n_list
+    while n_cursor is not None and n_cursor not in seen:
+        seen.add(n_cursor)
+        yield from graph.objects(n_cursor, NS_RDF.first)
+        n_cursor = graph.value(n_cursor, NS_RDF.rest)
+
+
+class SchemaModel:
+    """
+    Integer-interned schema model.  Construct with build_schema_model() or load_schema_model().
+
+    Query methods take and return interned integers.  Methods taking with_unions=True additionally treat each member of an owl:unionOf or owl:disjointUnionOf class expression as a direct subclass of the expression's named class, matching the graph expansion done for diagrams.
+
+    Once built or loaded, a model's attributes cannot be reassigned, and query methods do not modify them, so one model can be shared by threads.
+    """
+
+    __slots__ = (
+        "iris",
+        "namespaces",
+        "class_flags",
+        "subclass_offsets",
+        "subclass_targets",
+        "union_subclass_offsets",
+        "union_subclass_targets",
+        "type_offsets",
+        "type_targets",
+        "anonymous_superclass_type_offsets",
+        "anonymous_superclass_type_targets",
+        "facet_offsets",
+        "facet_targets",
+        "domain_offsets",
+        "domain_targets",
+        "cardinality_offsets",
+        "cardinality_properties",
+        "cardinality_values",
+        "_iri_ids",
+        "_namespace_index",
+        "_frozen",
+    )
+
+    iris: List[str]
+    namespaces: Dict[str, str]
+    class_flags: bytearray
+    subclass_offsets: "array[int]"
+    subclass_targets: "array[int]"
+    union_subclass_offsets: "array[int]"
+    union_subclass_targets: "array[int]"
+    type_offsets: "array[int]"
+    type_targets: "array[int]"
+    anonymous_superclass_type_offsets: "array[int]"
+    anonymous_superclass_type_targets: "array[int]"
+    facet_offsets: "array[int]"
+    facet_targets: "array[int]"
+    domain_offsets: "array[int]"
+    domain_targets: "array[int]"
+    cardinality_offsets: "array[int]"
+    cardinality_properties: "array[int]"
+    cardinality_values: "array[int]"
+    _iri_ids: Dict[str, int]
+    _namespace_index: NamespaceIndex
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {
+            key: getattr(self, key) for key in self.__slots__ if not key.startswith("_")
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        for key in state:
+            setattr(self, key, state[key])
+        self._iri_ids = {iri: i for (i, iri) in enumerate(self.iris)}
+        self._namespace_index = NamespaceIndex(
+            (prefix, namespace) for (namespace, prefix) in self.namespaces.items()
+        )
+        self._frozen = True
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        """
+        >>> model = build_schema_model(Graph())
+        >>> model.iris = []
+        Traceback (most recent call last):
+            ...
+        AttributeError: SchemaModel is immutable once built: 'iris'.
+        """
+        if getattr(self, "_frozen", False):
+            raise AttributeError("SchemaModel is immutable once built: %r." % key)
+        object.__setattr__(self, key, value)
+
+    def id_of(self, iri: str) -> Optional[int]:
+        return self._iri_ids.get(iri)
+
+    def is_class(self, i: int) -> bool:
+        """
+        True if the concept is declared an owl:Class.
+        """
+        return bool(self.class_flags[i])
+
+    def superclasses(self, i: int, with_unions: bool = False) -> List[int]:
+        """
+        Direct named superclasses.
+        """
+        retval = _row(self.subclass_offsets, self.subclass_targets, i).tolist()
+        if with_unions:
+            retval += _row(
+                self.union_subclass_offsets, self.union_subclass_targets, i
+            ).tolist()
+        return retval
+
+    def superclass_closure(self, i: int, with_unions: bool = False) -> Set[int]:
+        """
+        Reflexive-transitive superclasses, i.e. rdfs:subClassOf*.
+        """
+        closure: Set[int] = {i}
+        stack: List[int] = [i]
+        while stack:
+            for j in self.superclasses(stack.pop(), with_unions):
+                if j not in closure:
+                    closure.add(j)
+                    stack.append(j)
+        return closure
+
+    def is_strict_subclass(self, i: int, j: int, with_unions: bool = False) -> bool:
+        """
+        True if i rdfs:subClassOf+ j.
+        """
+        for k in self.superclasses(i, with_unions):
+            if j in self.superclass_closure(k, with_unions):
+                return True
+        return False
+
+    def types(self, i: int) -> List[int]:
+        return _row(self.type_offsets, self.type_targets, i).tolist()
+
+    def anonymous_superclass_types(self, i: int) -> List[int]:
+        """
+        Types of blank-node direct superclasses (e.g., owl:Restriction), which are reached by rdfs:subClassOf*/rdf:type.
+        """
+        return _row(
+            self.anonymous_superclass_type_offsets,
+            self.anonymous_superclass_type_targets,
+            i,
+        ).tolist()
+
+    def direct_facet_classes(self, i: int, with_unions: bool = False) -> Set[int]:
+        """
+        Facet classes named in owl:Restrictions on uco-core:hasFacet that are direct superclasses of i.  Only subclasses of uco-core:Facet are returned.
+        """
+        retval: Set[int] = set()
+        n_facet = self.id_of(str(NS_UCO_CORE.Facet))
+        if n_facet is None:
+            return retval
+        for j in _row(self.facet_offsets, self.facet_targets, i):
+            if self.is_strict_subclass(j, n_facet, with_unions):
+                retval.add(j)
+        return retval
+
+    def get_facet_classes(self, i: int, with_unions: bool = False) -> Set[int]:
+        retval: Set[int] = set()
+        for j in self.superclass_closure(i, with_unions):
+            retval |= self.direct_facet_classes(j, with_unions)
+        return retval
+
+    def cardinality_rows(self, i: int) -> Iterator[Tuple[int, int]]:
+        """
+        Yield the (property, maximum count) pairs stated directly on i, by SHACL property shapes or OWL restrictions.  The maximum count is UNBOUNDED for statements without a ceiling.
+        """
+        for k in range(self.cardinality_offsets[i], self.cardinality_offsets[i + 1]):
+            yield self.cardinality_properties[k], self.cardinality_values[k]
+
+    def domain_properties(self, i: int) -> List[int]:
+        """
+        Properties with i as rdfs:domain, or as a member of an owl:unionOf rdfs:domain.
+        """
+        return _row(self.domain_offsets, self.domain_targets, i).tolist()
+
+    def get_properties(self, i: int) -> Set[int]:
+        retval: Set[int] = set()
+        for j in self.superclass_closure(i):
+            for n_property, _ in self.cardinality_rows(j):
+                retval.add(n_property)
+            retval.update(self.domain_properties(j))
+        return retval
+
+    def resolve_max_cardinality(self, i: int, n_property: int) -> Optional[int]:
+        """
+        Returns None for unbounded, otherwise an int for ceiling.
+        """
+        max_counts: Set[int] = set()
+        for j in self.superclass_closure(i):
+            for k, max_count in self.cardinality_rows(j):
+                if k == n_property and max_count != UNBOUNDED:
+                    max_counts.add(max_count)
+        if len(max_counts) == 0:
+            return None
+        else:
+            return min(max_counts)
+
+    def compute_qname(self, iri: str, generate: bool = True) -> Tuple[str, str, str]:
+        """
+        Follows the resolution of rdflib's NamespaceManager.compute_qname against the namespace bindings recorded when the model was built.
+        """
+        return self._namespace_index.compute_qname(iri, generate)
+
+    def qname(self, iri: str) -> str:
+        return self._namespace_index.qname(iri)
+
+
+def build_schema_model(graph: Graph) -> SchemaModel:
+    """
+    Namespace bindings are captured from the graph, so the caller should bind prefixes before calling.
+
+    >>> import rdflib
+    >>> g = rdflib.Graph()
+    >>> data = '''\
+@prefix ex: <http://example.org/ontology/> .\
+@prefix owl: <http://www.w3.org/2002/07/owl#> .\
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .\
+@prefix sh: <http://www.w3.org/ns/shacl#> .\
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .\
+\
+ex:A\
+  a owl:Class , sh:NodeShape ;\
+  sh:property [\
+    sh:maxCount 4 ;\
+    sh:path ex:foo ;\
+  ] ;\
+  .\
+\
+ex:B\
+  a owl:Class ;\
+  rdfs:subClassOf\
+    ex:A ,\
+    [\
+      a owl:Restriction ;\
+      owl:onProperty ex:foo ;\
+      owl:maxCardinality "2"^^xsd:nonNegativeInteger ;\
+    ]\
+    ;\
+  .\
+\
+ex:bar\
+  a owl:DatatypeProperty ;\
+  rdfs:domain [\
+    a owl:Class ;\
+    owl:unionOf (\
+      ex:A\
+    );\
+  ];\
+  .\
+'''
+    >>> _ = g.parse(data=data, format="turtle")
+    >>> g.bind("ex", "http://example.org/ontology/")
+    >>> model = build_schema_model(g)
+    >>> i_a = model.id_of("http://example.org/ontology/A")
+    >>> i_b = model.id_of("http://example.org/ontology/B")
+    >>> i_foo = model.id_of("http://example.org/ontology/foo")
+    >>> sorted(model.qname(model.iris[x]) for x in model.get_properties(i_b))
+    ['ex:bar', 'ex:foo']
+    >>> model.resolve_max_cardinality(i_a, i_foo)
+    4
+    >>> model.resolve_max_cardinality(i_b, i_foo)
+    2
+    >>> model2 = pickle.loads(pickle.dumps(model))
+    >>> model2.resolve_max_cardinality(i_b, i_foo)
+    2
+    """
+    iris: List[str] = []
+    iri_ids: Dict[str, int] = dict()
+
+    def _intern(n_thing: URIRef) -> int:
+        iri = str(n_thing)
+        if iri not in iri_ids:
+            iri_ids[iri] = len(iris)
+            iris.append(iri)
+        return iri_ids[iri]
+
+    class_ids: Set[int] = set()
+    for n_class in graph.subjects(NS_RDF.type, NS_OWL.Class):
+        if isinstance(n_class, URIRef):
+            class_ids.add(_intern(n_class))
+
+    subclass_edges: Set[Tuple[int, int]] = set()
+    union_subclass_edges: Set[Tuple[int, int]] = set()
+    anonymous_superclass_type_edges: Set[Tuple[int, int]] = set()
+    facet_edges: Set[Tuple[int, int]] = set()
+    domain_edges: Set[Tuple[int, int]] = set()
+    cardinality_rows: Set[Tuple[int, int, int]] = set()
+
+    for n_class, n_superclass in graph.subject_objects(NS_RDFS.subClassOf):
+        if not isinstance(n_class, URIRef):
+            continue
+        if isinstance(n_superclass, URIRef):
+            subclass_edges.add((_intern(n_class), _intern(n_superclass)))
+            continue
+        for n_type in graph.objects(n_superclass, NS_RDF.type):
+            if isinstance(n_type, URIRef):
+                anonymous_superclass_type_edges.add((_intern(n_class), _intern(n_type)))
+        if (n_superclass, NS_RDF.type, NS_OWL.Restriction) not in graph:
+            continue
+        max_counts: List[int] = []
+        for n_cardinality_predicate in [NS_OWL.cardinality, NS_OWL.maxCardinality]:
+            for l_max_count in graph.objects(n_superclass, n_cardinality_predicate):
+                if isinstance(l_max_count, Literal):
+                    max_counts.append(int(l_max_count))
+        for n_property in graph.objects(n_superclass, NS_OWL.onProperty):
+            if not isinstance(n_property, URIRef):
+                continue
+            for max_count in [UNBOUNDED] + max_counts:
+                cardinality_rows.add((_intern(n_class), _intern(n_property), max_count))
+            if n_property == NS_UCO_CORE.hasFacet:
+                for n_facet_class in graph.objects(n_superclass, NS_OWL.onClass):
+                    if isinstance(n_facet_class, URIRef):
+                        facet_edges.add((_intern(n_class), _intern(n_facet_class)))
+
+    for n_class, n_property_shape in graph.subject_objects(SH.property):
+        if not isinstance(n_class, URIRef):
+            continue
+        max_counts = []
+        for l_max_count in graph.objects(n_property_shape, SH.maxCount):
+            if isinstance(l_max_count, Literal):
+                max_counts.append(int(l_max_count))
+        for n_property in graph.objects(n_property_shape, SH.path):
+            if not isinstance(n_property, URIRef):
+                continue
+            for max_count in [UNBOUNDED] + max_counts:
+                cardinality_rows.add((_intern(n_class), _intern(n_property), max_count))
+
+    for n_property, n_domain in graph.subject_objects(NS_RDFS.domain):
+        if not isinstance(n_property, URIRef):
+            continue
+        n_domain_classes: List[Node] = [n_domain]
+        for n_union in graph.objects(n_domain, NS_OWL.unionOf):
+            n_domain_classes.extend(_list_members(graph, n_union))
+        for n_domain_class in n_domain_classes:
+            if isinstance(n_domain_class, URIRef):
+                domain_edges.add((_intern(n_domain_class), _intern(n_property)))
+
+    for n_union_predicate in [NS_OWL.disjointUnionOf, NS_OWL.unionOf]:
+        for n_superclass, n_union in graph.subject_objects(n_union_predicate):
+            if not isinstance(n_superclass, URIRef):
+                continue
+            for n_member in _list_members(graph, n_union):
+                if isinstance(n_member, URIRef):
+                    union_subclass_edges.add((_intern(n_member), _intern(n_superclass)))
+
+    # Record types of every concept in the class hierarchy, and of the
+    # types themselves, for metaclass display.
+    class_node_ids: Set[int] = set(class_ids)
+    for edges in [
+        subclass_edges,
+        union_subclass_edges,
+        anonymous_superclass_type_edges,
+        facet_edges,
+    ]:
+        for edge in edges:
+            class_node_ids.update(edge)
+    class_node_ids.update(x[0] for x in domain_edges)
+    type_edges: Set[Tuple[int, int]] = set()
+    stack = list(class_node_ids)
+    while stack:
+        i = stack.pop()
+        for n_type in graph.objects(URIRef(iris[i]), NS_RDF.type):
+            if not isinstance(n_type, URIRef):
+                continue
+            j = _intern(n_type)
+            type_edges.add((i, j))
+            if j not in class_node_ids:
+                class_node_ids.add(j)
+                stack.append(j)
+
+    n_nodes = len(iris)
+    model = SchemaModel()
+    model.iris = iris
+    model.namespaces = dict()
+    for _, n_namespace in graph.namespaces():
+        prefix = graph.namespace_manager.store.prefix(n_namespace)
+        if prefix is not None:
+            model.namespaces[str(n_namespace)] = prefix
+    model._namespace_index = NamespaceIndex(
+        (prefix, namespace) for (namespace, prefix) in model.namespaces.items()
+    )
+    model.class_flags = bytearray(n_nodes)
+    for i in class_ids:
+        model.class_flags[i] = 1
+    model.subclass_offsets, model.subclass_targets = _csr(n_nodes, subclass_edges)
+    model.union_subclass_offsets, model.union_subclass_targets = _csr(
+        n_nodes, union_subclass_edges
+    )
+    model.type_offsets, model.type_targets = _csr(n_nodes, type_edges)
+    (
+        model.anonymous_superclass_type_offsets,
+        model.anonymous_superclass_type_targets,
+    ) = _csr(n_nodes, anonymous_superclass_type_edges)
+    model.facet_offsets, model.facet_targets = _csr(n_nodes, facet_edges)
+    model.domain_offsets, model.domain_targets = _csr(n_nodes, domain_edges)
+    sorted_rows = sorted(cardinality_rows)
+    model.cardinality_offsets = _offsets(n_nodes, (x[0] for x in sorted_rows))
+    model.cardinality_properties = array("I", (x[1] for x in sorted_rows))
+    model.cardinality_values = array("i", (x[2] for x in sorted_rows))
+    model._iri_ids = iri_ids
+    model._frozen = True
+    return model
+
+
+def save_schema_model(model: SchemaModel, out_path: str) -> None:
+    with open(out_path, "wb") as out_fh:
+        pickle.dump(model, out_fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_schema_model(in_path: str) -> SchemaModel:
+    with open(in_path, "rb") as in_fh:
+        model = pickle.load(in_fh)
+    if not isinstance(model, SchemaModel):
+        raise TypeError("File does not contain a SchemaModel: %r." % in_path)
+    return model
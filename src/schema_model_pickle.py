@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script builds the compact schema model (see `/src/schema_model.py`)
+from CASE and any supplemental graphs, and saves it as a pickle for the
+`--schema-model` option of the stub generators.
+"""
+
+import argparse
+import logging
+
+from generate_single_stub_dot import CDO_CONTEXT
+from graph_backend import add_backend_arguments, load_ontology_graph
+from schema_model import build_schema_model, save_schema_model
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    add_backend_arguments(parser)
+    parser.add_argument("out_pickle")
+    parser.add_argument("supplemental_graph", nargs="*")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    graph = load_ontology_graph(
+        args.supplemental_graph,
+        args.backend,
+        args.store_path,
+        args.supplemental_cache,
+        args.ontology,
+        args.schema_subset,
+    )
+
+    for key in CDO_CONTEXT:
+        graph.bind(key, CDO_CONTEXT[key])
+
+    model = build_schema_model(graph)
+    logging.debug("len(model.iris) = %d.", len(model.iris))
+
+    save_schema_model(model, args.out_pickle)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module reads the schema subset of a supplemental graph: the
+triples the generators read, defining classes, their superclasses and
+types, property domains, OWL restrictions and SHACL property shapes.
+Instance data, which can be most of a graph that bundles schema with
+data, is dropped as it is read.
+
+N-Triples and N-Quads files (optionally gzip-compressed) are read a line
+at a time, and Turtle files a chunk of whole statements at a time, so
+memory is bounded by the size of the schema rather than of the file.
+Graph names of N-Quads are ignored.  Files of other formats are parsed
+whole, then filtered.
+
+A triple is kept on sight if its predicate is one the generators read,
+or if it types its subject as a class, restriction or shape.  Other
+`rdf:type` triples are kept if their subject is a schema node, e.g. a
+class typed with a metaclass.  The schema nodes include those already
+in the graph the subset is added to, so a file can type a class of the
+base ontology.  As a node may be found to be a schema node after its
+types were read, a file with other type triples, such as those of
+instances, is read a second time for them.  Lines of N-Triples
+and N-Quads that cannot hold a wanted triple are skipped unparsed.
+
+Run as a script, this module writes the schema subset of a file as
+Turtle:
+
+    schema_subset.py --output extension-schema.ttl bundle.nt.gz
+"""
+
+import argparse
+import collections
+import gzip
+import logging
+import os
+import pathlib
+import re
+import uuid
+from typing import (
+    AbstractSet,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+    Union,
+    cast,
+)
+
+from case_utils.namespace import NS_OWL, NS_RDF, NS_RDFS
+from rdflib import SH, BNode, Graph, URIRef
+from rdflib.exceptions import ParserError
+from rdflib.plugins.parsers.notation3 import RDFSink, SinkParser
+from rdflib.plugins.parsers.ntriples import (
+    W3CNTriplesParser,
+    r_nodeid,
+    r_tail,
+    r_wspace,
+)
+from rdflib.term import Node
+from rdflib.util import guess_format
+
+Triple = Tuple[Node, Node, Node]
+
+# Keep in step with the predicates read by schema_model.build_schema_model
+# and by the generators' SPARQL queries.
+SCHEMA_PREDICATES = frozenset(
+    {
+        NS_OWL.cardinality,
+        NS_OWL.disjointUnionOf,
+        NS_OWL.maxCardinality,
+        NS_OWL.onClass,
+        NS_OWL.onProperty,
+        NS_OWL.unionOf,
+        NS_RDF.first,
+        NS_RDF.rest,
+        NS_RDFS.domain,
+        NS_RDFS.subClassOf,
+        SH.maxCount,
+        SH.path,
+        SH.property,
+    }
+)
+
+SCHEMA_TYPES = frozenset(
+    {
+        NS_OWL.Class,
+        NS_OWL.Restriction,
+        NS_RDFS.Class,
+        SH.NodeShape,
+    }
+)
+
+LIST_PREDICATES = frozenset({NS_RDF.first, NS_RDF.rest})
+
+# Lines of N-Triples and N-Quads not matching these cannot hold a triple
+# of the subset, or a type triple, so are skipped without parsing.
+_SCHEMA_LINE = re.compile(
+    "|".join(re.escape("<%s>" % x) for x in sorted(SCHEMA_PREDICATES | {NS_RDF.type}))
+)
+_TYPE_LINE = re.compile(re.escape("<%s>" % NS_RDF.type))
+
+# Statements are fed to the Turtle parser in chunks of about this many
+# characters.
+TURTLE_CHUNK_CHARS = 1 << 20
+
+# Tokens of a line of Turtle, outside long strings.  Only brackets,
+# strings, IRIs and comments matter for finding where statements end.
+_TURTLE_TOKEN = re.compile(
+    r"""(?P<long>\"\"\"|''')|"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*'|<[^>\n]*>|(?P<comment>\#.*)|(?P<open>[\[(])|(?P<close>[\])])|[^\s"'<\#\[\]()]+"""
+)
+
+_LONG_STRING_END = {
+    '"""': re.compile(r'(?:\\.|[^\\])*?"""', re.DOTALL),
+    "'''": re.compile(r"(?:\\.|[^\\])*?'''", re.DOTALL),
+}
+
+
+class SchemaSubset:
+    """
+    Collects the schema subset of triples fed to add(), over one or two passes.
+
+    >>> from rdflib import Namespace
+    >>> EX = Namespace("http://example.org/ontology/")
+    >>> KB = Namespace("http://example.org/kb/")
+    >>> triples = [
+    ...     (KB.file, NS_RDF.type, EX.File),
+    ...     (EX.File, NS_RDF.type, EX.MetaClass),
+    ...     (EX.File, NS_RDF.type, NS_OWL.Class),
+    ...     (EX.File, NS_RDFS.subClassOf, EX.Object),
+    ...     (KB.file, EX.name, EX.x),
+    ... ]
+    >>> subset = SchemaSubset()
+    >>> for triple in triples:
+    ...     subset.add(triple)
+    >>> subset.needs_second_pass()
+    True
+    >>> subset.start_second_pass()
+    >>> for triple in triples:
+    ...     subset.add(triple)
+    >>> sorted(str(x[2]).split("/")[-1] for x in subset.finish())
+    ['MetaClass', 'Object', 'owl#Class']
+
+    Nodes known to be schema nodes, such as the classes of the base ontology, can be given, so their types are kept:
+
+    >>> subset = SchemaSubset({EX.File})
+    >>> subset.add((EX.File, NS_RDF.type, EX.MetaClass))
+    >>> subset.needs_second_pass()
+    False
+    >>> len(subset.finish())
+    1
+    """
+
+    def __init__(self, known_schema_nodes: AbstractSet[Node] = frozenset()) -> None:
+        self.triples: Set[Triple] = set()
+        self.subjects: Set[Node] = set(known_schema_nodes)
+        self.n_read = 0
+        self._second_pass = False
+        self._n_deferred = 0
+
+    def add(self, triple: Triple) -> None:
+        n_subject, n_predicate, n_object = triple
+        if self._second_pass:
+            if n_predicate == NS_RDF.type and n_subject in self.subjects:
+                self.triples.add(triple)
+                self.subjects.add(n_object)
+            return
+        self.n_read += 1
+        if n_predicate in SCHEMA_PREDICATES or (
+            n_predicate == NS_RDF.type and n_object in SCHEMA_TYPES
+        ):
+            self.triples.add(triple)
+            if n_predicate not in LIST_PREDICATES:
+                self.subjects.add(n_subject)
+        elif n_predicate == NS_RDF.type:
+            if n_subject in self.subjects:
+                self.triples.add(triple)
+                self.subjects.add(n_object)
+            else:
+                self._n_deferred += 1
+
+    def needs_second_pass(self) -> bool:
+        """
+        Returns whether a type triple was seen before its subject was known to be a schema node.  It is not known which, so all must be read again.
+        """
+        return self._n_deferred > 0
+
+    def start_second_pass(self) -> None:
+        self._second_pass = True
+
+    def finish(self) -> Set[Triple]:
+        """
+        Returns the subset, without RDF list nodes not reachable from an OWL union.
+        """
+        n_rests: Dict[Node, List[Node]] = collections.defaultdict(list)
+        for n_subject, n_predicate, n_object in self.triples:
+            if n_predicate == NS_RDF.rest:
+                n_rests[n_subject].append(n_object)
+        stack = [
+            x[2]
+            for x in self.triples
+            if x[1] in {NS_OWL.unionOf, NS_OWL.disjointUnionOf}
+        ]
+        n_list_nodes: Set[Node] = set()
+        while stack:
+            n_node = stack.pop()
+            if n_node in n_list_nodes:
+                continue
+            n_list_nodes.add(n_node)
+            stack.extend(n_rests.get(n_node, []))
+        return {
+            x
+            for x in self.triples
+            if x[1] not in LIST_PREDICATES or x[0] in n_list_nodes
+        }
+
+
+def graph_schema_nodes(graph: Graph) -> Set[URIRef]:
+    """
+    Returns the IRIs of the schema nodes of a graph, as SchemaSubset would find them: subjects of schema triples, and, transitively, the types of schema nodes.  Blank nodes are left out, as they cannot recur in another file.
+    """
+    n_nodes: Set[URIRef] = set()
+    for n_predicate in SCHEMA_PREDICATES - LIST_PREDICATES:
+        n_nodes.update(
+            x for x in graph.subjects(n_predicate, None) if isinstance(x, URIRef)
+        )
+    for n_type in SCHEMA_TYPES:
+        n_nodes.update(
+            x for x in graph.subjects(NS_RDF.type, n_type) if isinstance(x, URIRef)
+        )
+    stack = list(n_nodes)
+    while stack:
+        for n_object in graph.objects(stack.pop(), NS_RDF.type):
+            if isinstance(n_object, URIRef) and n_object not in n_nodes:
+                n_nodes.add(n_object)
+                stack.append(n_object)
+    return n_nodes
+
+
+def scan_turtle_line(
+    line: str, long_quote: Optional[str], depth: int
+) -> Tuple[Optional[str], int, bool]:
+    """
+    Scan a line of Turtle, given the state at its start: the delimiter of the long string it starts within, if any, and the depth of brackets.  Returns the state at its end, and whether the line ends a statement.
+
+    >>> scan_turtle_line('ex:a ex:b "x." .\\n', None, 0)
+    (None, 0, True)
+    >>> scan_turtle_line("ex:a ex:b '''x .\\n", None, 0)
+    ("'''", 0, False)
+    >>> scan_turtle_line("y''' .  # Comment.\\n", "'''", 0)
+    (None, 0, True)
+    >>> scan_turtle_line('ex:a ex:b [ ex:c 1.5 ; # ] .\\n', None, 0)
+    (None, 1, False)
+    >>> scan_turtle_line('<http://example.org/a.> ex:b ex:c .\\n', None, 0)
+    (None, 0, True)
+    """
+    last_token = ""
+    i = 0
+    while i < len(line):
+        if long_quote is not None:
+            m = _LONG_STRING_END[long_quote].match(line, i)
+            if m is None:
+                return (long_quote, depth, False)
+            i = m.end()
+            long_quote = None
+            last_token = m.group()
+            continue
+        m = _TURTLE_TOKEN.search(line, i)
+        if m is None:
+            break
+        i = m.end()
+        if m.group("long"):
+            long_quote = m.group("long")
+            continue
+        if m.group("comment"):
+            break
+        if m.group("open"):
+            depth += 1
+        elif m.group("close"):
+            depth -= 1
+        last_token = m.group()
+    ends = long_quote is None and depth == 0 and last_token.endswith(".")
+    return (long_quote, depth, ends)
+
+
+def turtle_statement_chunks(
+    lines: Iterable[str], chunk_chars: int = TURTLE_CHUNK_CHARS
+) -> Iterator[str]:
+    """
+    Group lines of Turtle into chunks of whole statements, of at least chunk_chars characters where the input allows.
+
+    >>> for chunk in turtle_statement_chunks([
+    ...     "@prefix ex: <http://example.org/ontology/> .\\n",
+    ...     "ex:a ex:b '''x .\\n",
+    ...     "y''' .\\n",
+    ...     "ex:a ex:c [\\n",
+    ...     "  ex:d 1.5 ] .\\n",
+    ... ], chunk_chars=1):
+    ...     print(repr(chunk))
+    '@prefix ex: <http://example.org/ontology/> .\\n'
+    "ex:a ex:b '''x .\\ny''' .\\n"
+    'ex:a ex:c [\\n  ex:d 1.5 ] .\\n'
+    """
+    long_quote: Optional[str] = None
+    depth = 0
+    buffer: List[str] = []
+    n_chars = 0
+    for line in lines:
+        buffer.append(line)
+        n_chars += len(line)
+        long_quote, depth, ends = scan_turtle_line(line, long_quote, depth)
+        if ends and n_chars >= chunk_chars:
+            yield "".join(buffer)
+            buffer = []
+            n_chars = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+class _LineParser(W3CNTriplesParser):
+    """
+    Parses N-Triples and N-Quads lines, passing each triple to a callback.  Blank node labels are prefixed rather than remembered, so memory does not grow with the number of blank nodes.
+    """
+
+    def __init__(
+        self,
+        add: Callable[[Triple], None],
+        bnode_prefix: str,
+        line_pattern: "re.Pattern[str]",
+    ) -> None:
+        super().__init__()
+        self._add = add
+        self._bnode_prefix = bnode_prefix
+        self._line_pattern = line_pattern
+
+    def nodeid(self, bnode_context: object = None) -> Union[bool, BNode]:  # type: ignore[override]
+        if self.peek("_"):
+            return BNode(self._bnode_prefix + self.eat(r_nodeid).group(1))
+        return False
+
+    def parseline(self, bnode_context: object = None) -> None:
+        self.eat(r_wspace)
+        if (not self.line) or self.line.startswith("#"):
+            return
+        if self._line_pattern.search(self.line) is None:
+            return
+        n_subject = self.subject()
+        self.eat(r_wspace)
+        n_predicate = self.predicate()
+        self.eat(r_wspace)
+        n_object = self.object()
+        self.eat(r_wspace)
+        # Skip an N-Quads graph name.
+        _ = self.uriref() or self.nodeid()
+        self.eat(r_tail)
+        if self.line:
+            raise ParserError("Trailing garbage: %r." % self.line)
+        self._add((n_subject, n_predicate, n_object))
+
+
+class _TurtleSink(RDFSink):
+    """
+    Passes each parsed triple to a callback instead of a graph.  Blank nodes are numbered in parse order under a given identifier, so they are the same in each pass over a file.
+    """
+
+    def __init__(self, add: Callable[[Triple], None], sink_id: str) -> None:
+        super().__init__(Graph(bind_namespaces="none"))
+        self.uuid = sink_id
+        self._add = add
+
+    def makeStatement(
+        self, quadruple: Tuple[object, Node, Node, Node], why: object = None
+    ) -> None:
+        _, n_predicate, n_subject, n_object = quadruple
+        # Convert bare numbers and booleans to Literals, as RDFSink does.
+        self._add(
+            (
+                self.normalise(None, n_subject),
+                self.normalise(None, n_predicate),
+                self.normalise(None, n_object),
+            )
+        )
+
+
+def _open_text(filename: str) -> TextIO:
+    if filename.endswith(".gz"):
+        return cast(TextIO, gzip.open(filename, "rt", encoding="utf-8"))
+    return open(filename, "r", encoding="utf-8")
+
+
+def _read_file(
+    filename: str,
+    rdf_format: str,
+    add: Callable[[Triple], None],
+    file_id: str,
+    type_lines_only: bool = False,
+) -> List[Tuple[str, str]]:
+    """
+    Pass each triple of the file to add(), or, of N-Triples and N-Quads files, each type triple if type_lines_only is true.  Returns the file's namespace bindings.
+    """
+    if rdf_format in {"nt", "nquads"}:
+        with _open_text(filename) as in_fh:
+            _LineParser(
+                add, file_id, _TYPE_LINE if type_lines_only else _SCHEMA_LINE
+            ).parse(in_fh)
+        return []
+    if rdf_format == "turtle":
+        base_uri = pathlib.Path(os.path.abspath(filename)).as_uri()
+        parser = SinkParser(_TurtleSink(add, file_id), baseURI=base_uri, turtle=True)
+        parser.startDoc()
+        with _open_text(filename) as in_fh:
+            for chunk in turtle_statement_chunks(in_fh):
+                parser.feed(chunk)
+        parser.endDoc()
+        return [
+            (prefix, str(namespace)) for (prefix, namespace) in parser._bindings.items()
+        ]
+    logging.debug(
+        "Parsing %r whole, as %s is not read in a stream.", filename, rdf_format
+    )
+    graph = Graph(bind_namespaces="none")
+    graph.parse(filename, format=rdf_format)
+    for triple in graph:
+        add(triple)
+    return [(prefix, str(namespace)) for (prefix, namespace) in graph.namespaces()]
+
+
+def read_schema_subset(
+    filename: str,
+    rdf_format: Optional[str] = None,
+    known_schema_nodes: AbstractSet[Node] = frozenset(),
+) -> Tuple[List[Tuple[str, str]], Set[Triple]]:
+    """
+    Returns the namespace bindings of a file, and the schema subset of its triples.  The format is guessed from the file extension, after any `.gz`, if not given.  known_schema_nodes are taken as schema nodes, as from graph_schema_nodes() of the graph the subset will be added to.
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as tmpdir:
+    ...     nt_path = os.path.join(tmpdir, "bundle.nt.gz")
+    ...     with gzip.open(nt_path, "wt") as out_fh:
+    ...         _ = out_fh.write(
+    ...             "<http://example.org/kb/file> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://example.org/ontology/File> .\\n"
+    ...             "<http://example.org/ontology/File> <http://www.w3.org/2000/01/rdf-schema#subClassOf> _:r .\\n"
+    ...             "_:r <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://www.w3.org/2002/07/owl#Restriction> <http://example.org/kb/graph> .\\n"
+    ...             "_:r <http://www.w3.org/2002/07/owl#onProperty> <http://example.org/ontology/name> .\\n"
+    ...             "_:r <http://www.w3.org/2002/07/owl#maxCardinality> \\"1\\"^^<http://www.w3.org/2001/XMLSchema#nonNegativeInteger> .\\n"
+    ...         )
+    ...     _, triples = read_schema_subset(nt_path)
+    >>> len(triples), len({x[0] for x in triples if isinstance(x[0], BNode)})
+    (4, 1)
+    """
+    if rdf_format is None:
+        rdf_format = guess_format(filename.removesuffix(".gz")) or "turtle"
+    file_id = "s%s" % uuid.uuid4().hex
+    subset = SchemaSubset(known_schema_nodes)
+    bindings = _read_file(filename, rdf_format, subset.add, file_id)
+    if subset.needs_second_pass():
+        logging.debug("Reading %r again for types of schema nodes.", filename)
+        subset.start_second_pass()
+        _read_file(filename, rdf_format, subset.add, file_id, True)
+    triples = subset.finish()
+    logging.debug("Kept %d of %d triples of %r.", len(triples), subset.n_read, filename)
+    return (bindings, triples)
+
+
+def parse_schema_subset(graph: Graph, filename: str) -> None:
+    """
+    Add to graph the schema subset of the file's triples, and its namespace bindings.  The schema nodes already in graph are known, so types the file gives them are kept.
+
+    >>> import tempfile
+    >>> graph = Graph()
+    >>> n_file = URIRef("https://ontology.unifiedcyberontology.org/uco/observable/File")
+    >>> _ = graph.add((n_file, NS_RDF.type, NS_OWL.Class))
+    >>> with tempfile.TemporaryDirectory() as tmpdir:
+    ...     ttl_path = os.path.join(tmpdir, "meta.ttl")
+    ...     with open(ttl_path, "w") as out_fh:
+    ...         _ = out_fh.write(
+    ...             "@prefix owl: <http://www.w3.org/2002/07/owl#> .\\n"
+    ...             "@prefix ex: <http://example.org/ontology/> .\\n"
+    ...             "@prefix uco-observable: <https://ontology.unifiedcyberontology.org/uco/observable/> .\\n"
+    ...             "ex:Meta a owl:Class .\\n"
+    ...             "uco-observable:File a ex:Meta .\\n"
+    ...         )
+    ...     parse_schema_subset(graph, ttl_path)
+    >>> sorted(x.split("/")[-1] for x in graph.objects(n_file, NS_RDF.type))
+    ['Meta', 'owl#Class']
+    """
+    bindings, triples = read_schema_subset(
+        filename, known_schema_nodes=graph_schema_nodes(graph)
+    )
+    graph.store.addN((s, p, o, graph) for (s, p, o) in triples)
+    for prefix, namespace in bindings:
+        graph.bind(prefix, URIRef(namespace))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--format",
+        help="RDF format of the input.  Guessed from the file extension by default.",
+    )
+    parser.add_argument("--output", required=True, help="Turtle file to write.")
+    parser.add_argument("in_graph")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    bindings, triples = read_schema_subset(args.in_graph, args.format)
+    graph = Graph()
+    for triple in triples:
+        graph.add(triple)
+    for prefix, namespace in bindings:
+        graph.bind(prefix, URIRef(namespace))
+    graph.serialize(args.output, format="turtle")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This module is the registry of the generators' SPARQL queries.  Each
+query is registered by name when its module is imported, and is parsed
+and translated to algebra once per process, on first use.  Graphs
+backed by a store with its own SPARQL engine, such as Oxigraph (see
+`/src/graph_backend.py`), are given the query text instead.
+
+Each execution is counted and timed, with the number of result rows.
+When the environment variable SPARQL_QUERY_LOG names a file, each
+process appends its statistics to it at exit, one line of JSON per
+query:
+
+    {"query": ..., "count": ..., "seconds": ..., "max_seconds": ...,
+     "rows": ..., "pid": ...}
+
+`seconds` is cumulative, including iteration over the results.  Run as a
+script, this module summarizes a log, slowest queries first:
+
+    SPARQL_QUERY_LOG=$PWD/var/query-log.jsonl make
+    sparql_queries.py var/query-log.jsonl
+"""
+
+import argparse
+import collections
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional
+
+from rdflib import OWL, RDF, RDFS, SH, XSD, Graph
+from rdflib.plugins.stores.memory import Memory, SimpleMemory
+from rdflib.store import Store
+from rdflib.term import Identifier
+
+QUERY_LOG_VARIABLE = "SPARQL_QUERY_LOG"
+
+# Prefixes the query texts may use without declaring them.  These match
+# the bindings of the ontology graph.
+INITIAL_NAMESPACES = {
+    "owl": OWL,
+    "rdf": RDF,
+    "rdfs": RDFS,
+    "sh": SH,
+    "xsd": XSD,
+}
+
+QUERIES: Dict[str, str] = dict()
+
+# Query methods of stores that defer to rdflib's SPARQL engine.
+_RDFLIB_ENGINE_QUERY_METHODS = {Memory.query, SimpleMemory.query, Store.query}
+
+# Per-process state, shared by threads under _lock.
+_prepared_queries: Dict[str, Any] = dict()
+_statistics: Dict[str, Dict[str, Any]] = dict()
+_exit_handler_registered = False
+_lock = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    """
+    A forked process logs only its own queries.  The lock is replaced, as another thread may have held it at the fork.
+    """
+    global _lock
+    _lock = threading.Lock()
+    _statistics.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def register_query(name: str, text: str) -> str:
+    """
+    Register a query text under a name, and return the name.  Registering a different text under a taken name is an error.
+
+    >>> name = register_query("example:classes", "SELECT ?nClass WHERE { ?nClass a owl:Class . }")
+    >>> name
+    'example:classes'
+    >>> register_query("example:classes", "SELECT ?x WHERE { ?x ?y ?z . }")
+    Traceback (most recent call last):
+    ...
+    ValueError: Query name already registered with a different text: 'example:classes'.
+    """
+    if QUERIES.get(name, text) != text:
+        raise ValueError(
+            "Query name already registered with a different text: %r." % name
+        )
+    QUERIES[name] = text
+    return name
+
+
+def prepared_query(name: str) -> Any:
+    """
+    Returns the query parsed and translated to algebra, doing so on first use.
+    """
+    prepared = _prepared_queries.get(name)
+    if prepared is None:
+        # Imported here so paths that run no queries do not load the
+        # SPARQL engine.
+        from rdflib.plugins.sparql import prepareQuery
+
+        with _lock:
+            prepared = _prepared_queries.get(name)
+            if prepared is None:
+                logging.debug("Preparing query %r.", name)
+                prepared = prepareQuery(QUERIES[name], initNs=INITIAL_NAMESPACES)
+                _prepared_queries[name] = prepared
+    return prepared
+
+
+def _uses_rdflib_engine(graph: Graph) -> bool:
+    return type(graph.store).query in _RDFLIB_ENGINE_QUERY_METHODS
+
+
+def run_query(
+    graph: Graph,
+    name: str,
+    init_bindings: Optional[Mapping[str, Identifier]] = None,
+) -> List[Any]:
+    """
+    Evaluate a registered query, and return its result rows, or triples for a CONSTRUCT query.
+
+    >>> import rdflib
+    >>> g = rdflib.Graph()
+    >>> _ = g.parse(data="@prefix owl: <http://www.w3.org/2002/07/owl#> . <urn:example:A> a owl:Class .", format="turtle")
+    >>> name = register_query("example:classes", "SELECT ?nClass WHERE { ?nClass a owl:Class . }")
+    >>> [str(x[0]) for x in run_query(g, name)]
+    ['urn:example:A']
+    >>> statistics()["example:classes"]["rows"]
+    1
+    """
+    global _exit_handler_registered
+    if not _exit_handler_registered and os.environ.get(QUERY_LOG_VARIABLE):
+        # Finalizers run at the exit of the main process, and of worker
+        # processes, which skip atexit handlers.
+        import multiprocessing.util
+
+        with _lock:
+            if not _exit_handler_registered:
+                multiprocessing.util.Finalize(None, _write_query_log, exitpriority=0)
+                _exit_handler_registered = True
+
+    query: Any = QUERIES[name]
+    if _uses_rdflib_engine(graph):
+        query = prepared_query(name)
+    start = time.perf_counter()
+    rows = list(graph.query(query, initBindings=init_bindings or dict()))
+    seconds = time.perf_counter() - start
+
+    with _lock:
+        query_statistics = _statistics.setdefault(
+            name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0}
+        )
+        query_statistics["count"] += 1
+        query_statistics["seconds"] += seconds
+        query_statistics["max_seconds"] = max(query_statistics["max_seconds"], seconds)
+        query_statistics["rows"] += len(rows)
+    return rows
+
+
+def statistics() -> Dict[str, Dict[str, Any]]:
+    """
+    Returns this process's statistics, by query name.
+    """
+    return _statistics
+
+
+def _write_query_log() -> None:
+    query_log = os.environ.get(QUERY_LOG_VARIABLE)
+    if not query_log or not _statistics:
+        return
+    lines = "".join(
+        json.dumps(dict(query=name, pid=os.getpid(), **values), sort_keys=True) + "\n"
+        for (name, values) in sorted(_statistics.items())
+    )
+    # One write to a file opened for appending, so concurrent processes
+    # can share the log.
+    fd = os.open(query_log, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, lines.encode())
+    finally:
+        os.close(fd)
+
+
+def summarize(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Combine the records of a query log by query name, slowest in total first.
+
+    >>> summarize([
+    ...     {"query": "a", "count": 2, "seconds": 0.5, "max_seconds": 0.3, "rows": 10, "pid": 1},
+    ...     {"query": "b", "count": 1, "seconds": 0.1, "max_seconds": 0.1, "rows": 0, "pid": 1},
+    ...     {"query": "a", "count": 1, "seconds": 0.25, "max_seconds": 0.25, "rows": 5, "pid": 2},
+    ... ])
+    [{'query': 'a', 'count': 3, 'seconds': 0.75, 'max_seconds': 0.3, 'rows': 15, 'processes': 2}, {'query': 'b', 'count': 1, 'seconds': 0.1, 'max_seconds': 0.1, 'rows': 0, 'processes': 1}]
+    """
+    totals: Dict[str, Dict[str, Any]] = collections.defaultdict(
+        lambda: {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0}
+    )
+    processes: Dict[str, int] = collections.defaultdict(int)
+    for record in records:
+        total = totals[record["query"]]
+        total["count"] += record["count"]
+        total["seconds"] += record["seconds"]
+        total["max_seconds"] = max(total["max_seconds"], record["max_seconds"])
+        total["rows"] += record["rows"]
+        processes[record["query"]] += 1
+    return [
+        dict(query=name, **totals[name], processes=processes[name])
+        for name in sorted(totals, key=lambda x: totals[x]["seconds"], reverse=True)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument("query_log")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    records: List[Dict[str, Any]] = []
+    with open(args.query_log, "r") as in_fh:
+        for line_number, line in enumerate(in_fh, start=1):
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logging.warning("Skipping malformed record on line %d.", line_number)
+
+    print(
+        "%-40s %9s %10s %10s %10s %10s %10s"
+        % ("query", "processes", "count", "total s", "mean ms", "max ms", "mean rows")
+    )
+    for total in summarize(records):
+        print(
+            "%-40s %9d %10d %10.2f %10.2f %10.2f %10.1f"
+            % (
+                total["query"],
+                total["processes"],
+                total["count"],
+                total["seconds"],
+                1000 * total["seconds"] / total["count"],
+                1000 * total["max_seconds"],
+                total["rows"] / total["count"],
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
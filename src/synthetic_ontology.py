@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script writes a synthetic extension ontology of CASE, for testing
+how the generators scale with ontology size.  It is given to the
+generators as a supplemental graph:
+
+    synthetic_ontology.py --classes 10000 var/synthetic-10000.ttl
+    generate_single_stub_json.py \\
+      C9999.json \\
+      http://example.org/ontology/synthetic/C9999 \\
+      var/synthetic-10000.ttl
+
+Classes are arranged in trees of at most `--depth` levels, each class
+with `--branching` subclasses, and each tree's root a subclass of
+uco-core:UcoObject.  The deepest class of the last full tree is
+reported, as the class with the most superclasses.  The other
+parameters tune:
+
+* `--property-shapes`: The mean number of SHACL property shapes of each
+  class, and Facet class.  Each shape's property has the class for
+  domain, and half have a maximum count.
+* `--union-fraction`: The fraction of property domains that are an
+  owl:unionOf of the class and another, and of classes with subclasses
+  that are declared the owl:unionOf of them.
+* `--restriction-fraction`: The fraction of classes with an OWL
+  cardinality restriction on a property of a superclass.
+* `--facet-classes` and `--facet-fraction`: The number of subclasses of
+  uco-core:Facet, and the fraction of classes with a uco-core:hasFacet
+  restriction on one of them.
+
+An ontology is generated from `--seed`, so the same arguments give the
+same ontology.  See `/src/scaling_curve.py` for measuring the
+generators against a range of sizes.
+"""
+
+import argparse
+import logging
+import math
+import random
+from typing import List, Optional
+
+from case_utils.namespace import NS_OWL, NS_RDF, NS_RDFS, NS_UCO_CORE, NS_XSD
+from rdflib import SH, BNode, Graph, Literal, Namespace, URIRef
+from rdflib.collection import Collection
+from rdflib.term import Node
+
+NS_SYNTHETIC = Namespace("http://example.org/ontology/synthetic/")
+
+
+def tree_capacity(depth: int, branching: int) -> int:
+    """
+    Returns the number of classes in a full tree.
+
+    >>> tree_capacity(3, 2)
+    7
+    >>> tree_capacity(4, 1)
+    4
+    """
+    return sum(branching**x for x in range(depth))
+
+
+def parent_index(i: int, depth: int, branching: int) -> Optional[int]:
+    """
+    Returns the index of the class's parent, or None for the root of a tree.  Classes are numbered breadth-first within each tree.
+
+    >>> [parent_index(x, 2, 3) for x in range(6)]
+    [None, 0, 0, 0, None, 4]
+    """
+    capacity = tree_capacity(depth, branching)
+    tree, j = divmod(i, capacity)
+    if j == 0:
+        return None
+    return tree * capacity + (j - 1) // branching
+
+
+def deepest_class_index(n_classes: int, depth: int, branching: int) -> int:
+    """
+    Returns the index of the class with the most superclasses: the last leaf of the last full tree, or else of the partial tree.
+
+    >>> deepest_class_index(10, 3, 2)
+    6
+    >>> deepest_class_index(5, 3, 2)
+    4
+    """
+    capacity = tree_capacity(depth, branching)
+    if n_classes >= capacity:
+        return (n_classes // capacity) * capacity - 1
+    return n_classes - 1
+
+
+def class_iri(i: int) -> URIRef:
+    return NS_SYNTHETIC["C%d" % i]
+
+
+def synthetic_ontology(
+    n_classes: int,
+    depth: int = 6,
+    branching: int = 4,
+    property_shapes: float = 2.0,
+    union_fraction: float = 0.1,
+    restriction_fraction: float = 0.2,
+    n_facet_classes: int = 10,
+    facet_fraction: float = 0.3,
+    seed: int = 0,
+) -> Graph:
+    """
+    >>> g = synthetic_ontology(20, depth=3, branching=2, n_facet_classes=2)
+    >>> len({x for x in g.subjects(NS_RDF.type, NS_OWL.Class) if isinstance(x, URIRef)})
+    22
+    >>> (class_iri(6), NS_RDFS.subClassOf, class_iri(2)) in g
+    True
+    >>> (class_iri(7), NS_RDFS.subClassOf, NS_UCO_CORE.UcoObject) in g
+    True
+    >>> len(g) == len(synthetic_ontology(20, depth=3, branching=2, n_facet_classes=2))
+    True
+    """
+    if depth < 1 or branching < 1:
+        raise ValueError("Depth and branching must be positive.")
+    rng = random.Random(seed)
+    graph = Graph()
+    graph.bind("synthetic", NS_SYNTHETIC)
+    graph.bind("uco-core", NS_UCO_CORE)
+
+    n_property_count = 0
+
+    def _add_property_shapes(n_class: URIRef) -> None:
+        nonlocal n_property_count
+        count = math.floor(property_shapes)
+        if rng.random() < property_shapes - count:
+            count += 1
+        for _ in range(count):
+            n_property = NS_SYNTHETIC["p%d" % n_property_count]
+            n_property_count += 1
+            graph.add((n_property, NS_RDF.type, NS_OWL.DatatypeProperty))
+            if rng.random() < union_fraction:
+                n_domain = BNode()
+                graph.add((n_domain, NS_RDF.type, NS_OWL.Class))
+                n_members: List[Node] = [n_class, class_iri(rng.randrange(n_classes))]
+                n_union_list = BNode()
+                Collection(graph, n_union_list, n_members)
+                graph.add((n_domain, NS_OWL.unionOf, n_union_list))
+                graph.add((n_property, NS_RDFS.domain, n_domain))
+            else:
+                graph.add((n_property, NS_RDFS.domain, n_class))
+            n_property_shape = BNode()
+            graph.add((n_class, SH.property, n_property_shape))
+            graph.add((n_property_shape, SH.path, n_property))
+            graph.add((n_property_shape, SH.datatype, NS_XSD.string))
+            if rng.random() < 0.5:
+                graph.add(
+                    (
+                        n_property_shape,
+                        SH.maxCount,
+                        Literal(1, datatype=NS_XSD.integer),
+                    )
+                )
+
+    def _add_restriction(n_class: URIRef, n_property: URIRef) -> BNode:
+        n_restriction = BNode()
+        graph.add((n_class, NS_RDFS.subClassOf, n_restriction))
+        graph.add((n_restriction, NS_RDF.type, NS_OWL.Restriction))
+        graph.add((n_restriction, NS_OWL.onProperty, n_property))
+        return n_restriction
+
+    n_facet_class_iris = [NS_SYNTHETIC["F%dFacet" % i] for i in range(n_facet_classes)]
+    for n_facet_class in n_facet_class_iris:
+        graph.add((n_facet_class, NS_RDF.type, NS_OWL.Class))
+        graph.add((n_facet_class, NS_RDF.type, SH.NodeShape))
+        graph.add((n_facet_class, NS_RDFS.subClassOf, NS_UCO_CORE.Facet))
+        _add_property_shapes(n_facet_class)
+
+    # Properties of each class and its superclasses, for restrictions.
+    class_properties: List[List[URIRef]] = []
+    children: List[List[int]] = [[] for _ in range(n_classes)]
+    for i in range(n_classes):
+        n_class = class_iri(i)
+        graph.add((n_class, NS_RDF.type, NS_OWL.Class))
+        graph.add((n_class, NS_RDF.type, SH.NodeShape))
+        i_parent = parent_index(i, depth, branching)
+        if i_parent is None:
+            graph.add((n_class, NS_RDFS.subClassOf, NS_UCO_CORE.UcoObject))
+            class_properties.append([])
+        else:
+            graph.add((n_class, NS_RDFS.subClassOf, class_iri(i_parent)))
+            children[i_parent].append(i)
+            class_properties.append(list(class_properties[i_parent]))
+        first_property = n_property_count
+        _add_property_shapes(n_class)
+        class_properties[i] += [
+            NS_SYNTHETIC["p%d" % x] for x in range(first_property, n_property_count)
+        ]
+
+        if class_properties[i] and rng.random() < restriction_fraction:
+            n_restriction = _add_restriction(n_class, rng.choice(class_properties[i]))
+            graph.add(
+                (
+                    n_restriction,
+                    rng.choice([NS_OWL.cardinality, NS_OWL.maxCardinality]),
+                    Literal(rng.choice([0, 1, 2]), datatype=NS_XSD.nonNegativeInteger),
+                )
+            )
+        if n_facet_class_iris and rng.random() < facet_fraction:
+            n_restriction = _add_restriction(n_class, NS_UCO_CORE.hasFacet)
+            graph.add((n_restriction, NS_OWL.onClass, rng.choice(n_facet_class_iris)))
+            graph.add(
+                (
+                    n_restriction,
+                    NS_OWL.qualifiedCardinality,
+                    Literal(1, datatype=NS_XSD.nonNegativeInteger),
+                )
+            )
+
+    for i, i_children in enumerate(children):
+        if len(i_children) > 1 and rng.random() < union_fraction:
+            n_union_list = BNode()
+            Collection(graph, n_union_list, [class_iri(x) for x in i_children])
+            graph.add((class_iri(i), NS_OWL.unionOf, n_union_list))
+
+    return graph
+
+
+def add_synthetic_ontology_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--branching", type=int, default=4)
+    parser.add_argument("--property-shapes", type=float, default=2.0)
+    parser.add_argument("--union-fraction", type=float, default=0.1)
+    parser.add_argument("--restriction-fraction", type=float, default=0.2)
+    parser.add_argument("--facet-classes", type=int, default=10)
+    parser.add_argument("--facet-fraction", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def synthetic_ontology_from_arguments(
+    args: argparse.Namespace, n_classes: int
+) -> Graph:
+    return synthetic_ontology(
+        n_classes,
+        depth=args.depth,
+        branching=args.branching,
+        property_shapes=args.property_shapes,
+        union_fraction=args.union_fraction,
+        restriction_fraction=args.restriction_fraction,
+        n_facet_classes=args.facet_classes,
+        facet_fraction=args.facet_fraction,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument("--classes", type=int, default=1000)
+    add_synthetic_ontology_arguments(parser)
+    parser.add_argument("out_ttl")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    graph = synthetic_ontology_from_arguments(args, args.classes)
+    graph.serialize(args.out_ttl, format="turtle")
+    logging.info(
+        "Wrote %d triples.  Deepest class: %s.",
+        len(graph),
+        class_iri(deepest_class_index(args.classes, args.depth, args.branching)),
+    )
+
+
+if __name__ == "__main__":
+    main()
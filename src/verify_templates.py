@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script checks that the committed files under `/templates` are up
+to date, without writing to the tree.  The ontology is loaded once, and
+every class's JSON stub and diagram are regenerated in memory across
+worker processes, then compared with the committed files.  Drifted
+classes are reported with a unified diff, and the script exits
+non-zero.
+
+The classes checked are those of the ontology that the template tree is
+made for, selected as `/src/generate_all_ontologies_mk.py` and
+`/src/generate_all_classes_mk.py` select them.  A class without a
+template directory, such as one new in the ontology, is drift, as is a
+template directory of no class, such as one removed from the ontology.
+
+By default, outputs are generated from a schema model (see
+`/src/schema_model.py`) built from the loaded graph, which gives the
+same outputs as the SPARQL queries of the generators.  `--sparql` runs
+the generators' queries instead, against each worker's own copy of the
+graph.
+
+SVG files are compared only if Graphviz `dot` is available, as the Make
+build renders them with it, before optimizing them with
+`/src/optimize_svg.py`.
+"""
+
+import argparse
+import concurrent.futures
+import difflib
+import logging
+import os
+import shutil
+import subprocess
+import sys
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from rdflib import Graph, URIRef
+
+import generate_single_stub_dot
+import generate_single_stub_json
+from generate_all_classes_mk import prefix_classes
+from generate_all_ontologies_mk import ontology_prefix_names
+from graph_backend import add_backend_arguments, load_ontology_graph
+from namespace_index import NamespaceIndex
+from optimize_svg import optimize_svg
+from schema_model import SchemaModel, build_schema_model
+
+# Per-process state, set by _initialize_worker.
+_model: Optional[SchemaModel] = None
+_graphs: Optional[Tuple[Graph, Graph]] = None
+_dot_command: Optional[str] = None
+
+
+def template_class_iris(templates_dir: str) -> List[URIRef]:
+    """
+    Class IRIs are recovered from the template directory layout, `<prefix>/<local name>/`.
+    """
+    n_classes: List[URIRef] = []
+    for prefix in sorted(os.listdir(templates_dir)):
+        if prefix not in generate_single_stub_json.CDO_CONTEXT:
+            continue
+        prefix_dir = os.path.join(templates_dir, prefix)
+        for local_name in sorted(os.listdir(prefix_dir)):
+            if os.path.isdir(os.path.join(prefix_dir, local_name)):
+                n_classes.append(
+                    generate_single_stub_json.CDO_CONTEXT[prefix][local_name]
+                )
+    return n_classes
+
+
+def ontology_class_dirs(graph: Graph) -> Dict[URIRef, str]:
+    """
+    Returns the classes the template tree is made for, mapped to their directories relative to the tree, e.g. `uco-observable/File`.
+    """
+    class_dirs: Dict[URIRef, str] = dict()
+    for n_prefix, prefix_name in ontology_prefix_names(graph).items():
+        for n_class in prefix_classes(graph, str(n_prefix)):
+            class_dirs[n_class] = os.path.join(
+                prefix_name, str(n_class).removeprefix(str(n_prefix))
+            )
+    return class_dirs
+
+
+def class_dir_drift(
+    templates_dir: str, class_dirs: Iterable[str]
+) -> Tuple[List[str], List[str]]:
+    """
+    Returns the class directories missing from templates_dir, and the directories in it of no class.  The latter are looked for in the prefix directories of the classes and of CDO_CONTEXT.
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as tmpdir:
+    ...     for class_dir in ["uco-observable/File", "uco-observable/NotAClass"]:
+    ...         os.makedirs(os.path.join(tmpdir, class_dir))
+    ...     class_dir_drift(tmpdir, ["uco-observable/File", "uco-observable/Directory"])
+    (['uco-observable/Directory'], ['uco-observable/NotAClass'])
+    """
+    expected = set(class_dirs)
+    prefix_names = {x.split("/")[0] for x in expected} | set(
+        generate_single_stub_json.CDO_CONTEXT
+    )
+    present = set()
+    for prefix_name in prefix_names:
+        prefix_dir = os.path.join(templates_dir, prefix_name)
+        if not os.path.isdir(prefix_dir):
+            continue
+        for local_name in os.listdir(prefix_dir):
+            if os.path.isdir(os.path.join(prefix_dir, local_name)):
+                present.add(os.path.join(prefix_name, local_name))
+    return (sorted(expected - present), sorted(present - expected))
+
+
+def template_path(templates_dir: str, n_class: URIRef, extension: str) -> str:
+    """
+    >>> template_path("templates", URIRef("https://ontology.unifiedcyberontology.org/uco/observable/File"), ".json")
+    'templates/uco-observable/File/File.json'
+    """
+    namespace_index = NamespaceIndex(
+        (prefix, str(namespace))
+        for (prefix, namespace) in generate_single_stub_json.CDO_CONTEXT.items()
+    )
+    prefix, _, local_name = namespace_index.compute_qname(str(n_class), False)
+    return os.path.join(templates_dir, prefix, local_name, local_name + extension)
+
+
+def load_generation_graphs(
+    supplemental_graph_filenames: Sequence[str],
+    backend: str = "rdflib",
+    store_path: Optional[str] = None,
+    supplemental_cache_dir: Optional[str] = None,
+    ontology: Optional[str] = None,
+    schema_subset: bool = False,
+) -> Tuple[Graph, Graph]:
+    """
+    Returns graphs prepared as the JSON and DOT generators prepare them.  The DOT graph is expanded, so the two cannot be shared.
+    """
+    json_graph = load_ontology_graph(
+        supplemental_graph_filenames,
+        backend,
+        store_path,
+        supplemental_cache_dir,
+        ontology,
+        schema_subset,
+    )
+    for key in generate_single_stub_json.CDO_CONTEXT:
+        json_graph.bind(key, generate_single_stub_json.CDO_CONTEXT[key])
+
+    dot_graph = load_ontology_graph(
+        supplemental_graph_filenames,
+        backend,
+        store_path,
+        supplemental_cache_dir,
+        ontology,
+        schema_subset,
+    )
+    for key in generate_single_stub_dot.CDO_CONTEXT:
+        dot_graph.bind(key, generate_single_stub_dot.CDO_CONTEXT[key])
+    generate_single_stub_dot.expand_graph(dot_graph)
+
+    return (json_graph, dot_graph)
+
+
+def generate_from_graphs(
+    json_graph: Graph, dot_graph: Graph, n_class: URIRef
+) -> Tuple[str, str]:
+    """
+    Returns the JSON and DOT file contents the generators would write for the class.
+    """
+    json_namespace_index = NamespaceIndex.from_graph(json_graph)
+    expanded_stub = generate_single_stub_json.generate_expanded_stub(
+        json_graph, n_class
+    )
+    compacted_graph = generate_single_stub_json.compact_stub(
+        expanded_stub,
+        lambda x: json_namespace_index.compute_qname(x, False)[:2],
+    )
+
+    n_classes_to_display = generate_single_stub_dot.get_classes_to_display(
+        dot_graph, n_class
+    )
+    triples_to_display = generate_single_stub_dot.get_triples_to_display(
+        dot_graph, n_classes_to_display
+    )
+    dot_text = generate_single_stub_dot.render_dot(
+        n_classes_to_display,
+        triples_to_display,
+        NamespaceIndex.from_graph(dot_graph).qname,
+    )
+
+    return (generate_single_stub_json.serialize_stub(compacted_graph), dot_text)
+
+
+def generate_from_model(model: SchemaModel, n_class: URIRef) -> Tuple[str, str]:
+    """
+    Equivalent of generate_from_graphs, drawing from a SchemaModel.
+    """
+    expanded_stub = generate_single_stub_json.generate_expanded_stub_from_model(
+        model, n_class
+    )
+    compacted_graph = generate_single_stub_json.compact_stub(
+        expanded_stub,
+        lambda x: model.compute_qname(str(x), False)[:2],
+    )
+
+    n_classes_to_display = generate_single_stub_dot.get_classes_to_display_from_model(
+        model, n_class
+    )
+    triples_to_display = generate_single_stub_dot.get_triples_to_display_from_model(
+        model, n_classes_to_display
+    )
+    dot_text = generate_single_stub_dot.render_dot(
+        n_classes_to_display, triples_to_display, model.qname
+    )
+
+    return (generate_single_stub_json.serialize_stub(compacted_graph), dot_text)
+
+
+def _initialize_worker(
+    model: Optional[SchemaModel],
+    graph_arguments: Optional[
+        Tuple[Sequence[str], str, Optional[str], Optional[str], Optional[str], bool]
+    ],
+    dot_command: Optional[str],
+) -> None:
+    global _model, _graphs, _dot_command
+    _model = model
+    if graph_arguments is not None:
+        _graphs = load_generation_graphs(*graph_arguments)
+    _dot_command = dot_command
+
+
+def _render_svg(dot_text: str) -> str:
+    assert _dot_command is not None
+    completed_process = subprocess.run(
+        [_dot_command, "-T", "svg"],
+        input=dot_text,
+        stdout=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    return optimize_svg(completed_process.stdout)
+
+
+def _diff(path: str, expected_text: str) -> Optional[str]:
+    """
+    Returns a unified diff from the committed file to the expected text, or None if they match.
+    """
+    if os.path.exists(path):
+        with open(path, "r") as in_fh:
+            committed_text = in_fh.read()
+    else:
+        committed_text = ""
+    if committed_text == expected_text:
+        return None
+    return "".join(
+        difflib.unified_diff(
+            committed_text.splitlines(keepends=True),
+            expected_text.splitlines(keepends=True),
+            fromfile="a/" + path,
+            tofile="b/" + path,
+        )
+    )
+
+
+def _verify_class(class_dir: str, n_class: URIRef) -> List[str]:
+    """
+    Returns diffs of the class's drifted files in class_dir.
+    """
+    if _graphs is not None:
+        json_text, dot_text = generate_from_graphs(_graphs[0], _graphs[1], n_class)
+    else:
+        assert _model is not None
+        json_text, dot_text = generate_from_model(_model, n_class)
+
+    expected: Dict[str, str] = {".json": json_text}
+    if _dot_command is not None:
+        expected[".svg"] = _render_svg(dot_text)
+
+    local_name = os.path.basename(class_dir)
+    diffs: List[str] = []
+    for extension, expected_text in expected.items():
+        diff = _diff(os.path.join(class_dir, local_name + extension), expected_text)
+        if diff is not None:
+            diffs.append(diff)
+    return diffs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    add_backend_arguments(parser)
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes.",
+    )
+    parser.add_argument(
+        "--sparql",
+        action="store_true",
+        help="Generate with the generators' SPARQL queries instead of a schema model.  Each worker loads its own graphs.",
+    )
+    parser.add_argument(
+        "--skip-svg",
+        action="store_true",
+        help="Only compare JSON stubs.  SVGs are also skipped if Graphviz dot is not found.",
+    )
+    parser.add_argument("templates_dir")
+    parser.add_argument("supplemental_graph", nargs="*")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    dot_command: Optional[str] = None
+    if not args.skip_svg:
+        dot_command = shutil.which("dot")
+        if dot_command is None:
+            logging.warning("Graphviz dot not found.  SVG files will not be checked.")
+
+    graph = load_ontology_graph(
+        args.supplemental_graph,
+        args.backend,
+        args.store_path,
+        args.supplemental_cache,
+        args.ontology,
+        args.schema_subset,
+    )
+    class_dirs = ontology_class_dirs(graph)
+
+    model: Optional[SchemaModel] = None
+    graph_arguments: Optional[
+        Tuple[Sequence[str], str, Optional[str], Optional[str], Optional[str], bool]
+    ] = None
+    if args.sparql:
+        graph_arguments = (
+            args.supplemental_graph,
+            args.backend,
+            args.store_path,
+            args.supplemental_cache,
+            args.ontology,
+            args.schema_subset,
+        )
+    else:
+        for key in generate_single_stub_dot.CDO_CONTEXT:
+            graph.bind(key, generate_single_stub_dot.CDO_CONTEXT[key])
+        model = build_schema_model(graph)
+    del graph
+
+    missing_dirs, orphaned_dirs = class_dir_drift(
+        args.templates_dir, class_dirs.values()
+    )
+    for class_dir in missing_dirs:
+        logging.error(
+            "Missing template directory: %s",
+            os.path.join(args.templates_dir, class_dir),
+        )
+    for class_dir in orphaned_dirs:
+        logging.error(
+            "Orphaned template directory, of no class: %s",
+            os.path.join(args.templates_dir, class_dir),
+        )
+
+    n_classes = sorted(class_dirs, key=lambda x: class_dirs[x])
+    logging.info("Verifying %d classes.", len(n_classes))
+
+    n_drifted_classes = 0
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=args.jobs,
+        initializer=_initialize_worker,
+        initargs=(model, graph_arguments, dot_command),
+    ) as executor:
+        for n_class, diffs in zip(
+            n_classes,
+            executor.map(
+                _verify_class,
+                [os.path.join(args.templates_dir, class_dirs[x]) for x in n_classes],
+                n_classes,
+                chunksize=8,
+            ),
+        ):
+            if diffs:
+                n_drifted_classes += 1
+                logging.error("Drifted: %s", n_class)
+                for diff in diffs:
+                    sys.stdout.write(diff)
+
+    if n_drifted_classes > 0 or orphaned_dirs:
+        logging.error(
+            "%d of %d classes drifted (%d without a template directory), and %d template directories are orphaned.",
+            n_drifted_classes,
+            len(n_classes),
+            len(missing_dirs),
+            len(orphaned_dirs),
+        )
+        sys.exit(1)
+    logging.info("All %d classes are up to date.", len(n_classes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+
+# Portions of this file contributed by NIST are governed by the
+# following statement:
+#
+# This software was developed at the National Institute of Standards
+# and Technology by employees of the Federal Government in the course
+# of their official duties. Pursuant to Title 17 Section 105 of the
+# United States Code, this software is not subject to copyright
+# protection within the United States. NIST assumes no responsibility
+# whatsoever for its use by other parties, and makes no guarantees,
+# expressed or implied, about its quality, reliability, or any other
+# characteristic.
+#
+# We would appreciate acknowledgement if the software is used.
+
+"""
+This script supports iterative development of extension ontologies.
+It keeps the CASE ontology graph resident, watches the given
+supplemental graph files, and rewrites the JSON stubs and DOT sources
+of the classes affected by each edit.
+
+The triples of each watched file are kept alongside the combined
+graph.  When a file changes, only that file is parsed again, and the
+triples it gained or lost are applied to the combined graph.  A schema
+model (see `/src/schema_model.py`) is then rebuilt, and the
+facts it records for each class or property are compared with those
+of the previous model.  The classes to regenerate are those whose
+outputs draw on a changed concept, through the subclass hierarchy,
+metaclasses or Facets.  This is the set of classes a diagram displays,
+computed in reverse.  A change of prefix bindings regenerates every
+class.
+
+Outputs are written in the layout of `/templates`, e.g.
+`OUT_DIR/uco-observable/File/File.json`.  A file is rewritten only if
+its content changes.  Outputs are written for classes in the
+namespaces of the JSON generator's CDO_CONTEXT, and in namespaces bound
+by the watched files but not by CASE.  SVG files are not rendered.
+
+Usage example:
+
+    watch_templates.py var/watch my-extension.ttl var/facet_cardinalities.ttl
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from rdflib import Graph, URIRef
+from rdflib.term import Node
+from rdflib.util import guess_format
+
+import generate_single_stub_dot
+import generate_single_stub_json
+from graph_backend import load_ontology_graph
+from schema_model import SchemaModel, build_schema_model
+from verify_templates import generate_from_model
+
+Triple = Tuple[Node, Node, Node]
+
+# Stamp used to notice a file may have changed: (mtime in nanoseconds,
+# size), or None if the file does not exist.
+FileStamp = Optional[Tuple[int, int]]
+
+
+def _file_stamp(filename: str) -> FileStamp:
+    try:
+        stat_result = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return (stat_result.st_mtime_ns, stat_result.st_size)
+
+
+def node_facts(model: SchemaModel) -> Dict[str, Tuple[Any, ...]]:
+    """
+    Returns, for each concept in the model, the facts the generators draw from it, with concepts named by IRI so models can be compared.
+    """
+    facts: Dict[str, Tuple[Any, ...]] = dict()
+    for i, iri in enumerate(model.iris):
+        facts[iri] = (
+            model.is_class(i),
+            sorted(model.iris[x] for x in model.superclasses(i, True)),
+            sorted(model.iris[x] for x in model.types(i)),
+            sorted(model.iris[x] for x in model.anonymous_superclass_types(i)),
+            sorted(model.iris[x] for x in model.direct_facet_classes(i, True)),
+            sorted(model.iris[x] for x in model.domain_properties(i)),
+            sorted((model.iris[x], y) for (x, y) in model.cardinality_rows(i)),
+        )
+    return facts
+
+
+def dependent_classes(model: SchemaModel, iris: Set[str]) -> Set[str]:
+    """
+    Returns the IRIs of the classes whose diagrams display any of the given concepts.  As diagrams display the subclass hierarchy, metaclasses and Facets of a class, these are also the classes whose JSON stubs can draw on the concepts.
+
+    >>> import rdflib
+    >>> g = rdflib.Graph()
+    >>> data = '''\
+@prefix ex: <http://example.org/ontology/> .\
+@prefix owl: <http://www.w3.org/2002/07/owl#> .\
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .\
+\
+ex:A a owl:Class .\
+ex:B a owl:Class ; rdfs:subClassOf ex:A .\
+ex:C a owl:Class ; rdfs:subClassOf ex:B .\
+ex:D a owl:Class ; rdfs:subClassOf ex:A .\
+ex:M a owl:Class ; rdfs:subClassOf owl:Class .\
+ex:E a owl:Class , ex:M .\
+'''
+    >>> _ = g.parse(data=data, format="turtle")
+    >>> model = build_schema_model(g)
+    >>> sorted(x.removeprefix("http://example.org/ontology/") for x in dependent_classes(model, {"http://example.org/ontology/B"}))
+    ['B', 'C']
+    >>> sorted(x.removeprefix("http://example.org/ontology/") for x in dependent_classes(model, {"http://example.org/ontology/M"}))
+    ['E', 'M']
+    """
+    n_nodes = len(model.iris)
+    subclasses: List[List[int]] = [[] for _ in range(n_nodes)]
+    holders: List[List[int]] = [[] for _ in range(n_nodes)]
+    for i in range(n_nodes):
+        for j in model.superclasses(i, True):
+            subclasses[j].append(i)
+        for j in model.types(i) + model.anonymous_superclass_types(i):
+            holders[j].append(i)
+        for j in model.direct_facet_classes(i, True):
+            holders[j].append(i)
+
+    def _descendants(start: Set[int]) -> Set[int]:
+        closure = set(start)
+        stack = list(start)
+        while stack:
+            for j in subclasses[stack.pop()]:
+                if j not in closure:
+                    closure.add(j)
+                    stack.append(j)
+        return closure
+
+    start: Set[int] = set()
+    for iri in iris:
+        i_concept = model.id_of(iri)
+        if i_concept is not None:
+            start.add(i_concept)
+    hierarchy = _descendants(start)
+    holding_classes = {j for i in hierarchy for j in holders[i]}
+    return {model.iris[x] for x in hierarchy | _descendants(holding_classes)}
+
+
+class TemplateWatcher:
+    """
+    Holds the combined ontology graph, the triples of each watched file, and the current schema model.
+    """
+
+    def __init__(self, out_dir: str, supplemental_graph_filenames: List[str]) -> None:
+        self.out_dir = out_dir
+        self._stamps: Dict[str, FileStamp] = dict()
+        self._digests: Dict[str, Optional[str]] = dict()
+        self._file_triples: Dict[str, Set[Triple]] = dict()
+        self._file_namespaces: Dict[str, Set[str]] = dict()
+
+        self.graph = load_ontology_graph()
+        self._base_triples: Set[Triple] = set(self.graph)
+        self._base_namespaces = {str(x[1]) for x in self.graph.namespaces()}
+
+        for filename in supplemental_graph_filenames:
+            graph = self._read(filename)
+            if graph is None:
+                raise ValueError("Unable to read supplemental graph: %r." % filename)
+            self._replace(filename, graph)
+
+        self.model = self._build_model()
+        self.classes = self._written_classes(self.model)
+        self._facts = node_facts(self.model)
+
+    def _read(self, filename: str) -> Optional[Graph]:
+        """
+        Parse the file if its content changed since the last read.  Returns None if it did not change, or cannot be parsed; a missing file reads as an empty graph.
+        """
+        self._stamps[filename] = _file_stamp(filename)
+        try:
+            with open(filename, "rb") as in_fh:
+                data = in_fh.read()
+        except FileNotFoundError:
+            data = None
+        digest = None if data is None else hashlib.sha256(data).hexdigest()
+        if filename in self._digests and self._digests[filename] == digest:
+            return None
+        graph = Graph(bind_namespaces="none")
+        if data is None:
+            logging.warning("Watched file is missing: %r.", filename)
+        else:
+            try:
+                graph.parse(data=data, format=guess_format(filename) or "turtle")
+            except Exception as e:
+                logging.error("Unable to parse %r: %s", filename, e)
+                return None
+        self._digests[filename] = digest
+        return graph
+
+    def _replace(self, filename: str, graph: Graph) -> None:
+        """
+        Replace the file's triples in the combined graph.  Blank nodes are never shared between files, so a file's blank-node triples are always replaced.
+        """
+        old_triples = self._file_triples.get(filename, set())
+        new_triples: Set[Triple] = set(graph)
+        for triple in old_triples - new_triples:
+            if triple in self._base_triples:
+                continue
+            if any(
+                triple in x for (y, x) in self._file_triples.items() if y != filename
+            ):
+                continue
+            self.graph.remove(triple)
+        for triple in new_triples - old_triples:
+            self.graph.add(triple)
+        self._file_triples[filename] = new_triples
+        self._file_namespaces[filename] = set()
+        for prefix, n_namespace in graph.namespaces():
+            self.graph.bind(prefix, n_namespace)
+            self._file_namespaces[filename].add(str(n_namespace))
+
+    def _build_model(self) -> SchemaModel:
+        # As in the DOT generator, CDO_CONTEXT takes precedence over the
+        # prefixes of supplemental graphs.
+        for key in generate_single_stub_dot.CDO_CONTEXT:
+            self.graph.bind(key, generate_single_stub_dot.CDO_CONTEXT[key])
+        return build_schema_model(self.graph)
+
+    def _written_classes(self, model: SchemaModel) -> Set[str]:
+        written_namespaces = {
+            str(x) for x in generate_single_stub_json.CDO_CONTEXT.values()
+        }
+        for namespaces in self._file_namespaces.values():
+            written_namespaces |= namespaces - self._base_namespaces
+        retval: Set[str] = set()
+        for i, iri in enumerate(model.iris):
+            if not model.is_class(i):
+                continue
+            try:
+                _, namespace, _ = model.compute_qname(iri, False)
+            except KeyError:
+                continue
+            if namespace in written_namespaces:
+                retval.add(iri)
+        return retval
+
+    def _output_paths(self, model: SchemaModel, iri: str) -> Tuple[str, str]:
+        prefix, _, local_name = model.compute_qname(iri, False)
+        stem = os.path.join(self.out_dir, prefix, local_name, local_name)
+        return (stem + ".json", stem + ".dot")
+
+    def write_classes(self, iris: Set[str]) -> int:
+        """
+        Regenerate the classes' outputs, writing the files whose content changed.  Returns the number of files written.
+        """
+        n_written = 0
+        for iri in sorted(iris):
+            try:
+                texts = generate_from_model(self.model, URIRef(iri))
+            except Exception as e:
+                logging.error("Unable to generate %s: %s", iri, e)
+                continue
+            for path, text in zip(self._output_paths(self.model, iri), texts):
+                if write_if_changed(path, text):
+                    logging.debug("Wrote %r.", path)
+                    n_written += 1
+        return n_written
+
+    def _remove_classes(self, model: SchemaModel, iris: Set[str]) -> None:
+        for iri in sorted(iris):
+            logging.info("Removing outputs of %s.", iri)
+            paths = self._output_paths(model, iri)
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            try:
+                os.rmdir(os.path.dirname(paths[0]))
+            except OSError:
+                pass
+
+    def poll(self) -> bool:
+        """
+        Check the watched files, and update outputs for those changed.  Returns True if any file changed.
+        """
+        changed = False
+        for filename in self._stamps:
+            if _file_stamp(filename) == self._stamps[filename]:
+                continue
+            graph = self._read(filename)
+            if graph is None:
+                continue
+            logging.info("Reloading %r.", filename)
+            self._replace(filename, graph)
+            changed = True
+        if changed:
+            self.update()
+        return changed
+
+    def update(self) -> None:
+        """
+        Rebuild the schema model, and regenerate the classes it affects.
+        """
+        start_time = time.perf_counter()
+        old_model = self.model
+        old_classes = self.classes
+        old_facts = self._facts
+        self.model = self._build_model()
+        self.classes = self._written_classes(self.model)
+        self._facts = node_facts(self.model)
+
+        self._remove_classes(old_model, old_classes - self.classes)
+
+        if old_model.namespaces != self.model.namespaces:
+            logging.info("Prefix bindings changed.")
+            affected_classes = self.classes
+        else:
+            changed_iris = {
+                x
+                for x in old_facts.keys() | self._facts.keys()
+                if old_facts.get(x) != self._facts.get(x)
+            }
+            affected_classes = (
+                dependent_classes(old_model, changed_iris)
+                | dependent_classes(self.model, changed_iris)
+            ) & self.classes
+            affected_classes |= self.classes - old_classes
+
+        n_written = self.write_classes(affected_classes)
+        logging.info(
+            "Regenerated %d affected classes, writing %d files, in %.3f seconds.",
+            len(affected_classes),
+            n_written,
+            time.perf_counter() - start_time,
+        )
+
+
+def write_if_changed(path: str, text: str) -> bool:
+    try:
+        with open(path, "r") as in_fh:
+            if in_fh.read() == text:
+                return False
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + "_", "w") as out_fh:
+        out_fh.write(text)
+    os.replace(path + "_", path)
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.2,
+        help="Seconds between checks of the watched files.",
+    )
+    parser.add_argument(
+        "--max-updates",
+        type=int,
+        help="Exit after updating outputs for this many rounds of changes, for scripted use.  Default to watch until interrupted.",
+    )
+    parser.add_argument("out_dir")
+    parser.add_argument("supplemental_graph", nargs="+")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+
+    watcher = TemplateWatcher(args.out_dir, args.supplemental_graph)
+    n_written = watcher.write_classes(watcher.classes)
+    logging.info("Wrote %d files.  Watching for changes.", n_written)
+    n_updates = 0
+    try:
+        while args.max_updates is None or n_updates < args.max_updates:
+            time.sleep(args.interval)
+            if watcher.poll():
+                n_updates += 1
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()